@@ -1,81 +1,312 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import re
+
+import numpy as np
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
-from app.db.database import get_db
+from app.db.database import get_async_db, get_async_read_db
 from app.schemas.acao import AcaoOut, MultiAcoesOut, TickerInfoOut, TickerCreate, TickerUpdate
 from app.schemas.indice import IndiceOut
 from app.schemas.msg import Msg
 from app.schemas.evento import EventoCorporativoOut
+from app.schemas.snapshot import SnapshotAcaoOut
 from app.schemas.grafico import GraficoDataOut, GraficoComparativoOut
-from app.services import acao_service
+from app.schemas.indicador import IndicadoresMultiOut, IndicadoresOut
+from app.services import acao_service_async as acao_service
+from app.services import historico_service, indicadores
 from app.core.security import get_current_user
-from app.db.models import Usuario
+from app.core.config import settings
+from app.core.http_cache import modificado_ate_hoje, montar_etag, resposta_condicional
+from app.core.json_rapido import DECIMAIS_FLOAT, RespostaJSONPronta, RespostaJSONRapida
+from app.core.formatos_colunares import COLUNARES, FORMATO_JSON, MIDIAS, montar_tabela, negociar_formato, serializar_tabela
+from app.db.models import Usuario, Ticker, HistoricoAcao
+from app.db.rollups import INTERVALO_DIARIO, INTERVALO_MENSAL, INTERVALO_SEMANAL
 
 router = APIRouter()
 
+INTERVALOS = {"daily": INTERVALO_DIARIO, "weekly": INTERVALO_SEMANAL, "monthly": INTERVALO_MENSAL}
+_DIAS_POR_UNIDADE = {"d": 1, "w": 7, "m": 31, "y": 366}
+_PERIODO = re.compile(r"^(\d{1,4})([dwmy])$")
+# "max" no gráfico comparativo: a janela precisa de um número de dias (chave dos artefatos).
+_DIAS_MAX_COMPARATIVO = 36500
+
+def _montar_acao_out(ticker_info: Ticker, ultimo_historico: HistoricoAcao) -> AcaoOut:
+    data_e_hora_atualizacao = datetime.combine(ultimo_historico.date, datetime.min.time())
+    return AcaoOut(ticker=ticker_info.codigo, nome_empresa=ticker_info.nome, preco_atual=ultimo_historico.close, variacao_percentual=ultimo_historico.variacao_percentual or 0.0, atualizado_em=data_e_hora_atualizacao)
+
 @router.post("/", response_model=TickerInfoOut, status_code=status.HTTP_201_CREATED, summary="Cadastrar um novo Ticker")
-def create_new_ticker(ticker_data: TickerCreate, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    return acao_service.create_ticker(db=db, ticker_data=ticker_data)
+async def create_new_ticker(ticker_data: TickerCreate, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user)):
+    return await acao_service.create_ticker(db=db, ticker_data=ticker_data)
 
 @router.get("/listar-todos", response_model=List[TickerInfoOut], summary="Listar todos os Tickers cadastrados")
-def list_all_tickers(db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    tickers_list = acao_service.get_todos_os_tickers(db=db)
+async def list_all_tickers(db: AsyncSession = Depends(get_async_read_db), current_user: Usuario = Depends(get_current_user)):
+    tickers_list = await acao_service.get_todos_os_tickers(db=db)
     return [TickerInfoOut.model_validate(t, from_attributes=True) for t in tickers_list]
 
+def _codigos_da_query(tickers: List[str], maximo: Optional[int] = None) -> List[str]:
+    codigos = [codigo.strip() for valor in tickers for codigo in valor.split(",") if codigo.strip()]
+    maximo = settings.BUSCA_MAX_TICKERS if maximo is None else maximo
+    if not codigos:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Informe ao menos um ticker.")
+    if len(codigos) > maximo:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Máximo de {maximo} tickers por consulta.")
+    return codigos
+
+def _dias_do_periodo(periodo: Optional[str], padrao: Optional[int]) -> Optional[int]:
+    """`range` (90d, 26w, 6m, 5y ou max) em dias; None = todo o histórico."""
+    if periodo is None:
+        return padrao
+    periodo = periodo.strip().lower()
+    if periodo == "max":
+        return None
+    encontrado = _PERIODO.match(periodo)
+    if not encontrado or int(encontrado.group(1)) == 0:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="range inválido: use algo como 90d, 26w, 6m, 5y ou max.")
+    return int(encontrado.group(1)) * _DIAS_POR_UNIDADE[encontrado.group(2)]
+
+def _resposta_colunar(colunas: dict, formato: str, response: Response) -> Response:
+    return _resposta_tabela(montar_tabela(colunas), formato, response)
+
+def _resposta_tabela(tabela, formato: str, response: Response) -> Response:
+    return Response(serializar_tabela(tabela, formato), media_type=MIDIAS[formato], headers=dict(response.headers))
+
+async def _calcular_indicadores(request: Request, response: Response, db: AsyncSession, codigos: List[str],
+                                especificacao: Optional[str], periodo: Optional[str]):
+    """(formato, resultados, não encontrados), ou a resposta 304 pronta no lugar dos resultados."""
+    formato = negociar_formato(request, [FORMATO_JSON, *COLUNARES])
+    try:
+        pedidos = indicadores.interpretar_pedidos(especificacao)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    dias = _dias_do_periodo(periodo, None)
+    versao, atualizado_em = await acao_service.get_versao_dados(db)
+    etag = montar_etag("indicadores", ",".join(sorted(c.upper() for c in codigos)), ",".join(map(indicadores.nome_coluna, pedidos)), dias, versao, date.today(), formato)
+    nao_modificado = resposta_condicional(request, response, etag, modificado_ate_hoje(atualizado_em))
+    if nao_modificado is not None:
+        return formato, nao_modificado, []
+    resultados, nao_encontrados = await acao_service.get_indicadores(db, codigos, pedidos, versao, dias)
+    return formato, resultados, nao_encontrados
+
+def _indicadores_json(ticker: str, datas, valores: dict) -> dict:
+    return {"ticker": ticker, "labels": np.datetime_as_string(datas, unit="D").tolist(), "indicadores": valores}
+
+async def _exportar_historico(db: AsyncSession, codigos: List[str], inicio: Optional[date], fim: Optional[date],
+                              colunas: Optional[str], formato: str, limite: Optional[int], cursor: Optional[str]) -> StreamingResponse:
+    try:
+        colunas_selecionadas = historico_service.validar_colunas(colunas)
+        stmt = historico_service.montar_consulta(codigos, colunas_selecionadas, inicio, fim, cursor, limite)
+        proximo = await historico_service.proximo_cursor(db, codigos, inicio, fim, cursor, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    headers = {"X-Proximo-Cursor": proximo} if proximo else {}
+    corpo = historico_service.transmitir(db.bind, stmt, colunas_selecionadas, formato)
+    return StreamingResponse(corpo, media_type=MIDIAS[formato], headers=headers)
+
+_DESCRICAO_COLUNAS = f"Colunas separadas por vírgula ({', '.join(historico_service.COLUNAS_EXPORTAVEIS)}); padrão: todas"
+_DESCRICAO_CURSOR = "Valor de X-Proximo-Cursor da página anterior"
+_DESCRICAO_FORMATO = "Sobrepõe o cabeçalho Accept; padrão: ndjson"
+_DESCRICAO_INDICADORES = (
+    "Indicadores separados por vírgula, com parâmetro opcional após ':' — "
+    "sma, ema, retornos, volatilidade, drawdown, rsi, volume_medio (padrão: sma,ema,rsi)"
+)
+
+@router.get("/historico", summary="Exportar o histórico de vários tickers (NDJSON/CSV)")
+async def export_multi_historico(
+    request: Request,
+    tickers: List[str] = Query(..., min_length=1, description="Lista de tickers (parâmetro repetido ou separado por vírgulas)"),
+    inicio: Optional[date] = Query(None, description="Data inicial (inclusive)"),
+    fim: Optional[date] = Query(None, description="Data final (inclusive)"),
+    colunas: Optional[str] = Query(None, description=_DESCRICAO_COLUNAS),
+    formato: Optional[str] = Query(None, pattern="^(ndjson|csv|arrow|parquet)$", description=_DESCRICAO_FORMATO),
+    limite: Optional[int] = Query(None, ge=1, description="Linhas por página; sem limite exporta tudo"),
+    cursor: Optional[str] = Query(None, description=_DESCRICAO_CURSOR),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Linhas de acoes_historico ordenadas por (ticker, date), enviadas em streaming."""
+    codigos = _codigos_da_query(tickers, settings.HISTORICO_MAX_TICKERS)
+    formato = negociar_formato(request, historico_service.FORMATOS, formato)
+    return await _exportar_historico(db, codigos, inicio, fim, colunas, formato, limite, cursor)
+
+@router.get("/indicadores", response_model=IndicadoresMultiOut, summary="Indicadores técnicos de vários tickers")
+async def read_multi_indicadores(
+    request: Request,
+    response: Response,
+    tickers: List[str] = Query(..., min_length=1, description="Lista de tickers (parâmetro repetido ou separado por vírgulas)"),
+    especificacao: Optional[str] = Query(None, alias="indicadores", description=_DESCRICAO_INDICADORES),
+    periodo: Optional[str] = Query(None, alias="range", description="Recorte da resposta: 90d, 26w, 6m, 5y ou max (padrão)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Usuario = Depends(get_current_user),
+):
+    codigos = _codigos_da_query(tickers)
+    formato, resultados, nao_encontrados = await _calcular_indicadores(request, response, db, codigos, especificacao, periodo)
+    if isinstance(resultados, Response):
+        return resultados
+    if formato in COLUNARES:
+        colunas = {"ticker": np.array([], dtype=object), "date": np.array([], dtype="datetime64[D]")}
+        if resultados:
+            colunas = {
+                "ticker": np.concatenate([np.full(len(datas), t, dtype=object) for t, (datas, _) in resultados.items()]),
+                "date": np.concatenate([datas for datas, _ in resultados.values()]),
+            }
+            for nome in next(iter(resultados.values()))[1]:
+                colunas[nome] = np.concatenate([valores[nome] for _, valores in resultados.values()])
+        return _resposta_colunar(colunas, formato, response)
+    conteudo = {
+        "resultados": [_indicadores_json(t, datas, valores) for t, (datas, valores) in resultados.items()],
+        "nao_encontrados": nao_encontrados,
+    }
+    return RespostaJSONRapida(conteudo, decimais=DECIMAIS_FLOAT, headers=dict(response.headers))
+
 @router.get("/buscar", response_model=MultiAcoesOut, summary="Consultar dados de Múltiplas Ações")
-def read_multi_acoes(tickers: List[str] = Query(..., min_length=1, description="Lista de tickers"), db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    acoes_encontradas = []
-    acoes_nao_encontradas = []
-    for ticker_code in tickers:
-        dados = acao_service.get_dados_completos_acao(db, ticker_code)
-        if dados:
-            ticker_info, ultimo_historico = dados
-            data_e_hora_atualizacao = datetime.combine(ultimo_historico.date, datetime.min.time())
-            acao_out = AcaoOut(ticker=ticker_info.codigo, nome_empresa=ticker_info.nome, preco_atual=ultimo_historico.close, variacao_percentual=ultimo_historico.variacao_percentual or 0.0, atualizado_em=data_e_hora_atualizacao)
-            acoes_encontradas.append(acao_out)
-        else:
-            acoes_nao_encontradas.append(ticker_code)
-    return {"acoes_encontradas": acoes_encontradas, "acoes_nao_encontradas": acoes_nao_encontradas}
+async def read_multi_acoes(tickers: List[str] = Query(..., min_length=1, description="Lista de tickers (parâmetro repetido ou separado por vírgulas)"), db: AsyncSession = Depends(get_async_read_db), current_user: Usuario = Depends(get_current_user)):
+    codigos = _codigos_da_query(tickers)
+    encontrados, acoes_nao_encontradas = await acao_service.get_dados_completos_acoes(db, codigos)
+    acoes_encontradas = [_montar_acao_out(ticker_info, ultimo_historico) for ticker_info, ultimo_historico in encontrados]
+    return RespostaJSONRapida({"acoes_encontradas": acoes_encontradas, "acoes_nao_encontradas": acoes_nao_encontradas})
 
 @router.get("/grafico-comparativo", response_model=GraficoComparativoOut, summary="Obter dados para gráfico comparativo")
-def get_comparative_chart_data(db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    return acao_service.get_dados_grafico_comparativo(db=db)
+async def get_comparative_chart_data(
+    request: Request,
+    response: Response,
+    dias: int = Query(90, ge=1, le=3650, description="Janela em dias"),
+    periodo: Optional[str] = Query(None, alias="range", description="Janela alternativa a `dias`: 90d, 26w, 6m, 5y ou max"),
+    intervalo: str = Query("daily", alias="interval", pattern="^(daily|weekly|monthly)$", description="Resolução da série"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Usuario = Depends(get_current_user),
+):
+    formato = negociar_formato(request, [FORMATO_JSON, *COLUNARES])
+    dias = _dias_do_periodo(periodo, dias) or _DIAS_MAX_COMPARATIVO
+    intervalo = INTERVALOS[intervalo]
+    versao, atualizado_em = await acao_service.get_versao_dados(db)
+    nao_modificado = resposta_condicional(request, response, montar_etag("comparativo", dias, intervalo, versao, date.today(), formato), modificado_ate_hoje(atualizado_em))
+    if nao_modificado is not None:
+        return nao_modificado
+    if formato in COLUNARES:
+        tabela = await acao_service.get_tabela_grafico_comparativo(db=db, dias=dias, intervalo=intervalo)
+        return _resposta_tabela(tabela, formato, response)
+    conteudo = await acao_service.get_json_grafico_comparativo(db=db, dias=dias, intervalo=intervalo)
+    return RespostaJSONPronta(conteudo, headers=dict(response.headers))
 
 @router.get("/indices/principais", response_model=List[IndiceOut], summary="Consultar Principais Índices")
-def read_indices(db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    indices = acao_service.get_principais_indices(db=db)
+async def read_indices(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db), current_user: Usuario = Depends(get_current_user)):
+    quantidade, atualizado_em = await acao_service.get_versao_indices(db)
+    nao_modificado = resposta_condicional(request, response, montar_etag("indices", quantidade, atualizado_em), atualizado_em)
+    if nao_modificado is not None:
+        return nao_modificado
+    indices = await acao_service.get_principais_indices(db=db)
     if not indices:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Índices não encontrados.")
     return indices
 
 @router.get("/{ticker}", response_model=AcaoOut, summary="Consultar dados de uma Ação")
-def read_acao(ticker: str, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    dados = acao_service.get_dados_completos_acao(db=db, ticker_code=ticker)
+async def read_acao(ticker: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db), current_user: Usuario = Depends(get_current_user)):
+    versao, atualizado_em = await acao_service.get_versao_dados(db)
+    # A data entra no validador: o mesmo registro passa a ser 404 (desatualizado) no dia seguinte.
+    nao_modificado = resposta_condicional(request, response, montar_etag("acao", ticker.upper(), versao, date.today()), modificado_ate_hoje(atualizado_em))
+    if nao_modificado is not None:
+        return nao_modificado
+    dados = await acao_service.get_dados_completos_acao(db=db, ticker_code=ticker)
     if dados is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticker '{ticker}' ou seu histórico não encontrados.")
     ticker_info, ultimo_historico = dados
-    data_e_hora_atualizacao = datetime.combine(ultimo_historico.date, datetime.min.time())
-    return AcaoOut(ticker=ticker_info.codigo, nome_empresa=ticker_info.nome, preco_atual=ultimo_historico.close, variacao_percentual=ultimo_historico.variacao_percentual or 0.0, atualizado_em=data_e_hora_atualizacao)
+    return _montar_acao_out(ticker_info, ultimo_historico)
 
 @router.get("/{ticker}/grafico", response_model=GraficoDataOut, summary="Obter dados para gráfico")
-def get_chart_data(ticker: str, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    dados_grafico = acao_service.get_dados_para_grafico(db=db, ticker_code=ticker)
+async def get_chart_data(
+    ticker: str,
+    request: Request,
+    response: Response,
+    periodo: Optional[str] = Query(None, alias="range", description="Janela: 90d (padrão), 26w, 6m, 5y, 10y ou max"),
+    intervalo: str = Query("daily", alias="interval", pattern="^(daily|weekly|monthly)$", description="Resolução da série; weekly/monthly vêm dos agregados OHLC"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Usuario = Depends(get_current_user),
+):
+    formato = negociar_formato(request, [FORMATO_JSON, *COLUNARES])
+    dias = _dias_do_periodo(periodo, 90)
+    intervalo = INTERVALOS[intervalo]
+    versao, atualizado_em = await acao_service.get_versao_dados(db)
+    nao_modificado = resposta_condicional(request, response, montar_etag("grafico", ticker.upper(), dias, intervalo, versao, date.today(), formato), modificado_ate_hoje(atualizado_em))
+    if nao_modificado is not None:
+        return nao_modificado
+    if formato in COLUNARES:
+        colunas = await acao_service.get_colunas_grafico(db=db, ticker_code=ticker, dias=dias, intervalo=intervalo)
+        if colunas is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticker '{ticker}' não encontrado.")
+        return _resposta_colunar(colunas, formato, response)
+    dados_grafico = await acao_service.get_serie_grafico(db=db, ticker_code=ticker, dias=dias, intervalo=intervalo)
     if dados_grafico is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticker '{ticker}' não encontrado.")
-    return dados_grafico
+    return RespostaJSONRapida(dados_grafico, decimais=DECIMAIS_FLOAT, headers=dict(response.headers))
+
+@router.get("/{ticker}/indicadores", response_model=IndicadoresOut, summary="Indicadores técnicos de uma Ação")
+async def read_indicadores(
+    ticker: str,
+    request: Request,
+    response: Response,
+    especificacao: Optional[str] = Query(None, alias="indicadores", description=_DESCRICAO_INDICADORES),
+    periodo: Optional[str] = Query(None, alias="range", description="Recorte da resposta: 90d, 26w, 6m, 5y ou max (padrão)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Usuario = Depends(get_current_user),
+):
+    """Séries calculadas sobre todo o histórico de fechamentos; `range` só recorta o que é devolvido."""
+    formato, resultados, _ = await _calcular_indicadores(request, response, db, [ticker], especificacao, periodo)
+    if isinstance(resultados, Response):
+        return resultados
+    if ticker.upper() not in resultados:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticker '{ticker}' não encontrado.")
+    datas, valores = resultados[ticker.upper()]
+    if formato in COLUNARES:
+        return _resposta_colunar({"date": datas, **valores}, formato, response)
+    return RespostaJSONRapida(_indicadores_json(ticker.upper(), datas, valores), decimais=DECIMAIS_FLOAT, headers=dict(response.headers))
+
+@router.get("/{ticker}/historico", summary="Exportar o histórico de uma Ação (NDJSON/CSV)")
+async def export_historico(
+    ticker: str,
+    request: Request,
+    inicio: Optional[date] = Query(None, description="Data inicial (inclusive)"),
+    fim: Optional[date] = Query(None, description="Data final (inclusive)"),
+    colunas: Optional[str] = Query(None, description=_DESCRICAO_COLUNAS),
+    formato: Optional[str] = Query(None, pattern="^(ndjson|csv|arrow|parquet)$", description=_DESCRICAO_FORMATO),
+    limite: Optional[int] = Query(None, ge=1, description="Linhas por página; sem limite exporta tudo"),
+    cursor: Optional[str] = Query(None, description=_DESCRICAO_CURSOR),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Linhas de acoes_historico do ticker em ordem de data, enviadas em streaming."""
+    formato = negociar_formato(request, historico_service.FORMATOS, formato)
+    if not await acao_service.ticker_existe(db, ticker):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticker '{ticker}' não encontrado.")
+    return await _exportar_historico(db, [ticker.upper()], inicio, fim, colunas, formato, limite, cursor)
 
 @router.get("/{ticker}/eventos", response_model=List[EventoCorporativoOut], summary="Consultar eventos corporativos")
-def read_acao_eventos(ticker: str, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    eventos = acao_service.get_eventos_por_ticker(db=db, ticker=ticker)
+async def read_acao_eventos(ticker: str, db: AsyncSession = Depends(get_async_read_db), current_user: Usuario = Depends(get_current_user)):
+    eventos = await acao_service.get_eventos_por_ticker(db=db, ticker=ticker)
     if eventos is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticker '{ticker}' não encontrado.")
     return eventos
+
+@router.get("/{ticker}/intraday", response_model=List[SnapshotAcaoOut], summary="Consultar cotações intradiárias")
+async def read_acao_intraday(
+    ticker: str,
+    horas: int = Query(24, ge=1, le=24 * 31, description="Janela em horas a partir de agora"),
+    limite: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Snapshots gravados pela coleta intradiária, do mais recente para o mais antigo (horário UTC)."""
+    desde = datetime.utcnow() - timedelta(hours=horas)
+    snapshots = await acao_service.get_snapshots_por_ticker(db=db, ticker=ticker, desde=desde, limite=limite)
+    if snapshots is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticker '{ticker}' não encontrado.")
+    return snapshots
     
 @router.delete("/{ticker}", response_model=Msg, summary="Deletar uma Ação")
-def delete_acao(ticker: str, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    deleted_ticker = acao_service.delete_acao_by_ticker(db=db, ticker_code=ticker)
+async def delete_acao(ticker: str, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user)):
+    deleted_ticker = await acao_service.delete_acao_by_ticker(db=db, ticker_code=ticker)
     if deleted_ticker is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ação com ticker '{ticker}' não encontrada.")
     return {"detail": f"Ação '{ticker}' e seus dados relacionados foram deletados com sucesso."}
@@ -86,16 +317,16 @@ def delete_acao(ticker: str, db: Session = Depends(get_db), current_user: Usuari
     summary="Atualizar o nome de uma Ação",
     responses={404: {"model": Msg, "description": "Ação não encontrada."}}
 )
-def update_ticker(
+async def update_ticker(
     ticker: str,
     ticker_update_data: TickerUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
     Atualiza o nome de uma ação (ticker) já existente no sistema.
     """
-    updated_ticker = acao_service.update_ticker_nome(
+    updated_ticker = await acao_service.update_ticker_nome(
         db=db, 
         ticker_code=ticker, 
         ticker_update=ticker_update_data
@@ -1,14 +1,37 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
+import datetime
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from app.db.database import get_db
-from app.schemas.log import ColetaLogOut
-from app.services import log_service
+from app.core.security import get_current_user
+from app.db.database import get_async_db
+from app.db.models import Usuario
+from app.schemas.log import ColetaLogOut, UsoOut
+from app.services import log_service_async as log_service
 
 router = APIRouter()
 
 @router.get("/coleta", response_model=List[ColetaLogOut], summary="Listar Logs de Coleta")
-def read_coleta_logs(db: Session = Depends(get_db)):
+async def read_coleta_logs(db: AsyncSession = Depends(get_async_db)):
     """Retorna os últimos 100 logs gerados pelo script de coleta de dados."""
-    return log_service.get_coleta_logs(db)
\ No newline at end of file
+    return await log_service.get_coleta_logs(db)
+
+@router.get("/uso", response_model=List[UsoOut], summary="Uso da API agregado por minuto")
+async def read_uso(
+    inicio: Optional[datetime.datetime] = Query(None, description="Início (UTC); padrão: 24 horas atrás"),
+    fim: Optional[datetime.datetime] = Query(None, description="Fim exclusivo (UTC); padrão: agora"),
+    agrupar: str = Query("endpoint", pattern="^(endpoint|usuario|minuto)$"),
+    usuario_id: Optional[int] = Query(None, description="Filtra um usuário (0 = requisições sem usuário)"),
+    endpoint: Optional[str] = Query(None, description="Filtro de endpoint no formato LIKE (ex.: /api/v1/acoes/%)"),
+    limite: int = Query(100, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Usuario = Depends(get_current_user),
+):
+    """
+    Requisições, erros (5xx), erros do cliente (4xx) e latências lidos dos agregados por
+    minuto (logs_requisicoes_minuto), sem varrer os logs brutos. Os minutos mais recentes
+    aparecem depois da próxima consolidação (app/scripts/manutencao_logs.py).
+    """
+    fim = fim or datetime.datetime.utcnow()
+    inicio = inicio or fim - datetime.timedelta(days=1)
+    return await log_service.get_uso(db, inicio, fim, agrupar, usuario_id, endpoint, limite)
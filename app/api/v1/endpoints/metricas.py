@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from typing import Dict, List, Optional
+
+from app.core.perfilamento import perfilador
+from app.core.security import get_admin_user, get_current_user
+from app.db.database import monitores_pool
+from app.db.models import Usuario
+from app.services.armazem_precos import armazem_precos
+from app.schemas.perfil import PerfilOut, PerfilResumoOut
+
+router = APIRouter()
+
+@router.get("/pool", response_model=Dict[str, dict], summary="Uso dos pools de conexão")
+async def read_pool_metrics(current_user: Usuario = Depends(get_current_user)):
+    """Checkouts, conexões, saturações e timeouts de cada engine (primário, async e réplicas)."""
+    return {nome: monitor.estatisticas() for nome, monitor in monitores_pool.items()}
+
+@router.get("/armazem", response_model=dict, summary="Armazém de preços em memória")
+async def read_armazem_metrics(current_user: Usuario = Depends(get_current_user)):
+    """Tickers, linhas, memória, tempo de carga e versão dos dados do armazém deste worker."""
+    return armazem_precos.estatisticas()
+
+@router.get("/perfis", response_model=List[PerfilResumoOut], summary="Perfis de requisições guardados (admin)")
+async def list_perfis(current_user: Usuario = Depends(get_admin_user)):
+    """
+    Perfis deste worker, do mais recente ao mais antigo. Para perfilar uma requisição,
+    envie `X-Perfil: 1` com uma chave de admin; a resposta traz `X-Perfil-Id`.
+    """
+    return perfilador.listar()
+
+@router.get("/perfis/colapsado", response_class=PlainTextResponse, summary="Pilhas colapsadas de todos os perfis (admin)")
+async def read_perfis_colapsados(
+    rota: Optional[str] = Query(None, description="Template da rota, ex.: /api/v1/acoes/buscar"),
+    current_user: Usuario = Depends(get_admin_user),
+):
+    """Soma das pilhas dos perfis guardados, prontas para flamegraph.pl ou speedscope."""
+    return PlainTextResponse(perfilador.colapsado(rota=rota))
+
+@router.get("/perfis/{perfil_id}", response_model=PerfilOut, summary="Perfil de uma requisição (admin)")
+async def read_perfil(perfil_id: int, current_user: Usuario = Depends(get_admin_user)):
+    """Resumo, comandos SQL com início e duração e as pilhas amostradas com suas contagens."""
+    perfil = perfilador.obter(perfil_id)
+    if perfil is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil não encontrado.")
+    return perfil
+
+@router.get("/perfis/{perfil_id}/colapsado", response_class=PlainTextResponse, summary="Pilhas colapsadas de um perfil (admin)")
+async def read_perfil_colapsado(perfil_id: int, current_user: Usuario = Depends(get_admin_user)):
+    colapsado = perfilador.colapsado(perfil_id)
+    if colapsado is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil não encontrado.")
+    return PlainTextResponse(colapsado)
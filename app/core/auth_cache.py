@@ -0,0 +1,95 @@
+"""
+Cache em processo de chave de API -> usuário (LRU com TTL).
+
+Usado por `get_current_user` e pelo gravador de logs, evitando consultar `usuarios`
+a cada requisição. Chaves inexistentes também são guardadas (cache negativo, com TTL
+menor). As entradas guardam cópias desacopladas da sessão, e `usuario_service` invalida
+o usuário ao alterá-lo ou removê-lo. Com vários workers, cada processo tem o seu cache
+e o TTL limita por quanto tempo um worker pode enxergar um usuário desatualizado.
+Acertos e falhas vão para o `/metrics` (auth_cache_consultas_total).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core import metricas
+from app.core.config import settings
+from app.db import models
+
+AUSENTE = object()
+
+def _copiar_usuario(usuario: models.Usuario) -> models.Usuario:
+    return models.Usuario(id=usuario.id, nome=usuario.nome, email=usuario.email,
+                          api_key=usuario.api_key, ativo=usuario.ativo)
+
+class CacheChavesApi:
+    def __init__(self, capacidade: int, ttl_segundos: float, ttl_negativo_segundos: float):
+        self.capacidade = capacidade
+        self.ttl = ttl_segundos
+        self.ttl_negativo = ttl_negativo_segundos
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self._chave_por_usuario = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, api_key: str):
+        """Retorna o usuário em cache, None para chave sabidamente inválida, ou AUSENTE."""
+        with self._lock:
+            entrada = self._entradas.get(api_key)
+            if entrada is None or entrada[1] < time.monotonic():
+                if entrada is not None:
+                    self._remover(api_key)
+                self.falhas += 1
+                entrada = None
+            else:
+                self._entradas.move_to_end(api_key)
+                self.acertos += 1
+        if entrada is None:
+            metricas.auth_cache_consultas.incrementar("falha")
+            return AUSENTE
+        metricas.auth_cache_consultas.incrementar("acerto")
+        return _copiar_usuario(entrada[0]) if entrada[0] is not None else None
+
+    def armazenar(self, api_key: str, usuario: Optional[models.Usuario]):
+        ttl = self.ttl if usuario is not None else self.ttl_negativo
+        if self.capacidade <= 0 or ttl <= 0:
+            return
+        copia = _copiar_usuario(usuario) if usuario is not None else None
+        with self._lock:
+            self._remover(api_key)
+            self._entradas[api_key] = (copia, time.monotonic() + ttl)
+            if copia is not None:
+                self._chave_por_usuario[copia.id] = api_key
+            while len(self._entradas) > self.capacidade:
+                self._remover(next(iter(self._entradas)))
+
+    def _remover(self, api_key: str):
+        entrada = self._entradas.pop(api_key, None)
+        if entrada and entrada[0] is not None:
+            self._chave_por_usuario.pop(entrada[0].id, None)
+
+    def invalidar_chave(self, api_key: str):
+        with self._lock:
+            self._remover(api_key)
+
+    def invalidar_usuario(self, usuario_id: int):
+        with self._lock:
+            api_key = self._chave_por_usuario.get(usuario_id)
+            if api_key is not None:
+                self._remover(api_key)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._chave_por_usuario.clear()
+
+    def estatisticas(self) -> dict:
+        return {"entradas": len(self._entradas), "acertos": self.acertos, "falhas": self.falhas}
+
+cache_chaves_api = CacheChavesApi(
+    capacidade=settings.AUTH_CACHE_CAPACIDADE,
+    ttl_segundos=settings.AUTH_CACHE_TTL_SEGUNDOS,
+    ttl_negativo_segundos=settings.AUTH_CACHE_TTL_NEGATIVO_SEGUNDOS,
+)
@@ -1,12 +1,73 @@
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DATABASE_ASYNC_URL: Optional[str] = None
+    DATABASE_READ_URLS: List[str] = []
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_REPLICA_INTERVALO_VERIFICACAO: float = 5.0
+    DB_REPLICA_QUARENTENA: float = 30.0
     API_SAFE_MODE: bool = True
+    ADMIN_API_KEYS: List[str] = []
     DATA_MAX_AGE_MINUTES: int = 5
+    HTTP_CACHE_CONTROL: str = "private, max-age=0, must-revalidate"
+    BUSCA_MAX_TICKERS: int = 500
+    HISTORICO_TAMANHO_BLOCO: int = 5000
+    HISTORICO_MAX_TICKERS: int = 500
+    INDICADORES_CACHE_CAPACIDADE: int = 5000
+    INDICADORES_MAX_POR_CONSULTA: int = 10
+    GRAFICO_COMPARATIVO_JANELAS: List[int] = [30, 90, 365]
+    ARMAZEM_PRECOS_ATIVO: bool = False
+    ARMAZEM_PRECOS_INTERVALO_SEGUNDOS: float = 30.0
     RATE_LIMIT_PER_MINUTE: int = 20
+    RATE_LIMIT_API_KEY_PER_MINUTE: int = 60
+    RATE_LIMIT_BACKEND: str = "memoria"
+    RATE_LIMIT_SQLITE_PATH: str = "rate_limit.sqlite3"
+
+    AUTH_CACHE_CAPACIDADE: int = 10000
+    AUTH_CACHE_TTL_SEGUNDOS: float = 60.0
+    AUTH_CACHE_TTL_NEGATIVO_SEGUNDOS: float = 10.0
+
+    LOGS_FILA_CAPACIDADE: int = 10000
+    LOGS_INTERVALO_MS: int = 500
+    LOGS_TAMANHO_LOTE: int = 500
+    LOGS_POLITICA_FILA: str = "descartar"
+    LOGS_TAXA_AMOSTRAGEM: int = 10
+    LOGS_RETENCAO_DIAS: int = 90
+    LOGS_MINUTO_RETENCAO_DIAS: int = 400
+    LOGS_PARTICOES_A_FRENTE: int = 2
+    LOGS_CONSOLIDACAO_ATRASO_SEGUNDOS: int = 120
+
+    METRICAS_DIR: str = ""
+    METRICAS_INTERVALO_SNAPSHOT_SEGUNDOS: float = 5.0
+    PERFIL_AMOSTRAGEM: int = 0
+    PERFIL_INTERVALO_MS: float = 2.0
+    PERFIL_CAPACIDADE: int = 50
+    PERFIL_MAX_SQL: int = 200
+
+    COLETA_BASE_URL: str = "https://statusinvest.com.br/acoes/"
+    COLETA_MAX_CONCORRENCIA: int = 16
+    COLETA_MAX_REQ_POR_SEGUNDO: float = 5.0
+    COLETA_MAX_TENTATIVAS: int = 3
+    COLETA_BACKOFF_SEGUNDOS: float = 0.5
+    COLETA_TIMEOUT_SEGUNDOS: float = 10.0
+    COLETA_MOTOR_EXTRACAO: str = "regex"
+    COLETA_PROCESSOS_EXTRACAO: int = 0
+    COLETA_INTRADAY_TOP_TICKERS: int = 50
+    COLETA_INTRADAY_TOP_INTERVALO_SEGUNDOS: int = 60
+    COLETA_INTRADAY_CAUDA_INTERVALO_SEGUNDOS: int = 3600
+    COLETA_INTRADAY_JITTER_SEGUNDOS: int = 10
+    COLETA_INTRADAY_JANELA_HORAS: int = 24
+    COLETA_INTRADAY_HORARIO: str = "10:00-18:30"
+    COLETA_SNAPSHOTS_RETENCAO_DIAS: int = 30
+    COLETA_FUSO_HORARIO: str = "America/Sao_Paulo"
 
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
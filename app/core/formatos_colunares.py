@@ -0,0 +1,152 @@
+"""
+Negociação de conteúdo e codificação colunar (Apache Arrow IPC / Parquet).
+
+Os endpoints de séries respondem JSON por padrão; com `Accept` pedindo Arrow ou
+Parquet, a resposta é montada direto dos vetores (NumPy / colunas do banco), sem
+passar por objetos por linha. `pyarrow` é opcional: sem ele, pedidos desses
+formatos recebem 406.
+"""
+from typing import Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Request, status
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORMATO_JSON = "json"
+FORMATO_ARROW = "arrow"
+FORMATO_PARQUET = "parquet"
+FORMATO_NDJSON = "ndjson"
+FORMATO_CSV = "csv"
+
+MIDIAS = {
+    FORMATO_JSON: "application/json",
+    FORMATO_ARROW: "application/vnd.apache.arrow.stream",
+    FORMATO_PARQUET: "application/vnd.apache.parquet",
+    FORMATO_NDJSON: "application/x-ndjson",
+    FORMATO_CSV: "text/csv; charset=utf-8",
+}
+_ALIASES = {
+    "application/json": FORMATO_JSON,
+    "application/vnd.apache.arrow.stream": FORMATO_ARROW,
+    "application/vnd.apache.arrow.file": FORMATO_ARROW,
+    "application/vnd.apache.parquet": FORMATO_PARQUET,
+    "application/x-parquet": FORMATO_PARQUET,
+    "application/x-ndjson": FORMATO_NDJSON,
+    "text/csv": FORMATO_CSV,
+}
+COLUNARES = (FORMATO_ARROW, FORMATO_PARQUET)
+
+def _aceitos(cabecalho: str) -> List[tuple]:
+    """Itens do Accept como (midia, q), na ordem de preferência do cliente."""
+    itens = []
+    for posicao, parte in enumerate(cabecalho.split(",")):
+        midia, *parametros = [p.strip() for p in parte.split(";")]
+        q = 1.0
+        for parametro in parametros:
+            if parametro.startswith("q="):
+                try:
+                    q = float(parametro[2:])
+                except ValueError:
+                    q = 0.0
+        if midia and q > 0:
+            itens.append((midia.lower(), q, posicao))
+    return [(m, q) for m, q, _ in sorted(itens, key=lambda i: (-i[1], i[2]))]
+
+def negociar_formato(request: Request, suportados: Sequence[str], formato: Optional[str] = None) -> str:
+    """
+    Formato da resposta: `formato` explícito (parâmetro de query) ou o melhor item do
+    Accept entre `suportados`; o primeiro suportado é o padrão para */* ou Accept vazio.
+    """
+    padrao = suportados[0]
+    if formato is None:
+        cabecalho = request.headers.get("accept", "")
+        formato = padrao if not cabecalho.strip() else None
+        for midia, _ in _aceitos(cabecalho):
+            if midia in ("*/*", "application/*"):
+                formato = padrao
+            else:
+                formato = _ALIASES.get(midia) if _ALIASES.get(midia) in suportados else None
+            if formato is not None:
+                break
+    if formato not in suportados:
+        aceitos = ", ".join(MIDIAS[f].split(";")[0] for f in suportados)
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=f"Formatos disponíveis: {aceitos}.")
+    if formato in COLUNARES and pa is None:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail="Formatos Arrow/Parquet indisponíveis: pyarrow não está instalado.")
+    return formato
+
+def montar_tabela(colunas: Dict[str, object], schema=None):
+    """Tabela Arrow a partir de vetores NumPy ou listas por coluna."""
+    if schema is None:
+        return pa.table(colunas)
+    return pa.table({campo.name: pa.array(colunas[campo.name], type=campo.type) for campo in schema}, schema=schema)
+
+def ler_stream(dados: bytes):
+    """Tabela de um Arrow IPC stream gerado por `serializar_tabela` (sem copiar os buffers)."""
+    return pa.ipc.open_stream(pa.py_buffer(dados)).read_all()
+
+def serializar_tabela(tabela, formato: str) -> bytes:
+    sink = pa.BufferOutputStream()
+    if formato == FORMATO_ARROW:
+        with pa.ipc.new_stream(sink, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    else:
+        pq.write_table(tabela, sink)
+    return sink.getvalue().to_pybytes()
+
+class _Acumulador:
+    """Arquivo de escrita que guarda os bytes até o próximo `drenar`, para streaming."""
+    closed = False
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicao = 0
+
+    def write(self, dados) -> int:
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+class EscritorIncremental:
+    """
+    Escreve blocos de linhas (um record batch / row group por bloco) e devolve os
+    bytes produzidos a cada chamada, para ir direto para uma StreamingResponse.
+    """
+    def __init__(self, schema, formato: str):
+        self.schema = schema
+        self._tipo_linha = pa.struct(list(schema))
+        self._saida = _Acumulador()
+        if formato == FORMATO_ARROW:
+            self._escritor = pa.ipc.new_stream(self._saida, schema)
+        else:
+            self._escritor = pq.ParquetWriter(self._saida, schema)
+
+    def escrever(self, linhas: Sequence[Sequence]) -> bytes:
+        """Linhas na ordem do schema; a separação em colunas é feita pelo Arrow, sem transpor em Python."""
+        vetor = pa.array([tuple(linha) for linha in linhas], type=self._tipo_linha)
+        self._escritor.write_batch(pa.RecordBatch.from_struct_array(vetor))
+        return self._saida.drenar()
+
+    def fechar(self) -> bytes:
+        self._escritor.close()
+        return self._saida.drenar()
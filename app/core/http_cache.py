@@ -0,0 +1,78 @@
+"""
+GET condicional (ETag / Last-Modified) para os endpoints de dados de mercado.
+
+Os endpoints calculam um validador barato (versão dos dados, data de referência)
+antes de montar o payload; se o cliente já tem essa versão, a resposta é um 304
+sem corpo. `Cache-Control` vem de HTTP_CACHE_CONTROL para que um proxy reverso
+também possa guardar as respostas.
+"""
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+from app.core.security import API_KEY_NAME
+
+def montar_etag(*partes) -> str:
+    """ETag forte a partir das partes que identificam a representação."""
+    chave = "|".join(str(p) for p in partes)
+    return f'"{hashlib.sha1(chave.encode()).hexdigest()[:20]}"'
+
+def modificado_ate_hoje(atualizado_em: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """
+    Last-Modified de respostas que dependem da data de hoje (janelas até hoje, dados
+    desatualizados viram 404): no mínimo a meia-noite local, para um If-Modified-Since
+    de ontem não receber 304. Em UTC sem fuso, como os TIMESTAMPs do banco.
+    """
+    meia_noite = datetime.datetime.combine(datetime.date.today(), datetime.time.min).astimezone(datetime.timezone.utc)
+    meia_noite = meia_noite.replace(tzinfo=None)
+    return meia_noite if atualizado_em is None else max(atualizado_em, meia_noite)
+
+def _utc(momento: datetime.datetime) -> datetime.datetime:
+    """Os TIMESTAMPs do banco são gravados em UTC sem fuso."""
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=datetime.timezone.utc)
+    return momento.astimezone(datetime.timezone.utc).replace(microsecond=0)
+
+def _etag_confere(cabecalho: str, etag: str) -> bool:
+    if cabecalho.strip() == "*":
+        return True
+    # If-None-Match usa comparação fraca: W/"x" equivale a "x".
+    candidatos = [c.strip().removeprefix("W/") for c in cabecalho.split(",")]
+    return etag in candidatos
+
+def _nao_modificado(request: Request, etag: str, ultima_modificacao: Optional[datetime.datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_confere(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and ultima_modificacao is not None:
+        try:
+            desde = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if desde.tzinfo is None:
+            desde = desde.replace(tzinfo=datetime.timezone.utc)
+        return _utc(ultima_modificacao) <= desde
+    return False
+
+def _cabecalhos(etag: str, ultima_modificacao: Optional[datetime.datetime]) -> dict:
+    cabecalhos = {"ETag": etag, "Cache-Control": settings.HTTP_CACHE_CONTROL, "Vary": f"{API_KEY_NAME}, Accept"}
+    if ultima_modificacao is not None:
+        cabecalhos["Last-Modified"] = format_datetime(_utc(ultima_modificacao), usegmt=True)
+    return cabecalhos
+
+def resposta_condicional(request: Request, response: Response, etag: str,
+                         ultima_modificacao: Optional[datetime.datetime] = None) -> Optional[Response]:
+    """
+    Devolve um 304 pronto quando o cliente já tem a representação; caso contrário,
+    grava os validadores em `response` e devolve None para o endpoint seguir.
+    """
+    cabecalhos = _cabecalhos(etag, ultima_modificacao)
+    if _nao_modificado(request, etag, ultima_modificacao):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabecalhos)
+    response.headers.update(cabecalhos)
+    return None
@@ -0,0 +1,52 @@
+"""
+Resposta JSON codificada com orjson.
+
+É a classe de resposta padrão da API: o conteúdo que o FastAPI já validou contra o
+`response_model` passa a ser serializado pelo orjson em vez do `json` da biblioteca
+padrão, com a mesma saída. Os endpoints de payload grande podem ainda devolver
+`RespostaJSONRapida(modelo)` diretamente, pulando a revalidação do `response_model`;
+nesse caso os `Decimal` são codificados conforme `decimais`:
+
+* "float": número JSON (opcionalmente arredondado em `casas`);
+* "texto": string, como o pydantic faz (com `casas` fixas, se informado).
+"""
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+DECIMAIS_FLOAT = "float"
+DECIMAIS_TEXTO = "texto"
+
+class RespostaJSONRapida(JSONResponse):
+    media_type = "application/json"
+
+    def __init__(self, content: Any, *, decimais: str = DECIMAIS_TEXTO, casas: Optional[int] = None, **kwargs):
+        if decimais not in (DECIMAIS_FLOAT, DECIMAIS_TEXTO):
+            raise ValueError(f"Modo de decimais inválido: {decimais}")
+        self.decimais = decimais
+        self.casas = casas
+        super().__init__(content, **kwargs)
+
+    def _padrao(self, valor: Any) -> Any:
+        if isinstance(valor, Decimal):
+            if self.decimais == DECIMAIS_FLOAT:
+                return float(valor) if self.casas is None else round(float(valor), self.casas)
+            return str(valor) if self.casas is None else f"{valor:.{self.casas}f}"
+        if isinstance(valor, BaseModel):
+            if self.decimais == DECIMAIS_TEXTO and self.casas is None:
+                return valor.model_dump(mode="json")
+            return valor.model_dump()
+        raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=self._padrao, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+class RespostaJSONPronta(JSONResponse):
+    """Corpo já serializado (ex.: artefato JSON guardado no banco), enviado sem recodificar."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content.encode("utf-8") if isinstance(content, str) else content
@@ -0,0 +1,167 @@
+"""
+Gravação assíncrona e em lote dos logs de requisição (`logs_requisicoes`).
+
+O middleware só enfileira um dicionário em memória; uma thread de fundo esvazia a
+fila a cada LOGS_INTERVALO_MS ou quando LOGS_TAMANHO_LOTE linhas se acumulam e grava
+tudo com um único INSERT em lote (na partição do mês, ver app/db/logs_particionados.py).
+A fila é limitada: quando cheia, novas entradas são descartadas ("descartar") ou, a
+partir da metade da capacidade, só 1 a cada LOGS_TAXA_AMOSTRAGEM é aceita
+("amostrar"). Descartes (por motivo), gravações e o tamanho da fila vão para o `/metrics`.
+"""
+import datetime
+import logging
+import threading
+from collections import deque
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from app.core import metricas
+from app.core.config import settings
+from app.core.auth_cache import cache_chaves_api, AUSENTE
+from app.db import logs_particionados, models
+from app.db.database import SessionLocal
+
+class GravadorLogs:
+    def __init__(self, capacidade: int, intervalo_ms: int, tamanho_lote: int,
+                 politica: str = "descartar", taxa_amostragem: int = 10):
+        if politica not in ("descartar", "amostrar"):
+            raise ValueError(f"Política de fila inválida: '{politica}'. Use 'descartar' ou 'amostrar'.")
+        self.capacidade = capacidade
+        self.intervalo = intervalo_ms / 1000
+        self.tamanho_lote = tamanho_lote
+        self.politica = politica
+        self.taxa_amostragem = max(1, taxa_amostragem)
+        self._fila = deque()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._contador_amostragem = 0
+        self.descartados = 0
+        self.gravados = 0
+        self.falhas_gravacao = 0
+
+    def registrar(self, method: str, endpoint: str, status_code: int, response_time_ms: int,
+                  api_key: Optional[str] = None) -> bool:
+        """Enfileira um log de requisição. Nunca bloqueia nem acessa o banco."""
+        with self._lock:
+            tamanho = len(self._fila)
+            if tamanho >= self.capacidade:
+                self.descartados += 1
+                metricas.logs_descartados.incrementar("fila_cheia")
+                return False
+            if self.politica == "amostrar" and tamanho >= self.capacidade // 2:
+                self._contador_amostragem += 1
+                if self._contador_amostragem % self.taxa_amostragem:
+                    self.descartados += 1
+                    metricas.logs_descartados.incrementar("amostragem")
+                    return False
+            self._fila.append({
+                "api_key": api_key,
+                "method": method,
+                "endpoint": endpoint,
+                "status_code": status_code,
+                "response_time_ms": response_time_ms,
+                "timestamp": datetime.datetime.utcnow(),
+            })
+        if tamanho + 1 >= self.tamanho_lote:
+            self._acordar.set()
+        return True
+
+    def _retirar_lote(self) -> List[dict]:
+        with self._lock:
+            quantidade = min(len(self._fila), self.tamanho_lote)
+            return [self._fila.popleft() for _ in range(quantidade)]
+
+    def _resolver_usuarios(self, db, api_keys: set) -> dict:
+        usuarios = {}
+        pendentes = set()
+        for api_key in api_keys:
+            usuario = cache_chaves_api.obter(api_key)
+            if usuario is AUSENTE:
+                pendentes.add(api_key)
+            elif usuario is not None:
+                usuarios[api_key] = usuario.id
+        if pendentes:
+            stmt = select(models.Usuario).where(models.Usuario.api_key.in_(pendentes))
+            encontrados = {u.api_key: u for u in db.execute(stmt).scalars()}
+            for api_key in pendentes:
+                usuario = encontrados.get(api_key)
+                cache_chaves_api.armazenar(api_key, usuario)
+                if usuario is not None:
+                    usuarios[api_key] = usuario.id
+        return usuarios
+
+    def _gravar(self, lote: List[dict]):
+        db = SessionLocal()
+        try:
+            usuarios = self._resolver_usuarios(db, {e["api_key"] for e in lote if e["api_key"]})
+            linhas = []
+            for entrada in lote:
+                linha = dict(entrada)
+                linha["usuario_id"] = usuarios.get(linha.pop("api_key"))
+                linhas.append(linha)
+            logs_particionados.inserir(db.connection(), linhas)
+            db.commit()
+            self.gravados += len(lote)
+            metricas.logs_gravados.incrementar("sucesso", valor=len(lote))
+        except Exception as e:
+            logging.error(f"Erro ao salvar {len(lote)} logs no banco de dados: {e}")
+            db.rollback()
+            logs_particionados.invalidar_cache()
+            self.falhas_gravacao += len(lote)
+            metricas.logs_gravados.incrementar("falha", valor=len(lote))
+        finally:
+            db.close()
+
+    def descarregar(self):
+        """Grava tudo o que está na fila no momento da chamada."""
+        while True:
+            lote = self._retirar_lote()
+            if not lote:
+                return
+            self._gravar(lote)
+
+    def _executar(self):
+        while not self._parar.is_set():
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            self.descarregar()
+        self.descarregar()
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="gravador-logs", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = 10.0):
+        """Interrompe a thread de fundo após gravar o que restou na fila."""
+        self._parar.set()
+        self._acordar.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.descartados:
+            logging.warning(f"Gravador de logs encerrado com {self.descartados} logs descartados por fila cheia.")
+
+    def estatisticas(self) -> dict:
+        return {
+            "pendentes": len(self._fila),
+            "gravados": self.gravados,
+            "descartados": self.descartados,
+            "falhas_gravacao": self.falhas_gravacao,
+        }
+
+gravador_logs = GravadorLogs(
+    capacidade=settings.LOGS_FILA_CAPACIDADE,
+    intervalo_ms=settings.LOGS_INTERVALO_MS,
+    tamanho_lote=settings.LOGS_TAMANHO_LOTE,
+    politica=settings.LOGS_POLITICA_FILA,
+    taxa_amostragem=settings.LOGS_TAXA_AMOSTRAGEM,
+)
+
+metricas.registro_metricas.medidor(
+    "logs_requisicoes_fila", "Logs de requisição aguardando gravação.", lambda: len(gravador_logs._fila))
@@ -0,0 +1,289 @@
+"""
+Métricas em memória (histogramas e contadores) expostas no formato texto do Prometheus.
+
+O middleware registra a latência de cada requisição por template de rota, método e
+status, e o tempo de banco e a quantidade de consultas da requisição, acumulados
+pelos eventos `before/after_cursor_execute` dos engines em uma ContextVar. O coletor
+registra a duração de cada etapa. Registrar uma observação é uma busca binária no
+vetor de limites e um incremento sob um lock, sem I/O.
+
+Vários workers do uvicorn: com METRICAS_DIR configurado, cada processo grava
+periodicamente um snapshot (`metricas_<pid>_<início>.json`) nesse diretório, e o
+`/metrics` de qualquer worker soma os snapshots de todos, inclusive de processos
+que já terminaram (os contadores continuam monotônicos) e do coletor. Medidores
+(valores instantâneos, como o tamanho de uma fila) só entram na soma enquanto o
+snapshot do processo é recente. O diretório deve ser esvaziado a cada deploy.
+"""
+import bisect
+import contextvars
+import glob
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+LIMITES_COLETOR = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str], limites: Sequence[float]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(float(l) for l in limites)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *rotulos):
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"limites": self.limites, "series": [[list(r), list(c), s] for r, (c, s) in self._series.items()]}
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *rotulos, valor: float = 1.0):
+        with self._lock:
+            self._series[rotulos] = self._series.get(rotulos, 0.0) + valor
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"series": [[list(r), v] for r, v in self._series.items()]}
+
+class Medidor:
+    """Valor instantâneo, lido de `leitura` no momento do snapshot."""
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, leitura: Callable[[], float]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = ()
+        self.leitura = leitura
+
+    def snapshot(self) -> dict:
+        return {"series": [[[], float(self.leitura())]], "instante": time.time()}
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence, extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+def _formatar_numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas: Dict[str, object] = {}
+        self._inicio = int(time.time())
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+
+    def histograma(self, nome: str, ajuda: str, rotulos: Sequence[str], limites: Sequence[float]) -> Histograma:
+        return self._metricas.setdefault(nome, Histograma(nome, ajuda, rotulos, limites))
+
+    def contador(self, nome: str, ajuda: str, rotulos: Sequence[str]) -> Contador:
+        return self._metricas.setdefault(nome, Contador(nome, ajuda, rotulos))
+
+    def medidor(self, nome: str, ajuda: str, leitura: Callable[[], float]) -> Medidor:
+        return self._metricas.setdefault(nome, Medidor(nome, ajuda, leitura))
+
+    def snapshot(self) -> dict:
+        return {nome: m.snapshot() for nome, m in self._metricas.items()}
+
+    # --- Vários processos ---------------------------------------------------------
+
+    def _arquivo(self) -> Optional[str]:
+        if not settings.METRICAS_DIR:
+            return None
+        return os.path.join(settings.METRICAS_DIR, f"metricas_{os.getpid()}_{self._inicio}.json")
+
+    def gravar_snapshot(self):
+        arquivo = self._arquivo()
+        if arquivo is None:
+            return
+        try:
+            os.makedirs(settings.METRICAS_DIR, exist_ok=True)
+            temporario = f"{arquivo}.tmp"
+            with open(temporario, "wb") as f:
+                f.write(orjson.dumps(self.snapshot()))
+            os.replace(temporario, arquivo)
+        except OSError as e:
+            logging.error(f"Erro ao gravar o snapshot de métricas: {e}")
+
+    def _snapshots(self) -> List[dict]:
+        """Snapshot deste processo (atual) e os gravados pelos demais."""
+        proprio = self._arquivo()
+        snapshots = [self.snapshot()]
+        if proprio is None:
+            return snapshots
+        for arquivo in glob.glob(os.path.join(settings.METRICAS_DIR, "metricas_*.json")):
+            if arquivo == proprio:
+                continue
+            try:
+                with open(arquivo, "rb") as f:
+                    snapshots.append(orjson.loads(f.read()))
+            except (OSError, orjson.JSONDecodeError):
+                continue
+        return snapshots
+
+    def _executar(self):
+        while not self._parar.wait(settings.METRICAS_INTERVALO_SNAPSHOT_SEGUNDOS):
+            self.gravar_snapshot()
+        self.gravar_snapshot()
+
+    def iniciar(self):
+        if self._arquivo() is None or (self._thread and self._thread.is_alive()):
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="snapshot-metricas", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    # --- Exposição ----------------------------------------------------------------
+
+    def exportar(self) -> str:
+        """Texto no formato de exposição do Prometheus, somando os snapshots de todos os processos."""
+        snapshots = self._snapshots()
+        linhas = []
+        for nome, metrica in self._metricas.items():
+            linhas.append(f"# HELP {nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {nome} {metrica.tipo}")
+            if isinstance(metrica, Histograma):
+                linhas.extend(self._exportar_histograma(metrica, [s.get(nome) for s in snapshots]))
+            elif isinstance(metrica, Medidor):
+                # Snapshot parado há mais de dois intervalos = processo encerrado; o valor não vale mais.
+                limite = time.time() - 2 * settings.METRICAS_INTERVALO_SNAPSHOT_SEGUNDOS
+                recentes = [s.get(nome) for s in snapshots if s.get(nome, {}).get("instante", 0) >= limite]
+                linhas.extend(self._exportar_contador(metrica, recentes))
+            else:
+                linhas.extend(self._exportar_contador(metrica, [s.get(nome) for s in snapshots]))
+        return "\n".join(linhas) + "\n"
+
+    def _exportar_histograma(self, metrica: Histograma, partes: List[Optional[dict]]) -> List[str]:
+        somados: Dict[tuple, Tuple[List[int], float]] = {}
+        for parte in partes:
+            if not parte or tuple(parte["limites"]) != metrica.limites:
+                continue
+            for rotulos, contagens, soma in parte["series"]:
+                atual = somados.setdefault(tuple(rotulos), ([0] * len(contagens), 0.0))
+                somados[tuple(rotulos)] = ([a + c for a, c in zip(atual[0], contagens)], atual[1] + soma)
+        linhas = []
+        for rotulos in sorted(somados, key=lambda r: tuple(map(str, r))):
+            contagens, soma = somados[rotulos]
+            acumulado = 0
+            for limite, contagem in zip((*metrica.limites, "+Inf"), contagens):
+                acumulado += contagem
+                le = 'le="{}"'.format(limite if limite == "+Inf" else _formatar_numero(limite))
+                linhas.append(f"{metrica.nome}_bucket{_formatar_rotulos(metrica.rotulos, rotulos, le)} {acumulado}")
+            linhas.append(f"{metrica.nome}_sum{_formatar_rotulos(metrica.rotulos, rotulos)} {_formatar_numero(soma)}")
+            linhas.append(f"{metrica.nome}_count{_formatar_rotulos(metrica.rotulos, rotulos)} {acumulado}")
+        return linhas
+
+    def _exportar_contador(self, metrica, partes: List[Optional[dict]]) -> List[str]:
+        somados: Dict[tuple, float] = {}
+        for parte in partes:
+            for rotulos, valor in (parte or {}).get("series", []):
+                somados[tuple(rotulos)] = somados.get(tuple(rotulos), 0.0) + valor
+        return [
+            f"{metrica.nome}{_formatar_rotulos(metrica.rotulos, rotulos)} {_formatar_numero(somados[rotulos])}"
+            for rotulos in sorted(somados, key=lambda r: tuple(map(str, r)))
+        ]
+
+registro_metricas = RegistroMetricas()
+
+requisicao_duracao = registro_metricas.histograma(
+    "api_requisicao_duracao_segundos", "Latência das requisições HTTP.", ("rota", "metodo", "status"), LIMITES_LATENCIA)
+requisicao_db_duracao = registro_metricas.histograma(
+    "api_requisicao_db_segundos", "Tempo gasto em consultas ao banco por requisição.", ("rota", "metodo"), LIMITES_LATENCIA)
+requisicao_consultas = registro_metricas.histograma(
+    "api_requisicao_consultas", "Consultas ao banco por requisição.", ("rota", "metodo"), LIMITES_CONSULTAS)
+coletor_duracao = registro_metricas.histograma(
+    "coletor_etapa_duracao_segundos", "Duração das etapas de cada execução do coletor.", ("etapa",), LIMITES_COLETOR)
+coletor_execucoes = registro_metricas.contador(
+    "coletor_execucoes_total", "Execuções do coletor por resultado.", ("resultado",))
+coletor_tickers = registro_metricas.contador(
+    "coletor_tickers_total", "Tickers processados pelo coletor por resultado.", ("resultado",))
+logs_descartados = registro_metricas.contador(
+    "logs_requisicoes_descartados_total", "Logs de requisição descartados pela fila do gravador, por motivo.", ("motivo",))
+logs_gravados = registro_metricas.contador(
+    "logs_requisicoes_gravados_total", "Logs de requisição enviados ao banco por resultado.", ("resultado",))
+auth_cache_consultas = registro_metricas.contador(
+    "auth_cache_consultas_total", "Consultas ao cache de chaves de API por resultado (acerto/falha).", ("resultado",))
+
+# --- Tempo de banco por requisição -----------------------------------------------
+
+class ConsultasRequisicao:
+    __slots__ = ("tempo", "quantidade", "comandos")
+
+    def __init__(self):
+        self.tempo = 0.0
+        self.quantidade = 0
+        self.comandos: Optional[list] = None  # (sql, início, duração); só em requisições perfiladas
+
+consultas_requisicao: contextvars.ContextVar[Optional[ConsultasRequisicao]] = contextvars.ContextVar("consultas_requisicao", default=None)
+
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get("inicio_consultas")
+    if not inicios:
+        return
+    inicio = inicios.pop()
+    duracao = time.perf_counter() - inicio
+    acumulado = consultas_requisicao.get()
+    if acumulado is not None:
+        acumulado.tempo += duracao
+        acumulado.quantidade += 1
+        if acumulado.comandos is not None:
+            acumulado.comandos.append((statement, inicio, duracao))
+
+def _consulta_com_erro(contexto_excecao):
+    conexao = contexto_excecao.connection
+    if conexao is not None and conexao.info.get("inicio_consultas"):
+        _depois_da_consulta(conexao, None, None, None, None, False)
+
+def instrumentar_engine(engine: Engine):
+    """Acumula tempo e quantidade de consultas na requisição corrente (engines síncronos ou `async_engine.sync_engine`)."""
+    event.listen(engine, "before_cursor_execute", _antes_da_consulta)
+    event.listen(engine, "after_cursor_execute", _depois_da_consulta)
+    event.listen(engine, "handle_error", _consulta_com_erro)
+
+def rota_da_requisicao(scope: dict) -> str:
+    """Template da rota (`/api/v1/acoes/{ticker}`); requisições sem rota caem em um rótulo único."""
+    rota = scope.get("route")
+    return getattr(rota, "path", None) or "<sem rota>"
@@ -0,0 +1,191 @@
+"""
+Perfis de requisições individuais, sob demanda.
+
+Uma requisição é perfilada quando traz o cabeçalho `X-Perfil: 1` com uma chave de
+ADMIN_API_KEYS (qualquer chave com API_SAFE_MODE desligado) ou, com PERFIL_AMOSTRAGEM
+= N > 0, uma a cada N requisições. Enquanto ela roda, uma thread amostra a pilha da
+thread do event loop a cada PERFIL_INTERVALO_MS, e também a das threads do threadpool
+que rodam código da requisição dentro de `perfilador.thread_auxiliar()`, e os comandos
+SQL são registrados com início e duração pelos mesmos eventos de `app.core.metricas`. Como a amostragem é da thread,
+requisições concorrentes aparecem no mesmo perfil; só um perfil roda por vez por worker.
+
+Os perfis ficam em um buffer circular de PERFIL_CAPACIDADE itens por worker e saem em
+pilhas colapsadas (`quadro;quadro;quadro contagem`), o formato do flamegraph.pl e do
+speedscope. Desativado (sem amostragem e sem chaves de admin), o custo é uma checagem
+de booleano por requisição.
+"""
+import datetime
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.metricas import ConsultasRequisicao
+from app.core.security import eh_chave_admin
+
+CABECALHO = "x-perfil"
+
+def _nome_quadro(frame) -> str:
+    codigo = frame.f_code
+    arquivo = os.path.join(*codigo.co_filename.split(os.sep)[-2:]) if codigo.co_filename else "?"
+    return f"{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})".replace(";", ",")
+
+def _pilha_colapsada(frame) -> str:
+    quadros = []
+    while frame is not None:
+        quadros.append(_nome_quadro(frame))
+        frame = frame.f_back
+    return ";".join(reversed(quadros))
+
+class _Amostrador(threading.Thread):
+    def __init__(self, thread_id: int, intervalo: float):
+        super().__init__(name="amostrador-perfil", daemon=True)
+        self.threads = {thread_id}
+        self.intervalo = intervalo
+        self.pilhas: Counter = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            frames = sys._current_frames()
+            for thread_id in list(self.threads):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.pilhas[_pilha_colapsada(frame)] += 1
+
+    def parar(self) -> Counter:
+        self._parar.set()
+        self.join()
+        return self.pilhas
+
+class PerfilEmAndamento:
+    __slots__ = ("motivo", "inicio", "inicio_relogio", "consultas", "amostrador")
+
+    def __init__(self, motivo: str, consultas: ConsultasRequisicao):
+        self.motivo = motivo
+        self.inicio = time.perf_counter()
+        self.inicio_relogio = datetime.datetime.utcnow()
+        self.consultas = consultas
+        consultas.comandos = []
+        self.amostrador = _Amostrador(threading.get_ident(), settings.PERFIL_INTERVALO_MS / 1000)
+        self.amostrador.start()
+
+class Perfilador:
+    def __init__(self):
+        self.habilitado = bool(settings.PERFIL_AMOSTRAGEM > 0 or settings.ADMIN_API_KEYS or not settings.API_SAFE_MODE)
+        self._requisicoes = itertools.count(1)
+        self._ids = itertools.count(1)
+        self._ocupado = threading.Lock()
+        self._atual: Optional[PerfilEmAndamento] = None
+        self._perfis: deque = deque(maxlen=settings.PERFIL_CAPACIDADE)
+        self._lock = threading.Lock()
+
+    def _motivo(self, request: Request) -> Optional[str]:
+        if request.headers.get(CABECALHO) in ("1", "true") and (
+            not settings.API_SAFE_MODE or eh_chave_admin(request.headers.get("x-api-key"))
+        ):
+            return "cabecalho"
+        if settings.PERFIL_AMOSTRAGEM > 0 and next(self._requisicoes) % settings.PERFIL_AMOSTRAGEM == 0:
+            return "amostragem"
+        return None
+
+    def iniciar(self, request: Request, consultas: ConsultasRequisicao) -> Optional[PerfilEmAndamento]:
+        motivo = self._motivo(request)
+        if motivo is None or not self._ocupado.acquire(blocking=False):
+            return None
+        try:
+            self._atual = PerfilEmAndamento(motivo, consultas)
+            return self._atual
+        except Exception:
+            self._ocupado.release()
+            raise
+
+    def finalizar(self, perfil: PerfilEmAndamento, request: Request, rota: str, status_code: int) -> int:
+        """Encerra a amostragem, guarda o perfil no buffer e devolve o seu id."""
+        try:
+            self._atual = None
+            pilhas = perfil.amostrador.parar()
+        finally:
+            self._ocupado.release()
+        duracao = time.perf_counter() - perfil.inicio
+        comandos = perfil.consultas.comandos or []
+        perfil.consultas.comandos = None
+        registro = {
+            "id": next(self._ids),
+            "timestamp": perfil.inicio_relogio,
+            "motivo": perfil.motivo,
+            "metodo": request.method,
+            "caminho": request.url.path,
+            "query": request.url.query,
+            "rota": rota,
+            "status_code": status_code,
+            "duracao_ms": round(duracao * 1000, 3),
+            "amostras": sum(pilhas.values()),
+            "intervalo_ms": settings.PERFIL_INTERVALO_MS,
+            "sql_total_ms": round(sum(d for _, _, d in comandos) * 1000, 3),
+            "sql_quantidade": len(comandos),
+            "sql": [
+                {"inicio_ms": round((inicio - perfil.inicio) * 1000, 3), "duracao_ms": round(d * 1000, 3), "sql": sql}
+                for sql, inicio, d in comandos[:settings.PERFIL_MAX_SQL]
+            ],
+            "pilhas": dict(pilhas),
+        }
+        with self._lock:
+            self._perfis.append(registro)
+        return registro["id"]
+
+    @contextmanager
+    def thread_auxiliar(self):
+        """Inclui a thread corrente na amostragem do perfil em andamento, se houver, durante o bloco."""
+        perfil = self._atual
+        if perfil is None:
+            yield
+            return
+        thread_id = threading.get_ident()
+        perfil.amostrador.threads.add(thread_id)
+        try:
+            yield
+        finally:
+            perfil.amostrador.threads.discard(thread_id)
+
+    def listar(self) -> List[dict]:
+        with self._lock:
+            perfis = list(self._perfis)
+        return [{k: v for k, v in p.items() if k not in ("sql", "pilhas")} for p in reversed(perfis)]
+
+    def obter(self, perfil_id: int) -> Optional[dict]:
+        with self._lock:
+            return next((p for p in self._perfis if p["id"] == perfil_id), None)
+
+    def colapsado(self, perfil_id: Optional[int] = None, rota: Optional[str] = None) -> Optional[str]:
+        """
+        Pilhas colapsadas de um perfil ou, sem id, de todos os guardados (filtrados pela
+        rota), com o método e a rota como quadro raiz.
+        """
+        if perfil_id is not None:
+            perfil = self.obter(perfil_id)
+            if perfil is None:
+                return None
+            pilhas: Dict[str, int] = perfil["pilhas"]
+        else:
+            with self._lock:
+                perfis = [p for p in self._perfis if rota is None or p["rota"] == rota]
+            pilhas = Counter()
+            for p in perfis:
+                raiz = f"{p['metodo']} {p['rota']}".replace(";", ",")
+                for pilha, contagem in p["pilhas"].items():
+                    pilhas[f"{raiz};{pilha}"] += contagem
+        return "".join(f"{pilha} {contagem}\n" for pilha, contagem in sorted(pilhas.items()))
+
+    def limpar(self):
+        with self._lock:
+            self._perfis.clear()
+
+perfilador = Perfilador()
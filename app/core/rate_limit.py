@@ -0,0 +1,160 @@
+"""
+Rate limiting por janela deslizante aproximada (sliding window counter).
+
+Para cada chave guarda apenas a contagem da janela atual e da anterior; a estimativa
+é `anterior * (fração restante da janela anterior) + atual`, O(1) por requisição.
+Os limites valem por IP e por chave de API. Backends:
+
+* "memoria": dicionário no processo, com remoção periódica de chaves ociosas;
+* "sqlite": arquivo SQLite compartilhado (WAL) para o limite valer entre workers.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+
+JANELA_SEGUNDOS = 60
+
+@dataclass
+class ResultadoLimite:
+    permitido: bool
+    limite: int
+    restante: int
+    reset_em: int
+
+def _avaliar(anterior: int, atual: int, agora: float, janela: int) -> tuple:
+    decorrido = (agora % janela) / janela
+    estimado = anterior * (1 - decorrido) + atual
+    return estimado, math.ceil(janela - (agora % janela))
+
+class BackendMemoria:
+    def __init__(self, intervalo_limpeza: float = JANELA_SEGUNDOS):
+        self._contadores = {}
+        self._lock = threading.Lock()
+        self._intervalo_limpeza = intervalo_limpeza
+        self._proxima_limpeza = time.monotonic() + intervalo_limpeza
+
+    def _limpar(self, janela_atual: int):
+        ociosas = [chave for chave, (janela, _, _) in self._contadores.items() if janela < janela_atual - 1]
+        for chave in ociosas:
+            del self._contadores[chave]
+
+    def consumir(self, chave: str, limite: int, janela: int = JANELA_SEGUNDOS) -> ResultadoLimite:
+        agora = time.time()
+        indice = int(agora // janela)
+        with self._lock:
+            if time.monotonic() >= self._proxima_limpeza:
+                self._limpar(indice)
+                self._proxima_limpeza = time.monotonic() + self._intervalo_limpeza
+            janela_salva, anterior, atual = self._contadores.get(chave, (indice, 0, 0))
+            if janela_salva != indice:
+                anterior = atual if janela_salva == indice - 1 else 0
+                atual = 0
+            estimado, reset_em = _avaliar(anterior, atual, agora, janela)
+            permitido = estimado < limite
+            if permitido:
+                atual += 1
+                estimado += 1
+            self._contadores[chave] = (indice, anterior, atual)
+        return ResultadoLimite(permitido, limite, max(0, int(limite - estimado)), reset_em)
+
+    def __len__(self):
+        return len(self._contadores)
+
+class BackendSQLite:
+    """Contadores em um arquivo SQLite local, compartilhado por todos os workers da máquina."""
+    def __init__(self, caminho: str, intervalo_limpeza: float = JANELA_SEGUNDOS):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._intervalo_limpeza = intervalo_limpeza
+        self._proxima_limpeza = 0.0
+        conn = self._conexao()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit ("
+            "chave TEXT NOT NULL, janela INTEGER NOT NULL, contagem INTEGER NOT NULL, "
+            "PRIMARY KEY (chave, janela)) WITHOUT ROWID"
+        )
+
+    def _conexao(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def consumir(self, chave: str, limite: int, janela: int = JANELA_SEGUNDOS) -> ResultadoLimite:
+        agora = time.time()
+        indice = int(agora // janela)
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            contagens = dict(conn.execute(
+                "SELECT janela, contagem FROM rate_limit WHERE chave = ? AND janela IN (?, ?)",
+                (chave, indice - 1, indice),
+            ).fetchall())
+            estimado, reset_em = _avaliar(contagens.get(indice - 1, 0), contagens.get(indice, 0), agora, janela)
+            permitido = estimado < limite
+            if permitido:
+                conn.execute(
+                    "INSERT INTO rate_limit (chave, janela, contagem) VALUES (?, ?, 1) "
+                    "ON CONFLICT (chave, janela) DO UPDATE SET contagem = contagem + 1",
+                    (chave, indice),
+                )
+                estimado += 1
+            if time.monotonic() >= self._proxima_limpeza:
+                conn.execute("DELETE FROM rate_limit WHERE janela < ?", (indice - 1,))
+                self._proxima_limpeza = time.monotonic() + self._intervalo_limpeza
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return ResultadoLimite(permitido, limite, max(0, int(limite - estimado)), reset_em)
+
+def criar_backend(nome: str):
+    if nome == "memoria":
+        return BackendMemoria()
+    if nome == "sqlite":
+        return BackendSQLite(settings.RATE_LIMIT_SQLITE_PATH)
+    raise ValueError(f"Backend de rate limit desconhecido: '{nome}'. Use 'memoria' ou 'sqlite'.")
+
+backend_rate_limit = criar_backend(settings.RATE_LIMIT_BACKEND)
+
+def cabecalhos_rate_limit(resultado: ResultadoLimite) -> dict:
+    cabecalhos = {
+        "X-RateLimit-Limit": str(resultado.limite),
+        "X-RateLimit-Remaining": str(resultado.restante),
+        "X-RateLimit-Reset": str(resultado.reset_em),
+    }
+    if not resultado.permitido:
+        cabecalhos["Retry-After"] = str(resultado.reset_em)
+    return cabecalhos
+
+def rate_limit_dependency(request: Request):
+    """
+    Aplica os limites por IP e por chave de API. O resultado mais restritivo fica em
+    `request.state.rate_limit` para o middleware incluir os cabeçalhos na resposta.
+    """
+    if not settings.API_SAFE_MODE:
+        return
+    resultados = [backend_rate_limit.consumir(f"ip:{request.client.host}", settings.RATE_LIMIT_PER_MINUTE)]
+    api_key = request.headers.get("x-api-key")
+    if api_key and settings.RATE_LIMIT_API_KEY_PER_MINUTE > 0:
+        resultados.append(backend_rate_limit.consumir(f"key:{api_key}", settings.RATE_LIMIT_API_KEY_PER_MINUTE))
+    bloqueado: Optional[ResultadoLimite] = next((r for r in resultados if not r.permitido), None)
+    resultado = bloqueado or min(resultados, key=lambda r: r.restante)
+    request.state.rate_limit = resultado
+    if bloqueado:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Limite de {bloqueado.limite} requisições por minuto atingido.",
+            headers=cabecalhos_rate_limit(bloqueado),
+        )
@@ -1,17 +1,30 @@
+import hmac
 from fastapi import Security, Depends, HTTPException, status
 from fastapi.security import APIKeyHeader
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
 from ..core.config import settings
+from ..core.auth_cache import cache_chaves_api, AUSENTE
 from ..db import models, database
 from sqlalchemy import select
 
 API_KEY_NAME = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 
+async def buscar_usuario_por_api_key(db: AsyncSession, api_key: str) -> Optional[models.Usuario]:
+    """Busca o usuário (ativo ou não) dono da chave, passando pelo cache em processo."""
+    usuario = cache_chaves_api.obter(api_key)
+    if usuario is not AUSENTE:
+        return usuario
+    stmt = select(models.Usuario).where(models.Usuario.api_key == api_key)
+    usuario = (await db.scalars(stmt)).first()
+    cache_chaves_api.armazenar(api_key, usuario)
+    return usuario
+
 async def get_current_user(
     api_key: str = Security(api_key_header),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ) -> models.Usuario:
     if not settings.API_SAFE_MODE:
         return models.Usuario(id=0, nome="dev_user", email="dev@test.com", api_key="dev_key", ativo=True)
@@ -22,12 +35,30 @@ async def get_current_user(
             detail="Chave de API (X-API-Key) não fornecida."
         )
         
-    stmt = select(models.Usuario).where(models.Usuario.api_key == api_key, models.Usuario.ativo == True)
-    user = db.scalars(stmt).first()
+    user = await buscar_usuario_por_api_key(db, api_key)
 
-    if user is None:
+    if user is None or not user.ativo:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Chave de API inválida ou usuário inativo."
         )
-    return user
\ No newline at end of file
+    return user
+
+
+def eh_chave_admin(api_key: Optional[str]) -> bool:
+    """Verdadeiro para chaves listadas em ADMIN_API_KEYS (comparação em tempo constante)."""
+    if not api_key:
+        return False
+    # Em bytes: compare_digest recusa str com caracteres fora do ASCII.
+    return any(hmac.compare_digest(api_key.encode(), chave.encode()) for chave in settings.ADMIN_API_KEYS)
+
+async def get_admin_user(
+    api_key: str = Security(api_key_header),
+    user: models.Usuario = Depends(get_current_user)
+) -> models.Usuario:
+    if settings.API_SAFE_MODE and not eh_chave_admin(api_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores."
+        )
+    return user
@@ -0,0 +1,209 @@
+"""
+Caminho de escrita em massa para `acoes_historico`.
+
+Grava em lotes de tamanho fixo (memória constante) e faz upsert na chave única
+(ticker, date), de modo que reexecutar uma coleta ou carga não duplica linhas:
+
+* PostgreSQL: COPY para uma tabela temporária + INSERT ... ON CONFLICT DO UPDATE;
+* SQLite: executemany de INSERT ... ON CONFLICT DO UPDATE.
+
+Os agregados, o registro da alteração e a versão do histórico são gravados na
+mesma transação do último lote; se um lote falhar, os anteriores (já confirmados)
+também são finalizados antes de o erro subir, para a versão nunca ficar para trás
+dos dados.
+"""
+import csv
+import io
+import math
+import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+import pandas as pd
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.models import HistoricoAcao, SnapshotAcao
+from app.db.rollups import atualizar_rollups
+from app.db.versoes import VERSAO_HISTORICO, incrementar_versao, registrar_alteracao_historico
+
+COLUNAS_HISTORICO = ["ticker", "date", "close", "variacao_percentual", "price_earnings",
+                     "dividend_yield", "roe", "market_value", "volume"]
+COLUNAS_ATUALIZAVEIS = [c for c in COLUNAS_HISTORICO if c not in ("ticker", "date")]
+TAMANHO_LOTE_PADRAO = 5000
+
+def _valor(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if hasattr(valor, "item"):
+        return _valor(valor.item())
+    return valor
+
+def _normalizar(registro: dict) -> dict:
+    linha = {coluna: _valor(registro.get(coluna)) for coluna in COLUNAS_HISTORICO}
+    linha["ticker"] = str(linha["ticker"]).strip().upper()
+    data = linha["date"]
+    if isinstance(data, datetime.datetime):
+        linha["date"] = data.date()
+    elif isinstance(data, str):
+        linha["date"] = datetime.date.fromisoformat(data[:10])
+    if linha["volume"] is not None:
+        linha["volume"] = int(linha["volume"])
+    return linha
+
+def em_lotes(registros: Iterable[dict], tamanho: int) -> Iterator[List[dict]]:
+    iterador = iter(registros)
+    while True:
+        lote = list(islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+def _upsert_sqlite(conn: Connection, lote: List[dict]):
+    stmt = sqlite_dialect.insert(HistoricoAcao.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["ticker", "date"],
+        set_={coluna: stmt.excluded[coluna] for coluna in COLUNAS_ATUALIZAVEIS},
+    )
+    conn.execute(stmt, lote)
+
+_SQL_TEMP_PG = """
+CREATE TEMP TABLE IF NOT EXISTS _carga_historico (
+    ordem BIGSERIAL, ticker TEXT, date DATE, close NUMERIC, variacao_percentual NUMERIC(6, 2),
+    price_earnings NUMERIC, dividend_yield NUMERIC, roe NUMERIC, market_value NUMERIC, volume BIGINT
+) ON COMMIT DELETE ROWS
+"""
+_SQL_COPY_PG = f"COPY _carga_historico ({', '.join(COLUNAS_HISTORICO)}) FROM STDIN WITH (FORMAT csv)"
+_SQL_UPSERT_PG = f"""
+INSERT INTO acoes_historico ({', '.join(COLUNAS_HISTORICO)})
+SELECT DISTINCT ON (ticker, date) {', '.join(COLUNAS_HISTORICO)}
+FROM _carga_historico
+ORDER BY ticker, date, ordem DESC
+ON CONFLICT (ticker, date) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in COLUNAS_ATUALIZAVEIS)}
+"""
+
+def _csv(lote: List[dict]) -> io.StringIO:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for linha in lote:
+        writer.writerow(["" if linha[c] is None else linha[c] for c in COLUNAS_HISTORICO])
+    buffer.seek(0)
+    return buffer
+
+def _upsert_postgres(conn: Connection, buffer_csv: io.StringIO):
+    """COPY pela conexão do driver, dentro da transação corrente de `conn`."""
+    with conn.connection.cursor() as cursor:
+        cursor.execute(_SQL_TEMP_PG)
+        cursor.copy_expert(_SQL_COPY_PG, buffer_csv)
+        cursor.execute(_SQL_UPSERT_PG)
+
+def _verificar_dialeto(engine: Engine):
+    if engine.dialect.name not in ("postgresql", "sqlite"):
+        raise NotImplementedError(f"Upsert em massa não suportado para o banco '{engine.dialect.name}'.")
+
+def _gravar_lote(conn: Connection, lote: List[dict]):
+    if conn.dialect.name == "postgresql":
+        _upsert_postgres(conn, _csv(lote))
+    else:
+        _upsert_sqlite(conn, lote)
+
+def upsert_historico(engine: Engine, registros: Iterable[dict], tamanho_lote: Optional[int] = None) -> int:
+    """
+    Grava `registros` (dicts com as colunas de acoes_historico) fazendo upsert em (ticker, date).
+    Cada lote é confirmado em sua própria transação; o último leva junto os agregados
+    semanais e mensais afetados, o registro da alteração e o incremento da versão do
+    histórico. Retorna o número de linhas enviadas.
+    """
+    _verificar_dialeto(engine)
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE_PADRAO
+    linhas = (_normalizar(r) for r in registros)
+    total = 0
+    tickers, datas = set(), set()
+    with engine.connect() as conn:
+        # Um lote de antecedência: só assim se sabe qual é o último antes de gravá-lo.
+        pendente = None
+        try:
+            for lote in em_lotes(linhas, tamanho_lote):
+                if pendente is not None:
+                    anterior, pendente = pendente, None
+                    with conn.begin():
+                        _gravar_lote(conn, anterior)
+                    total += len(anterior)
+                pendente = lote
+                tickers.update(l["ticker"] for l in lote)
+                datas.update(l["date"] for l in lote)
+        finally:
+            # Também quando a leitura ou um lote falha: o que foi confirmado precisa da versão nova.
+            if pendente is not None or total:
+                total += _encerrar(conn, pendente, tickers, datas, total)
+    return total
+
+def _encerrar(conn: Connection, pendente: Optional[List[dict]], tickers: set, datas: set, confirmadas: int) -> int:
+    """
+    Grava o lote pendente na mesma transação da finalização. Se essa transação falhar,
+    finaliza só os lotes já confirmados antes de deixar o erro subir (incluir os tickers
+    e datas do lote perdido só amplia o recálculo). Retorna as linhas gravadas aqui.
+    """
+    try:
+        with conn.begin():
+            if pendente is not None:
+                _gravar_lote(conn, pendente)
+            _finalizar(conn, tickers, min(datas), max(datas))
+    except BaseException:
+        if confirmadas:
+            with conn.begin():
+                _finalizar(conn, tickers, min(datas), max(datas))
+        raise
+    return len(pendente) if pendente is not None else 0
+
+def _finalizar(conn: Connection, tickers: Iterable[str], data_inicio, data_fim, incrementar: bool = True):
+    """
+    Recalcula os agregados semanais/mensais tocados pela carga, registra a alteração
+    e incrementa a versão do histórico, na transação corrente de `conn`.
+    """
+    atualizar_rollups(conn, tickers, data_inicio, data_fim)
+    registrar_alteracao_historico(conn, data_inicio)
+    if incrementar:
+        incrementar_versao(conn, VERSAO_HISTORICO)
+
+def upsert_historico_dataframe(engine: Engine, df: pd.DataFrame, incrementar: bool = True) -> int:
+    """
+    Variante vetorizada de `upsert_historico` para cargas grandes: `df` já vem
+    normalizado (colunas COLUNAS_HISTORICO, ticker em maiúsculas, date como data) e
+    vira CSV de uma vez pelo pandas, sem um dict por linha. É gravado em uma transação,
+    junto com os agregados e o registro da alteração; a versão só muda se `incrementar`.
+    """
+    if df.empty:
+        return 0
+    _verificar_dialeto(engine)
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            buffer = io.StringIO()
+            df.to_csv(buffer, columns=COLUNAS_HISTORICO, header=False, index=False)
+            buffer.seek(0)
+            _upsert_postgres(conn, buffer)
+        else:
+            colunas = df[COLUNAS_HISTORICO].astype(object)
+            _upsert_sqlite(conn, colunas.where(colunas.notna(), None).to_dict("records"))
+        _finalizar(conn, df["ticker"].unique(), df["date"].min(), df["date"].max(), incrementar)
+    return len(df)
+
+def inserir_snapshots(engine: Engine, registros: Iterable[dict], tamanho_lote: Optional[int] = None) -> int:
+    """
+    Grava em acoes_snapshots os registros da coleta intradiária (colunas de
+    acoes_historico mais `coletado_em`). Só insere: cada captura é uma linha nova.
+    """
+    total = 0
+    for lote in em_lotes(registros, tamanho_lote or TAMANHO_LOTE_PADRAO):
+        linhas = []
+        for registro in lote:
+            linha = _normalizar(registro)
+            del linha["date"]
+            linha["coletado_em"] = registro["coletado_em"]
+            linhas.append(linha)
+        with engine.begin() as conn:
+            conn.execute(SnapshotAcao.__table__.insert(), linhas)
+        total += len(linhas)
+    return total
@@ -1,13 +1,259 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from ..core.config import settings
+from ..core.metricas import instrumentar_engine
+
+_DRIVERS_ASYNC = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def url_async(url: str) -> str:
+    """Troca o driver síncrono da URL pelo equivalente assíncrono (asyncpg / aiosqlite)."""
+    esquema, resto = url.split("://", 1)
+    return f"{_DRIVERS_ASYNC.get(esquema, esquema)}://{resto}"
+
+def _opcoes_pool(url: str) -> dict:
+    """Parâmetros de pool das settings; SQLite (uso local) fica com o pool padrão do dialeto."""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+class MonitorPool:
+    """Contadores de uso de um pool, alimentados pelos eventos de pool do SQLAlchemy."""
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.conexoes_abertas = 0
+        self.invalidacoes = 0
+        self.saturacoes = 0
+        self.timeouts = 0
+        event.listen(engine, "checkout", self._no_checkout)
+        event.listen(engine, "connect", self._no_connect)
+        event.listen(engine, "invalidate", self._no_invalidate)
+
+    def _limite(self) -> Optional[int]:
+        pool = self.engine.pool
+        if not hasattr(pool, "size") or not hasattr(pool, "_max_overflow"):
+            return None
+        return pool.size() + max(pool._max_overflow, 0)
+
+    def _no_checkout(self, dbapi_conn, registro, proxy):
+        with self._lock:
+            self.checkouts += 1
+            limite = self._limite()
+            if limite is not None and self.engine.pool.checkedout() >= limite:
+                self.saturacoes += 1
+
+    def _no_connect(self, dbapi_conn, registro):
+        with self._lock:
+            self.conexoes_abertas += 1
+
+    def _no_invalidate(self, dbapi_conn, registro, excecao):
+        with self._lock:
+            self.invalidacoes += 1
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
 
-engine = create_engine(settings.DATABASE_URL)
+    def estatisticas(self) -> dict:
+        pool = self.engine.pool
+        dados = {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "pool": type(pool).__name__,
+            "checkouts": self.checkouts,
+            "conexoes_abertas": self.conexoes_abertas,
+            "invalidacoes": self.invalidacoes,
+            "saturacoes": self.saturacoes,
+            "timeouts": self.timeouts,
+        }
+        for nome in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, nome):
+                dados[nome] = getattr(pool, nome)()
+        return dados
+
+monitores_pool: Dict[str, MonitorPool] = {}
+
+def _monitorar(nome: str, engine: Engine):
+    monitores_pool[nome] = MonitorPool(engine)
+    instrumentar_engine(engine)
+
+engine = create_engine(settings.DATABASE_URL, **_opcoes_pool(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_monitorar("primario", engine)
+
+_url_async_primario = settings.DATABASE_ASYNC_URL or url_async(settings.DATABASE_URL)
+async_engine = create_async_engine(_url_async_primario, **_opcoes_pool(_url_async_primario))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+_monitorar("primario_async", async_engine.sync_engine)
+
+class RoteadorLeitura:
+    """
+    Distribui as sessões de leitura entre as réplicas em round-robin. Cada réplica é
+    verificada com SELECT 1 no máximo a cada DB_REPLICA_INTERVALO_VERIFICACAO segundos;
+    uma réplica que falha fica em quarentena por DB_REPLICA_QUARENTENA segundos. Sem
+    réplicas saudáveis, a leitura vai para o primário.
+    """
+    def __init__(self, replicas: List[AsyncEngine], primario: AsyncEngine):
+        self.primario = primario
+        self._replicas = [{"engine": e, "verificada_em": 0.0, "indisponivel_ate": 0.0} for e in replicas]
+        self._sequencia = itertools.count()
+
+    async def _verificar(self, replica: dict) -> bool:
+        try:
+            async with replica["engine"].connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            replica["verificada_em"] = time.monotonic()
+            return True
+        except Exception as e:
+            self._quarentena(replica, e)
+            return False
+
+    def _quarentena(self, replica: dict, erro: Exception):
+        replica["indisponivel_ate"] = time.monotonic() + settings.DB_REPLICA_QUARENTENA
+        url = replica["engine"].url.render_as_string(hide_password=True)
+        logging.warning(f"Réplica de leitura {url} indisponível, usando outra: {erro}")
+
+    def eh_replica(self, engine: AsyncEngine) -> bool:
+        return any(replica["engine"] is engine for replica in self._replicas)
+
+    def marcar_falha(self, engine: AsyncEngine, erro: Exception):
+        for replica in self._replicas:
+            if replica["engine"] is engine:
+                self._quarentena(replica, erro)
+
+    async def escolher(self) -> AsyncEngine:
+        total = len(self._replicas)
+        for _ in range(total):
+            replica = self._replicas[next(self._sequencia) % total]
+            agora = time.monotonic()
+            if replica["indisponivel_ate"] > agora:
+                continue
+            if agora - replica["verificada_em"] >= settings.DB_REPLICA_INTERVALO_VERIFICACAO:
+                if not await self._verificar(replica):
+                    continue
+            return replica["engine"]
+        return self.primario
+
+def _erro_de_conexao(erro: DBAPIError) -> bool:
+    return erro.connection_invalidated or isinstance(erro, OperationalError)
+
+class SessaoLeitura(AsyncSession):
+    """
+    Sessão de leitura que, se a réplica escolhida falhar na conexão antes de entregar
+    qualquer resultado, põe a réplica em quarentena e repete a operação uma vez na
+    próxima réplica saudável (ou no primário). Depois do primeiro resultado não há nova
+    tentativa: a requisição já pode ter lido dados daquela réplica.
+    """
+    def __init__(self, *args, roteador: RoteadorLeitura, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.roteador = roteador
+        self._entregou_resultado = False
+
+    def _trocar_engine(self, engine: AsyncEngine):
+        self.bind = engine
+        self.sync_session.bind = engine.sync_engine
+
+    async def _com_nova_tentativa(self, operacao, *args, **kwargs):
+        try:
+            resultado = await operacao(*args, **kwargs)
+        except DBAPIError as e:
+            if self._entregou_resultado or not _erro_de_conexao(e) or not self.roteador.eh_replica(self.bind):
+                raise
+            self.roteador.marcar_falha(self.bind, e)
+            await self.rollback()
+            self._trocar_engine(await self.roteador.escolher())
+            resultado = await operacao(*args, **kwargs)
+        self._entregou_resultado = True
+        return resultado
+
+    async def execute(self, *args, **kwargs):
+        return await self._com_nova_tentativa(super().execute, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await self._com_nova_tentativa(super().scalar, *args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return await self._com_nova_tentativa(super().scalars, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await self._com_nova_tentativa(super().get, *args, **kwargs)
+
+    async def stream(self, *args, **kwargs):
+        return await self._com_nova_tentativa(super().stream, *args, **kwargs)
+
+    async def stream_scalars(self, *args, **kwargs):
+        return await self._com_nova_tentativa(super().stream_scalars, *args, **kwargs)
+
+    async def run_sync(self, *args, **kwargs):
+        return await self._com_nova_tentativa(super().run_sync, *args, **kwargs)
+
+SessaoLeituraLocal = async_sessionmaker(async_engine, class_=SessaoLeitura, autoflush=False, expire_on_commit=False)
+
+_replicas_async = []
+for _indice, _url in enumerate(settings.DATABASE_READ_URLS):
+    _url_replica = url_async(_url)
+    _replica = create_async_engine(_url_replica, **_opcoes_pool(_url_replica))
+    _replicas_async.append(_replica)
+    _monitorar(f"replica_{_indice}", _replica.sync_engine)
+roteador_leitura = RoteadorLeitura(_replicas_async, async_engine)
+
+def _registrar_timeout(bind):
+    for monitor in monitores_pool.values():
+        if monitor.engine is bind:
+            monitor.registrar_timeout()
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
+    except PoolTimeoutError:
+        _registrar_timeout(engine)
+        raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except PoolTimeoutError:
+            _registrar_timeout(async_engine.sync_engine)
+            raise
+
+async def get_async_read_db():
+    """Sessão para endpoints somente leitura: réplica (quando configurada) ou primário."""
+    async with SessaoLeituraLocal(bind=await roteador_leitura.escolher(), roteador=roteador_leitura) as db:
+        try:
+            yield db
+        except PoolTimeoutError:
+            _registrar_timeout(db.bind.sync_engine)
+            raise
+        except DBAPIError as e:
+            # A sessão pode ter trocado de engine em uma nova tentativa: a falha é de quem está nela agora.
+            if roteador_leitura.eh_replica(db.bind) and _erro_de_conexao(e):
+                roteador_leitura.marcar_falha(db.bind, e)
+            raise
+
+async def dispose_engines():
+    await async_engine.dispose()
+    for replica in _replicas_async:
+        await replica.dispose()
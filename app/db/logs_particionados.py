@@ -0,0 +1,235 @@
+"""
+Particionamento mensal de `logs_requisicoes` por `timestamp`.
+
+PostgreSQL: a tabela é particionada nativamente (PARTITION BY RANGE), com uma
+partição `logs_requisicoes_pAAAAMM` por mês. Bancos antigos são convertidos pela
+migração: a tabela existente vira a partição `logs_requisicoes_legado`, cobrindo
+tudo até o fim do mês corrente. SQLite não tem partições; o equivalente é uma tabela
+por mês com o mesmo nome e uma view `logs_requisicoes` que faz UNION ALL delas.
+Lá as gravações vão direto para a tabela do mês.
+
+Em ambos, a retenção é um DROP TABLE por mês vencido, que custa o mesmo
+independentemente da quantidade de linhas.
+"""
+import datetime
+import logging
+import re
+import threading
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Connection
+
+from app.db import models
+
+TABELA = "logs_requisicoes"
+LEGADO = f"{TABELA}_legado"
+_PARTICAO = re.compile(rf"^{TABELA}_p(\d{{4}})(\d{{2}})$")
+_COLUNAS = "id, usuario_id, endpoint, method, status_code, response_time_ms, timestamp"
+
+_lock = threading.Lock()
+_meses_prontos: Set[datetime.date] = set()
+
+def inicio_mes(momento) -> datetime.date:
+    return datetime.date(momento.year, momento.month, 1)
+
+def proximo_mes(mes: datetime.date) -> datetime.date:
+    return datetime.date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+def nome_particao(mes: datetime.date) -> str:
+    return f"{TABELA}_p{mes.year:04d}{mes.month:02d}"
+
+def mes_da_particao(nome: str) -> Optional[datetime.date]:
+    encontrado = _PARTICAO.match(nome)
+    return datetime.date(int(encontrado.group(1)), int(encontrado.group(2)), 1) if encontrado else None
+
+def _tipo_tabela(conn: Connection, nome: str) -> Optional[str]:
+    """'table', 'view' ou 'partitioned' (PostgreSQL); None se não existir."""
+    if conn.dialect.name == "postgresql":
+        tipo = conn.execute(
+            text("SELECT relkind FROM pg_class WHERE relname = :nome AND relnamespace = 'public'::regnamespace"),
+            {"nome": nome},
+        ).scalar()
+        return {"r": "table", "v": "view", "p": "partitioned"}.get(tipo)
+    return conn.execute(text("SELECT type FROM sqlite_master WHERE name = :nome"), {"nome": nome}).scalar()
+
+def particoes(conn: Connection) -> List[str]:
+    """Partições existentes (a legada primeiro, depois as mensais em ordem)."""
+    if conn.dialect.name == "postgresql":
+        nomes = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :tabela"
+        ), {"tabela": TABELA}).scalars().all()
+    else:
+        nomes = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'table' AND (name = :legado OR name LIKE :prefixo)"),
+            {"legado": LEGADO, "prefixo": f"{TABELA}_p%"},
+        ).scalars().all()
+    mensais = sorted(n for n in nomes if mes_da_particao(n))
+    return ([LEGADO] if LEGADO in nomes else []) + mensais
+
+# --- PostgreSQL -------------------------------------------------------------------
+
+def _converter_postgres(conn: Connection):
+    """Tabela comum -> particionada; a antiga vira a partição legada (até o fim do mês corrente)."""
+    limite = proximo_mes(inicio_mes(datetime.datetime.utcnow()))
+    conn.execute(text(f"ALTER TABLE {TABELA} RENAME TO {LEGADO}"))
+    for indice in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :t"), {"t": LEGADO}).scalars().all():
+        if indice.startswith(TABELA) and not indice.endswith("_pkey"):
+            conn.execute(text(f'ALTER INDEX "{indice}" RENAME TO "{indice.replace(TABELA, LEGADO, 1)}"'))
+    conn.execute(text(f"UPDATE {LEGADO} SET timestamp = TIMESTAMP '1970-01-01' WHERE timestamp IS NULL"))
+    conn.execute(text(f"ALTER TABLE {LEGADO} ALTER COLUMN timestamp SET NOT NULL"))
+    conn.execute(text(f"ALTER TABLE {LEGADO} ALTER COLUMN id TYPE BIGINT"))
+    # O ATTACH precisa que a partição tenha a mesma chave primária do pai, (id, timestamp).
+    conn.execute(text(f"ALTER TABLE {LEGADO} DROP CONSTRAINT {TABELA}_pkey"))
+    conn.execute(text(f"ALTER TABLE {LEGADO} ADD CONSTRAINT {LEGADO}_pkey PRIMARY KEY (id, timestamp)"))
+    conn.execute(text(f"ALTER SEQUENCE {TABELA}_id_seq OWNED BY NONE"))
+    conn.execute(text(f"""
+        CREATE TABLE {TABELA} (
+            id BIGINT NOT NULL DEFAULT nextval('{TABELA}_id_seq'),
+            usuario_id INTEGER REFERENCES usuarios (id),
+            endpoint VARCHAR(255),
+            method VARCHAR(10),
+            status_code INTEGER,
+            response_time_ms INTEGER,
+            timestamp TIMESTAMP NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """))
+    conn.execute(text(f"ALTER SEQUENCE {TABELA}_id_seq OWNED BY {TABELA}.id"))
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{TABELA}_timestamp ON {TABELA} (timestamp)"))
+    # Valida a faixa com uma varredura da tabela antiga (uma vez, na migração).
+    conn.execute(text(
+        f"ALTER TABLE {TABELA} ATTACH PARTITION {LEGADO} FOR VALUES FROM (MINVALUE) TO ('{limite.isoformat()}')"
+    ))
+
+def _limite_legado_postgres(conn: Connection) -> Optional[datetime.date]:
+    """Limite superior da partição legada (meses antes dele já são cobertos por ela)."""
+    faixa = conn.execute(
+        text("SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_class c WHERE c.relname = :legado AND c.relispartition"),
+        {"legado": LEGADO},
+    ).scalar()
+    encontrado = re.search(r"TO \('([0-9-]{10})", faixa or "")
+    return datetime.date.fromisoformat(encontrado.group(1)) if encontrado else None
+
+def _criar_particao_postgres(conn: Connection, mes: datetime.date):
+    limite_legado = _limite_legado_postgres(conn)
+    if limite_legado is not None and mes < limite_legado:
+        return
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {nome_particao(mes)} PARTITION OF {TABELA} "
+        f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{proximo_mes(mes).isoformat()}')"
+    ))
+
+# --- SQLite -----------------------------------------------------------------------
+
+def _recriar_view_sqlite(conn: Connection):
+    conn.execute(text(f"DROP VIEW IF EXISTS {TABELA}"))
+    partes = [f"SELECT {_COLUNAS} FROM {nome}" for nome in particoes(conn)]
+    if not partes:
+        _criar_particao_sqlite(conn, inicio_mes(datetime.datetime.utcnow()), recriar_view=False)
+        partes = [f"SELECT {_COLUNAS} FROM {nome}" for nome in particoes(conn)]
+    conn.execute(text(f"CREATE VIEW {TABELA} AS " + " UNION ALL ".join(partes)))
+
+def _converter_sqlite(conn: Connection):
+    conn.execute(text(f"ALTER TABLE {TABELA} RENAME TO {LEGADO}"))
+    conn.execute(text(f"DROP INDEX IF EXISTS ix_{TABELA}_timestamp"))
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{LEGADO}_timestamp ON {LEGADO} (timestamp)"))
+    _recriar_view_sqlite(conn)
+
+def _criar_particao_sqlite(conn: Connection, mes: datetime.date, recriar_view: bool = True):
+    nome = nome_particao(mes)
+    if _tipo_tabela(conn, nome) is not None:
+        return
+    conn.execute(text(f"""
+        CREATE TABLE {nome} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER REFERENCES usuarios (id),
+            endpoint VARCHAR(255),
+            method VARCHAR(10),
+            status_code INTEGER,
+            response_time_ms INTEGER,
+            timestamp TIMESTAMP NOT NULL
+        )
+    """))
+    conn.execute(text(f"CREATE INDEX ix_{nome}_timestamp ON {nome} (timestamp)"))
+    # Cada mês tem a própria sequência: a faixa de ids começa em AAAAMM * 10^10 para não repetir entre meses.
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:nome, :seq)"),
+                 {"nome": nome, "seq": (mes.year * 100 + mes.month) * 10 ** 10})
+    if recriar_view:
+        _recriar_view_sqlite(conn)
+
+# --- Interface --------------------------------------------------------------------
+
+def preparar(conn: Connection):
+    """Converte a tabela comum em particionada (idempotente). Usada pela migração e antes de gravar."""
+    tipo = _tipo_tabela(conn, TABELA)
+    if conn.dialect.name == "postgresql":
+        if tipo == "table":
+            logging.info("🧱 Convertendo logs_requisicoes em tabela particionada por mês...")
+            _converter_postgres(conn)
+    elif conn.dialect.name == "sqlite":
+        if tipo == "table":
+            _converter_sqlite(conn)
+        elif tipo is None:
+            _recriar_view_sqlite(conn)
+
+def garantir_particoes(conn: Connection, meses: Iterable[datetime.date]):
+    """Cria as partições que faltam para os meses informados (cache por processo)."""
+    faltando = sorted(set(meses) - _meses_prontos)
+    if not faltando:
+        return
+    with _lock:
+        preparar(conn)
+        for mes in faltando:
+            if conn.dialect.name == "postgresql":
+                _criar_particao_postgres(conn, mes)
+            else:
+                _criar_particao_sqlite(conn, mes)
+        _meses_prontos.update(faltando)
+
+def invalidar_cache():
+    """Esquece as partições conhecidas (ex.: depois de um rollback da transação que as criou)."""
+    with _lock:
+        _meses_prontos.clear()
+
+def garantir_proximos_meses(conn: Connection, quantidade: int):
+    mes = inicio_mes(datetime.datetime.utcnow())
+    meses = [mes]
+    for _ in range(quantidade):
+        meses.append(proximo_mes(meses[-1]))
+    garantir_particoes(conn, meses)
+
+def inserir(conn: Connection, linhas: List[dict]):
+    """INSERT em lote; no SQLite, agrupado pela tabela do mês de cada linha."""
+    meses = {inicio_mes(linha["timestamp"]) for linha in linhas}
+    garantir_particoes(conn, meses)
+    if conn.dialect.name != "sqlite":
+        conn.execute(insert(models.LogRequisicao), linhas)
+        return
+    colunas = ["usuario_id", "endpoint", "method", "status_code", "response_time_ms", "timestamp"]
+    for mes in meses:
+        do_mes = [{c: l[c] for c in colunas} for l in linhas if inicio_mes(l["timestamp"]) == mes]
+        conn.execute(
+            text(f"INSERT INTO {nome_particao(mes)} ({', '.join(colunas)}) VALUES ({', '.join(':' + c for c in colunas)})"),
+            do_mes,
+        )
+
+def remover_antigas(conn: Connection, corte: datetime.datetime) -> List[str]:
+    """DROP das partições inteiramente anteriores a `corte`. Retorna os nomes removidos."""
+    removidas = []
+    for nome in particoes(conn):
+        mes = mes_da_particao(nome)
+        if mes is not None:
+            vencida = proximo_mes(mes) <= corte.date()
+        else:
+            maior = conn.execute(text(f"SELECT MAX(timestamp) FROM {nome}")).scalar()
+            vencida = maior is None or (maior if isinstance(maior, datetime.datetime) else datetime.datetime.fromisoformat(str(maior))) < corte
+        if vencida:
+            conn.execute(text(f"DROP TABLE {nome}"))
+            removidas.append(nome)
+            _meses_prontos.discard(mes)
+    if removidas and conn.dialect.name == "sqlite":
+        _recriar_view_sqlite(conn)
+    return removidas
@@ -0,0 +1,90 @@
+"""
+Migrações para bancos criados antes de mudanças no schema.
+
+`create_all` só cria tabelas que ainda não existem; índices e restrições novos em
+tabelas existentes são aplicados aqui. Cada migração roda uma única vez e fica
+registrada na tabela `schema_migracoes`.
+"""
+import datetime
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, MetaData, String, Table, TIMESTAMP, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db import logs_particionados
+from app.db.rollups import recalcular_tudo
+
+_metadata = MetaData()
+schema_migracoes = Table(
+    "schema_migracoes", _metadata,
+    Column("nome", String(100), primary_key=True),
+    Column("aplicada_em", TIMESTAMP, default=datetime.datetime.utcnow),
+)
+
+def _historico_ticker_date_unico(conn: Connection):
+    """Remove duplicatas de (ticker, date), mantendo a linha mais recente, e cria o índice único."""
+    conn.execute(text(
+        "DELETE FROM acoes_historico WHERE id NOT IN "
+        "(SELECT MAX(id) FROM acoes_historico GROUP BY ticker, date)"
+    ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_acoes_historico_ticker_date ON acoes_historico (ticker, date)"
+    ))
+
+def _historico_indice_ultimo_registro(conn: Connection):
+    """Índice composto usado pela busca do registro mais recente de um ticker."""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_acoes_historico_ticker_date_desc ON acoes_historico (ticker, date DESC)"
+    ))
+
+def _historico_indice_data(conn: Connection):
+    """Índice por data: janelas do gráfico comparativo e MAX(date) da verificação de artefatos."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_acoes_historico_date ON acoes_historico (date)"))
+
+def _historico_rollups(conn: Connection):
+    """Preenche os agregados semanais/mensais com o histórico que já existia."""
+    recalcular_tudo(conn)
+
+def _logs_particionados(conn: Connection):
+    """logs_requisicoes particionada por mês; a tabela existente vira a partição legada."""
+    logs_particionados.preparar(conn)
+
+def _artefatos_versao_dados(conn: Connection):
+    """Versão dos dados em graficos_comparativos; os artefatos antigos ficam sem ela (desatualizados)."""
+    colunas = {c["name"] for c in inspect(conn).get_columns("graficos_comparativos")}
+    if "versao_dados" not in colunas:
+        conn.execute(text("ALTER TABLE graficos_comparativos ADD COLUMN versao_dados BIGINT"))
+
+def _artefatos_tabela_arrow(conn: Connection):
+    """Tabela Arrow em graficos_comparativos; até a próxima coleta, Arrow/Parquet são calculados na hora."""
+    colunas = {c["name"] for c in inspect(conn).get_columns("graficos_comparativos")}
+    if "tabela_arrow" not in colunas:
+        tipo = "BYTEA" if conn.dialect.name == "postgresql" else "BLOB"
+        conn.execute(text(f"ALTER TABLE graficos_comparativos ADD COLUMN tabela_arrow {tipo}"))
+
+MIGRACOES: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_historico_ticker_date_unico", _historico_ticker_date_unico),
+    ("0002_historico_indice_ultimo_registro", _historico_indice_ultimo_registro),
+    ("0003_historico_indice_data", _historico_indice_data),
+    ("0004_historico_rollups", _historico_rollups),
+    ("0005_logs_particionados", _logs_particionados),
+    ("0006_artefatos_versao_dados", _artefatos_versao_dados),
+    ("0007_artefatos_tabela_arrow", _artefatos_tabela_arrow),
+]
+
+def aplicar_migracoes(engine: Engine) -> List[str]:
+    """Aplica, em ordem, as migrações pendentes. Retorna os nomes das que foram aplicadas."""
+    _metadata.create_all(bind=engine)
+    aplicadas = []
+    with engine.connect() as conn:
+        ja_aplicadas = set(conn.execute(select(schema_migracoes.c.nome)).scalars())
+    for nome, migracao in MIGRACOES:
+        if nome in ja_aplicadas:
+            continue
+        logging.info(f"Aplicando migração {nome}...")
+        with engine.begin() as conn:
+            migracao(conn)
+            conn.execute(schema_migracoes.insert().values(nome=nome))
+        aplicadas.append(nome)
+    return aplicadas
@@ -1,5 +1,5 @@
 from sqlalchemy import (Column, String, Numeric, TIMESTAMP, Integer, ForeignKey,
-                        Date, Boolean, Text, BigInteger)
+                        Date, Boolean, Text, BigInteger, Float, Index, LargeBinary)
 from sqlalchemy.orm import declarative_base, relationship
 import datetime
 
@@ -32,6 +32,75 @@ class HistoricoAcao(Base):
 
     ticker_info = relationship("Ticker", back_populates="historico")
 
+    __table_args__ = (
+        Index("uq_acoes_historico_ticker_date", "ticker", "date", unique=True),
+    )
+
+Index("ix_acoes_historico_ticker_date_desc", HistoricoAcao.ticker_codigo, HistoricoAcao.date.desc())
+Index("ix_acoes_historico_date", HistoricoAcao.date)
+
+
+class SnapshotAcao(Base):
+    """Cotação e indicadores capturados pela coleta intradiária; acoes_historico guarda só a linha do dia."""
+    __tablename__ = "acoes_snapshots"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    ticker_codigo = Column("ticker", Text, ForeignKey("tickers.codigo"), nullable=False)
+    coletado_em = Column(TIMESTAMP, nullable=False)
+    close = Column(Numeric, nullable=False)
+    variacao_percentual = Column(Numeric(6, 2))
+    price_earnings = Column(Numeric)
+    dividend_yield = Column(Numeric)
+    roe = Column(Numeric)
+    market_value = Column(Numeric)
+    volume = Column(BigInteger)
+
+Index("ix_acoes_snapshots_ticker_coletado_em", SnapshotAcao.ticker_codigo, SnapshotAcao.coletado_em.desc())
+Index("ix_acoes_snapshots_coletado_em", SnapshotAcao.coletado_em)
+
+
+class RollupHistorico(Base):
+    """Agregado semanal/mensal de acoes_historico, mantido em app/db/rollups.py a cada gravação."""
+    __tablename__ = "acoes_historico_rollup"
+    ticker_codigo = Column("ticker", Text, primary_key=True)
+    intervalo = Column(String(10), primary_key=True)
+    periodo_inicio = Column(Date, primary_key=True)
+    open = Column(Numeric)
+    high = Column(Numeric)
+    low = Column(Numeric)
+    close = Column(Numeric)
+    volume = Column(BigInteger)
+    pregoes = Column(Integer)
+    ultima_data = Column(Date)
+
+
+class GraficoComparativoArtefato(Base):
+    """Série comparativa normalizada pronta para servir, gerada ao fim de cada coleta."""
+    __tablename__ = "graficos_comparativos"
+    janela_dias = Column(Integer, primary_key=True)
+    data_referencia = Column(Date, nullable=True)
+    # Versão dos dados (app/db/versoes.py) usada no cálculo; diferente da atual = artefato desatualizado.
+    versao_dados = Column(BigInteger, nullable=True)
+    gerado_em = Column(TIMESTAMP, default=datetime.datetime.utcnow)
+    conteudo = Column(Text, nullable=False)
+    # A mesma série em Arrow IPC, sem arredondar, para as respostas Arrow/Parquet; nula sem pyarrow.
+    tabela_arrow = Column(LargeBinary, nullable=True)
+
+
+class VersaoDados(Base):
+    """Contador incrementado a cada escrita em um conjunto de dados; base dos ETags da API."""
+    __tablename__ = "versoes_dados"
+    nome = Column(String(50), primary_key=True)
+    versao = Column(BigInteger, nullable=False, default=0)
+    atualizado_em = Column(TIMESTAMP, default=datetime.datetime.utcnow)
+
+
+class AlteracaoHistorico(Base):
+    """Uma gravação em acoes_historico e a menor data que ela tocou (ver app/db/versoes.py)."""
+    __tablename__ = "historico_alteracoes"
+    id = Column(Integer, primary_key=True)
+    data_inicio = Column(Date, nullable=False)
+    registrado_em = Column(TIMESTAMP, nullable=False, default=datetime.datetime.utcnow)
+
 
 class Indice(Base):
     __tablename__ = "indices"
@@ -39,17 +108,41 @@ class Indice(Base):
     nome = Column(String(50), unique=True, index=True)
     valor_atual = Column(Numeric(10, 2))
     variacao_dia = Column(Numeric(6, 2))
-    atualizado_em = Column(TIMESTAMP, default=datetime.datetime.utcnow)
+    atualizado_em = Column(TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
 class LogRequisicao(Base):
+    """
+    Particionada por mês em `timestamp` (app/db/logs_particionados.py): partições nativas
+    no PostgreSQL; no SQLite, uma tabela por mês atrás de uma view com este nome.
+    """
     __tablename__ = "logs_requisicoes"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
     endpoint = Column(String(255))
     method = Column(String(10))
     status_code = Column(Integer)
     response_time_ms = Column(Integer)
-    timestamp = Column(TIMESTAMP, default=datetime.datetime.utcnow)
+    timestamp = Column(TIMESTAMP, primary_key=True, default=datetime.datetime.utcnow)
+    __table_args__ = (
+        Index("ix_logs_requisicoes_timestamp", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+class LogRequisicaoMinuto(Base):
+    """Agregado por minuto de logs_requisicoes (endpoint, método e usuário; usuario_id 0 = sem usuário)."""
+    __tablename__ = "logs_requisicoes_minuto"
+    minuto = Column(TIMESTAMP, primary_key=True)
+    endpoint = Column(String(255), primary_key=True)
+    method = Column(String(10), primary_key=True)
+    usuario_id = Column(Integer, primary_key=True, default=0)
+    requisicoes = Column(Integer, nullable=False)
+    erros = Column(Integer, nullable=False, default=0)
+    erros_cliente = Column(Integer, nullable=False, default=0)
+    latencia_soma_ms = Column(BigInteger, nullable=False, default=0)
+    latencia_max_ms = Column(Integer)
+    p50_ms = Column(Float)
+    p95_ms = Column(Float)
+    p99_ms = Column(Float)
 
 class Usuario(Base):
     __tablename__ = "usuarios"
@@ -0,0 +1,105 @@
+"""
+Agregados semanais e mensais de `acoes_historico` (tabela `acoes_historico_rollup`).
+
+Cada período guarda open/high/low/close calculados sobre os fechamentos diários, a
+soma do volume e o número de pregões. Os períodos são mantidos na escrita: depois
+de cada upsert no histórico, só os períodos tocados pelos tickers e datas gravados
+são recalculados (INSERT ... SELECT ... ON CONFLICT DO UPDATE), o que também
+cobre regravações do mesmo dia sem contar nada duas vezes.
+"""
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, delete, text
+from sqlalchemy.engine import Connection
+
+from app.db.models import RollupHistorico
+
+INTERVALO_DIARIO = "diario"
+INTERVALO_SEMANAL = "semanal"
+INTERVALO_MENSAL = "mensal"
+INTERVALOS_AGREGADOS = (INTERVALO_SEMANAL, INTERVALO_MENSAL)
+
+# Início do período (semana começando na segunda-feira) por dialeto.
+_INICIO_PERIODO = {
+    "postgresql": {
+        INTERVALO_SEMANAL: "CAST(date_trunc('week', CAST({col} AS TIMESTAMP)) AS DATE)",
+        INTERVALO_MENSAL: "CAST(date_trunc('month', CAST({col} AS TIMESTAMP)) AS DATE)",
+    },
+    "sqlite": {
+        INTERVALO_SEMANAL: "date({col}, '-' || ((CAST(strftime('%w', {col}) AS INTEGER) + 6) % 7) || ' days')",
+        INTERVALO_MENSAL: "date({col}, 'start of month')",
+    },
+}
+
+_SQL_RECALCULO = """
+INSERT INTO acoes_historico_rollup
+    (ticker, intervalo, periodo_inicio, open, high, low, close, volume, pregoes, ultima_data)
+SELECT ticker, :intervalo, periodo, open, high, low, close, volume, pregoes, ultima_data
+FROM (
+    SELECT
+        ticker,
+        {periodo} AS periodo,
+        FIRST_VALUE(close) OVER (PARTITION BY ticker, {periodo} ORDER BY date) AS open,
+        MAX(close) OVER (PARTITION BY ticker, {periodo}) AS high,
+        MIN(close) OVER (PARTITION BY ticker, {periodo}) AS low,
+        close,
+        SUM(volume) OVER (PARTITION BY ticker, {periodo}) AS volume,
+        COUNT(*) OVER (PARTITION BY ticker, {periodo}) AS pregoes,
+        date AS ultima_data,
+        ROW_NUMBER() OVER (PARTITION BY ticker, {periodo} ORDER BY date DESC) AS posicao
+    FROM acoes_historico
+    WHERE ticker IN :tickers AND date >= {inicio_periodo} AND date <= :fim_periodo
+) periodos
+WHERE posicao = 1
+ON CONFLICT (ticker, intervalo, periodo_inicio) DO UPDATE SET
+    open = excluded.open, high = excluded.high, low = excluded.low,
+    close = excluded.close, volume = excluded.volume, pregoes = excluded.pregoes,
+    ultima_data = excluded.ultima_data
+"""
+
+def expressao_periodo(dialeto: str, intervalo: str, coluna: str) -> str:
+    if dialeto not in _INICIO_PERIODO:
+        raise NotImplementedError(f"Agregados não suportados para o banco '{dialeto}'.")
+    return _INICIO_PERIODO[dialeto][intervalo].format(col=coluna)
+
+def _como_data(valor) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        return date.fromisoformat(valor[:10])
+    return valor
+
+def fim_periodo(intervalo: str, dia: date) -> date:
+    """Último dia do período (semana de segunda a domingo ou mês) que contém `dia`."""
+    if intervalo == INTERVALO_SEMANAL:
+        return dia + timedelta(days=6 - dia.weekday())
+    return dia.replace(day=calendar.monthrange(dia.year, dia.month)[1])
+
+def atualizar_rollups(conn: Connection, tickers: Iterable[str], data_inicio: Optional[date], data_fim: Optional[date]):
+    """
+    Recalcula os períodos semanais e mensais de `tickers` que contêm alguma data entre
+    data_inicio e data_fim. Cada período é lido inteiro (até o fim do período de
+    data_fim), senão regravar um dia do meio descartaria os dias seguintes.
+    """
+    tickers = sorted(set(tickers))
+    if not tickers or data_inicio is None or data_fim is None:
+        return
+    data_inicio, data_fim = _como_data(data_inicio), _como_data(data_fim)
+    dialeto = conn.dialect.name
+    for intervalo in INTERVALOS_AGREGADOS:
+        sql = _SQL_RECALCULO.format(
+            periodo=expressao_periodo(dialeto, intervalo, "date"),
+            inicio_periodo=expressao_periodo(dialeto, intervalo, ":data_inicio"),
+        )
+        stmt = text(sql).bindparams(bindparam("tickers", expanding=True))
+        conn.execute(stmt, {"intervalo": intervalo, "tickers": tickers, "data_inicio": data_inicio,
+                            "fim_periodo": fim_periodo(intervalo, data_fim)})
+
+def recalcular_tudo(conn: Connection):
+    """Reconstrói todos os agregados a partir do histórico (migração e manutenção)."""
+    conn.execute(delete(RollupHistorico))
+    tickers = conn.execute(text("SELECT DISTINCT ticker FROM acoes_historico")).scalars().all()
+    limites = conn.execute(text("SELECT MIN(date), MAX(date) FROM acoes_historico")).one()
+    atualizar_rollups(conn, tickers, *limites)
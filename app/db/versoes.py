@@ -0,0 +1,56 @@
+"""
+Versões dos dados de mercado.
+
+Quem escreve no histórico ou nos tickers incrementa a versão correspondente em
+`versoes_dados`; a API usa a soma das versões e o maior `atualizado_em` como
+validadores HTTP (ETag / Last-Modified) sem precisar montar a resposta.
+
+Cada gravação no histórico também registra em `historico_alteracoes` a menor data
+que tocou, para quem mantém uma cópia incremental (o armazém de preços) reler
+correções e backfills de datas antigas, e não só o fim da série. O registro guarda
+RETENCAO_ALTERACOES; quem ficou mais tempo sem ler deve recarregar tudo.
+"""
+import datetime
+from typing import Optional, Tuple, Union
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.db.models import AlteracaoHistorico, VersaoDados
+
+VERSAO_HISTORICO = "historico"
+VERSAO_TICKERS = "tickers"
+RETENCAO_ALTERACOES = datetime.timedelta(days=1)
+
+def incrementar_versao(conexao: Union[Connection, Session], nome: str):
+    """Incrementa a versão `nome` na transação corrente (a confirmação fica com quem chamou)."""
+    agora = datetime.datetime.utcnow()
+    resultado = conexao.execute(
+        update(VersaoDados).where(VersaoDados.nome == nome).values(versao=VersaoDados.versao + 1, atualizado_em=agora)
+    )
+    if resultado.rowcount == 0:
+        conexao.execute(VersaoDados.__table__.insert().values(nome=nome, versao=1, atualizado_em=agora))
+
+def ler_versao(conexao: Union[Connection, Session]) -> Tuple[int, Optional[datetime.datetime]]:
+    """(soma das versões, maior atualizado_em) dos dados de mercado."""
+    versao, atualizado_em = conexao.execute(
+        select(func.coalesce(func.sum(VersaoDados.versao), 0), func.max(VersaoDados.atualizado_em))
+    ).one()
+    return int(versao), atualizado_em
+
+def registrar_alteracao_historico(conexao: Union[Connection, Session], data_inicio: datetime.date):
+    """Registra uma gravação no histórico a partir de `data_inicio` e descarta os registros expirados."""
+    if isinstance(data_inicio, datetime.datetime):
+        data_inicio = data_inicio.date()
+    agora = datetime.datetime.utcnow()
+    conexao.execute(AlteracaoHistorico.__table__.insert().values(data_inicio=data_inicio, registrado_em=agora))
+    conexao.execute(delete(AlteracaoHistorico).where(AlteracaoHistorico.registrado_em < agora - RETENCAO_ALTERACOES))
+
+def alteracoes_historico(conexao: Union[Connection, Session], apos_id: int = 0) -> Tuple[int, Optional[datetime.date]]:
+    """(último id registrado, menor data alterada pelas gravações posteriores a `apos_id`)."""
+    ultimo, data_inicio = conexao.execute(
+        select(func.max(AlteracaoHistorico.id), func.min(AlteracaoHistorico.data_inicio))
+        .where(AlteracaoHistorico.id > apos_id)
+    ).one()
+    return (apos_id, None) if ultimo is None else (int(ultimo), data_inicio)
@@ -1,42 +1,54 @@
 import time
 import logging
-from collections import defaultdict
-from fastapi import FastAPI, Request, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select
 
 from app.core.config import settings
+from app.core.json_rapido import RespostaJSONRapida
+from app.core.log_writer import gravador_logs
+from app.core import metricas as metricas_processo
+from app.core.perfilamento import perfilador
+from app.core.rate_limit import rate_limit_dependency, cabecalhos_rate_limit
 from app.db import database, models
-from app.api.v1.endpoints import acoes, usuarios, logs
 from app.db.database import SessionLocal
-from app.db.models import Usuario
+from app.services.armazem_precos import armazem_precos
+from app.api.v1.endpoints import acoes, usuarios, logs, metricas
 
-requests_log = defaultdict(list)
-
-def rate_limit_dependency(request: Request):
-    if not settings.API_SAFE_MODE:
-        return
-    ip = request.client.host
-    now = time.time()
-    requests_log[ip] = [timestamp for timestamp in requests_log[ip] if now - timestamp < 60]
-    if len(requests_log[ip]) >= settings.RATE_LIMIT_PER_MINUTE:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Limite de {settings.RATE_LIMIT_PER_MINUTE} requisições por minuto atingido."
-        )
-    requests_log[ip].append(now)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    gravador_logs.iniciar()
+    metricas_processo.registro_metricas.iniciar()
+    if settings.ARMAZEM_PRECOS_ATIVO:
+        db = SessionLocal()
+        try:
+            armazem_precos.carregar(db)
+        finally:
+            db.close()
+    yield
+    gravador_logs.parar()
+    metricas_processo.registro_metricas.parar()
+    await database.dispose_engines()
 
 app = FastAPI(
     title="API de Ações da Bolsa",
     description="Uma API de alta performance para consulta de dados do mercado financeiro.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=RespostaJSONRapida,
+    lifespan=lifespan
 )
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
+    inicio = time.perf_counter()
+    consultas = metricas_processo.ConsultasRequisicao()
+    metricas_processo.consultas_requisicao.set(consultas)
+    perfil = None
     try:
+        if perfilador.habilitado:
+            perfil = perfilador.iniciar(request, consultas)
         response = await call_next(request)
         process_time = (time.time() - start_time) * 1000
         status_code = response.status_code
@@ -46,30 +58,25 @@ async def log_requests(request: Request, call_next):
         logging.error(f"Erro não tratado na requisição: {e}")
         response = JSONResponse(status_code=500, content={"detail": "Ocorreu um erro interno no servidor."})
 
-    db_log = SessionLocal()
-    try:
-        user_id = None
-        api_key = request.headers.get("x-api-key")
-        if api_key:
-            stmt = select(Usuario).where(Usuario.api_key == api_key)
-            user = db_log.execute(stmt).scalar_one_or_none()
-            if user:
-                user_id = user.id
-        
-        log_entry = models.LogRequisicao(
-            usuario_id=user_id,
-            method=request.method,
-            endpoint=str(request.url.path),
-            status_code=status_code,
-            response_time_ms=int(process_time)
-        )
-        db_log.add(log_entry)
-        db_log.commit()
-    except Exception as e:
-        logging.error(f"Erro ao salvar log no banco de dados: {e}")
-        db_log.rollback()
-    finally:
-        db_log.close()
+    rate_limit = getattr(request.state, "rate_limit", None)
+    if rate_limit is not None:
+        for nome, valor in cabecalhos_rate_limit(rate_limit).items():
+            response.headers.setdefault(nome, valor)
+
+    rota = metricas_processo.rota_da_requisicao(request.scope)
+    metricas_processo.requisicao_duracao.observar(time.perf_counter() - inicio, rota, request.method, str(status_code))
+    metricas_processo.requisicao_db_duracao.observar(consultas.tempo, rota, request.method)
+    metricas_processo.requisicao_consultas.observar(consultas.quantidade, rota, request.method)
+    if perfil is not None:
+        response.headers["X-Perfil-Id"] = str(perfilador.finalizar(perfil, request, rota, status_code))
+
+    gravador_logs.registrar(
+        method=request.method,
+        endpoint=str(request.url.path),
+        status_code=status_code,
+        response_time_ms=int(process_time),
+        api_key=request.headers.get("x-api-key"),
+    )
     return response
 
 app.include_router(
@@ -90,7 +97,21 @@ app.include_router(
     tags=["Logs"],
     dependencies=[Depends(rate_limit_dependency)]
 )
+app.include_router(
+    metricas.router,
+    prefix="/api/v1/metricas",
+    tags=["Métricas"],
+    dependencies=[Depends(rate_limit_dependency)]
+)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """Latência por rota, tempo de banco por requisição e duração do coletor no formato do Prometheus."""
+    return PlainTextResponse(
+        metricas_processo.registro_metricas.exportar(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 @app.get("/", summary="Health Check")
-def read_root():
+async def read_root():
     return {"status": "API online e operacional!"}
\ No newline at end of file
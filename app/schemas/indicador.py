@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+class IndicadoresOut(BaseModel):
+    ticker: str
+    labels: List[str]
+    indicadores: Dict[str, List[Optional[float]]] = Field(..., description="Uma série por indicador (ex.: sma_20, rsi_14), alinhada com labels")
+
+class IndicadoresMultiOut(BaseModel):
+    resultados: List[IndicadoresOut]
+    nao_encontrados: List[str]
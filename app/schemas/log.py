@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional, Union
 
 class ColetaLogOut(BaseModel):
     id: int
@@ -8,4 +9,13 @@ class ColetaLogOut(BaseModel):
     mensagem: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UsoOut(BaseModel):
+    chave: Union[datetime, int, str, None]
+    requisicoes: int
+    erros: int
+    erros_cliente: int
+    latencia_media_ms: Optional[float]
+    latencia_max_ms: Optional[int]
+    p95_ms: Optional[float]
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, List
+
+class PerfilResumoOut(BaseModel):
+    id: int
+    timestamp: datetime
+    motivo: str
+    metodo: str
+    caminho: str
+    query: str
+    rota: str
+    status_code: int
+    duracao_ms: float
+    amostras: int
+    intervalo_ms: float
+    sql_total_ms: float
+    sql_quantidade: int
+
+class ComandoSqlOut(BaseModel):
+    inicio_ms: float
+    duracao_ms: float
+    sql: str
+
+class PerfilOut(PerfilResumoOut):
+    sql: List[ComandoSqlOut]
+    pilhas: Dict[str, int]
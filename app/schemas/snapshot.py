@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+class SnapshotAcaoOut(BaseModel):
+    coletado_em: datetime
+    close: Decimal
+    variacao_percentual: Optional[Decimal]
+    price_earnings: Optional[Decimal]
+    dividend_yield: Optional[Decimal]
+    roe: Optional[Decimal]
+    market_value: Optional[Decimal]
+    volume: Optional[int]
+
+    class Config:
+        from_attributes = True
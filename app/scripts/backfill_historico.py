@@ -0,0 +1,200 @@
+"""
+Carga em massa de histórico de preços (backfill) a partir de arquivos CSV ou Parquet.
+
+Os arquivos são lidos em lotes de tamanho fixo (memória limitada), os tickers são
+normalizados e conferidos contra a tabela `tickers`, e cada lote vai para o banco
+pelo caminho de COPY + upsert de `app.db.carga` — reexecutar é idempotente em
+(ticker, date). O progresso fica em um arquivo de checkpoint, então uma carga
+interrompida continua de onde parou.
+
+Colunas esperadas (nomes alternativos entre parênteses): ticker (symbol, codigo),
+date (data), close (fechamento, preco) e, opcionais, variacao_percentual,
+price_earnings, dividend_yield, roe, market_value, volume.
+
+Uso:
+    python -m app.scripts.backfill_historico precos_2010_2024.parquet outros.csv --tamanho-lote 500000 --recriar-indices
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import select
+
+from app.db import models
+from app.db.carga import COLUNAS_HISTORICO, upsert_historico_dataframe
+from app.db.database import SessionLocal, engine
+from app.db.versoes import VERSAO_HISTORICO, incrementar_versao
+from app.services import acao_service
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+TAMANHO_LOTE_PADRAO = 200_000
+ALIASES = {
+    "symbol": "ticker", "codigo": "ticker", "ativo": "ticker",
+    "data": "date", "dt": "date",
+    "fechamento": "close", "preco": "close", "adj_close": "close",
+}
+COLUNAS_NUMERICAS = ["close", "variacao_percentual", "price_earnings", "dividend_yield", "roe", "market_value"]
+
+class Checkpoint:
+    """Linhas de cada arquivo já confirmadas no banco, gravadas de forma atômica após cada lote."""
+    def __init__(self, caminho: Path):
+        self.caminho = caminho
+        self.estado = json.loads(caminho.read_text()) if caminho.exists() else {}
+
+    def _chave(self, arquivo: Path) -> str:
+        info = arquivo.stat()
+        return f"{arquivo.resolve()}|{info.st_size}|{int(info.st_mtime)}"
+
+    def linhas(self, arquivo: Path) -> int:
+        return self.estado.get(self._chave(arquivo), 0)
+
+    def registrar(self, arquivo: Path, linhas: int):
+        self.estado[self._chave(arquivo)] = linhas
+        temporario = self.caminho.with_suffix(".tmp")
+        temporario.write_text(json.dumps(self.estado, indent=2))
+        os.replace(temporario, self.caminho)
+
+def ler_lotes(arquivo: Path, tamanho_lote: int, pular: int) -> Iterator[pd.DataFrame]:
+    """Lotes de até `tamanho_lote` linhas, pulando as `pular` primeiras (já carregadas)."""
+    if arquivo.suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
+        vistos = 0
+        for lote in pq.ParquetFile(arquivo).iter_batches(batch_size=tamanho_lote):
+            if vistos + lote.num_rows <= pular:
+                vistos += lote.num_rows
+                continue
+            df = lote.to_pandas()
+            if vistos < pular:
+                df = df.iloc[pular - vistos:]
+            vistos += lote.num_rows
+            yield df
+    else:
+        # Um range viraria um set com `pular` números na memória; a função só compara.
+        yield from pd.read_csv(arquivo, chunksize=tamanho_lote, skiprows=lambda i: 0 < i <= pular, dtype=str)
+
+def normalizar_ticker(serie: pd.Series) -> pd.Series:
+    """`petr4.sa ` -> `PETR4` (sufixo de bolsa do Yahoo removido)."""
+    return serie.astype(str).str.strip().str.upper().str.replace(r"\.SA$", "", regex=True)
+
+def preparar_lote(df: pd.DataFrame, tickers_validos: Set[str]) -> Tuple[pd.DataFrame, int, int]:
+    """Renomeia, converte tipos e filtra. Retorna (lote pronto, rejeitadas por ticker, rejeitadas por valor)."""
+    df = df.rename(columns=lambda c: ALIASES.get(str(c).strip().lower(), str(c).strip().lower()))
+    faltando = {"ticker", "date", "close"} - set(df.columns)
+    if faltando:
+        raise SystemExit(f"Colunas obrigatórias ausentes: {', '.join(sorted(faltando))}")
+    for coluna in COLUNAS_HISTORICO:
+        if coluna not in df.columns:
+            df[coluna] = None
+    df = df[COLUNAS_HISTORICO].copy()
+    df["ticker"] = normalizar_ticker(df["ticker"])
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+    for coluna in COLUNAS_NUMERICAS:
+        df[coluna] = pd.to_numeric(df[coluna], errors="coerce")
+    df["volume"] = pd.to_numeric(df["volume"], errors="coerce").round().astype("Int64")
+
+    conhecidos = df["ticker"].isin(tickers_validos)
+    validos = df["date"].notna() & df["close"].notna()
+    rejeitadas_ticker = int((~conhecidos).sum())
+    rejeitadas_valor = int((conhecidos & ~validos).sum())
+    return df[conhecidos & validos], rejeitadas_ticker, rejeitadas_valor
+
+def indices_secundarios():
+    """Índices de acoes_historico que podem sair durante a carga (o único (ticker, date) fica: o upsert depende dele)."""
+    return [indice for indice in models.HistoricoAcao.__table__.indexes if not indice.unique]
+
+def remover_indices():
+    with engine.begin() as conn:
+        for indice in indices_secundarios():
+            logging.info(f"🗑️  Removendo índice {indice.name}...")
+            indice.drop(conn, checkfirst=True)
+
+def recriar_indices():
+    with engine.begin() as conn:
+        for indice in indices_secundarios():
+            inicio = time.perf_counter()
+            indice.create(conn, checkfirst=True)
+            logging.info(f"🔧 Índice {indice.name} recriado em {time.perf_counter() - inicio:.1f}s")
+
+def carregar_arquivo(arquivo: Path, tickers_validos: Set[str], checkpoint: Checkpoint, tamanho_lote: int) -> dict:
+    pular = checkpoint.linhas(arquivo)
+    if pular:
+        logging.info(f"⏩ {arquivo.name}: retomando após {pular} linhas já carregadas.")
+    totais = {"lidas": 0, "gravadas": 0, "ticker_desconhecido": 0, "invalidas": 0}
+    inicio = time.perf_counter()
+    for df in ler_lotes(arquivo, tamanho_lote, pular):
+        if df.empty:
+            continue
+        lote, sem_ticker, invalidas = preparar_lote(df, tickers_validos)
+        gravadas = upsert_historico_dataframe(engine, lote, incrementar=False)
+        totais["lidas"] += len(df)
+        totais["gravadas"] += gravadas
+        totais["ticker_desconhecido"] += sem_ticker
+        totais["invalidas"] += invalidas
+        checkpoint.registrar(arquivo, pular + totais["lidas"])
+        decorrido = time.perf_counter() - inicio
+        logging.info(f"📥 {arquivo.name}: {pular + totais['lidas']:,} linhas lidas, {totais['gravadas']:,} gravadas "
+                     f"({totais['lidas'] / decorrido:,.0f} linhas/s)")
+    totais["segundos"] = time.perf_counter() - inicio
+    return totais
+
+def executar_backfill(arquivos: list, tamanho_lote: int = TAMANHO_LOTE_PADRAO, checkpoint: Optional[Path] = None,
+                      recriar: bool = False) -> dict:
+    db = SessionLocal()
+    try:
+        tickers_validos = set(db.execute(select(models.Ticker.codigo)).scalars())
+    finally:
+        db.close()
+    if not tickers_validos:
+        raise SystemExit("Nenhum ticker cadastrado: cadastre os tickers antes do backfill.")
+
+    checkpoint = Checkpoint(checkpoint or Path("backfill_historico.checkpoint.json"))
+    geral = {"lidas": 0, "gravadas": 0, "ticker_desconhecido": 0, "invalidas": 0, "segundos": 0.0}
+    if recriar:
+        remover_indices()
+    try:
+        for arquivo in arquivos:
+            totais = carregar_arquivo(Path(arquivo), tickers_validos, checkpoint, tamanho_lote)
+            for chave in geral:
+                geral[chave] += totais[chave]
+    except BaseException:
+        # Os lotes confirmados até a interrupção ficam no banco: a versão precisa mudar mesmo assim.
+        with engine.begin() as conn:
+            incrementar_versao(conn, VERSAO_HISTORICO)
+        raise
+    finally:
+        if recriar:
+            recriar_indices()
+
+    if geral["gravadas"]:
+        with engine.begin() as conn:
+            incrementar_versao(conn, VERSAO_HISTORICO)
+        db = SessionLocal()
+        try:
+            acao_service.gerar_artefatos_grafico_comparativo(db)
+        finally:
+            db.close()
+    return geral
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga em massa de histórico de preços (CSV/Parquet).")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos .csv ou .parquet")
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE_PADRAO)
+    parser.add_argument("--checkpoint", type=Path, help="Arquivo de progresso (padrão: backfill_historico.checkpoint.json)")
+    parser.add_argument("--recriar-indices", action="store_true",
+                        help="Remove os índices secundários antes da carga e recria no fim (cargas muito grandes)")
+    args = parser.parse_args()
+
+    geral = executar_backfill(args.arquivos, args.tamanho_lote, args.checkpoint, args.recriar_indices)
+    taxa = geral["lidas"] / geral["segundos"] if geral["segundos"] else 0.0
+    print(f"\n✅ Backfill concluído: {geral['lidas']:,} linhas lidas, {geral['gravadas']:,} gravadas, "
+          f"{geral['ticker_desconhecido']:,} com ticker não cadastrado, {geral['invalidas']:,} inválidas "
+          f"em {geral['segundos']:.1f}s ({taxa:,.0f} linhas/s)")
+
+if __name__ == "__main__":
+    main()
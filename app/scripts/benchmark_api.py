@@ -0,0 +1,180 @@
+"""
+Benchmark das rotas da API sobre a base sintética de `dados_sinteticos`.
+
+Mede vazão e latência (p50/p95/p99, via `medir_rota`) de cada rota de leitura de
+acoes.py, usuarios.py e logs.py em vários níveis de concorrência e grava o resultado
+em JSON. As rotas que escrevem (POST/PUT/DELETE) ficam de fora: repetidas milhares de
+vezes elas mudariam a própria base medida (e o cadastro de ticker consulta o site
+externo). Suba o servidor com limites de taxa altos, senão as respostas 429 dominam:
+    RATE_LIMIT_PER_MINUTE=100000000 RATE_LIMIT_API_KEY_PER_MINUTE=100000000 uvicorn app.main:app --workers 4
+
+Uso:
+    python -m app.scripts.benchmark_api gerar --tickers 500 --dias 2520 --logs 1000000
+    python -m app.scripts.benchmark_api executar --url http://127.0.0.1:8000 --concorrencias 1,16,64 \\
+        --total 500 --saida base.json
+    python -m app.scripts.benchmark_api comparar base.json novo.json --tolerancia 0.10
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import re
+import string
+import sys
+from typing import Dict, List, Optional
+
+from app.scripts.benchmark_concorrencia import medir_rota
+
+def codigo_ticker(indice: int) -> str:
+    """Código sintético no formato da B3 (quatro letras + 3): 0 -> AAAA3, 1 -> AAAB3..."""
+    letras = []
+    for _ in range(4):
+        indice, resto = divmod(indice, 26)
+        letras.append(string.ascii_uppercase[resto])
+    return "".join(reversed(letras)) + "3"
+
+def chave_usuario(indice: int) -> str:
+    return f"bench-{indice:06d}"
+
+def _tickers(quantidade: int) -> str:
+    return ",".join(codigo_ticker(i) for i in range(quantidade))
+
+def catalogo_rotas(tickers_base: int) -> Dict[str, str]:
+    """Nome -> caminho com parâmetros, usando os códigos determinísticos da base sintética."""
+    ticker = codigo_ticker(min(7, tickers_base - 1))
+    varios = _tickers(min(10, tickers_base))
+    return {
+        "acoes.listar_todos": "/api/v1/acoes/listar-todos",
+        "acoes.buscar": f"/api/v1/acoes/buscar?tickers={varios}",
+        "acoes.historico_multi": f"/api/v1/acoes/historico?tickers={varios}&limite=5000",
+        "acoes.indicadores_multi": f"/api/v1/acoes/indicadores?tickers={varios}&range=1y",
+        "acoes.grafico_comparativo": "/api/v1/acoes/grafico-comparativo",
+        "acoes.grafico_comparativo_5y_semanal": "/api/v1/acoes/grafico-comparativo?range=5y&interval=weekly",
+        "acoes.indices_principais": "/api/v1/acoes/indices/principais",
+        "acoes.acao": f"/api/v1/acoes/{ticker}",
+        "acoes.grafico": f"/api/v1/acoes/{ticker}/grafico",
+        "acoes.grafico_max_mensal": f"/api/v1/acoes/{ticker}/grafico?range=max&interval=monthly",
+        "acoes.indicadores": f"/api/v1/acoes/{ticker}/indicadores?indicadores=sma:20,ema:50,rsi,volatilidade,drawdown",
+        "acoes.historico": f"/api/v1/acoes/{ticker}/historico",
+        "acoes.historico_csv": f"/api/v1/acoes/{ticker}/historico?formato=csv",
+        "acoes.eventos": f"/api/v1/acoes/{ticker}/eventos",
+        "usuarios.listar": "/api/v1/usuarios/",
+        "usuarios.obter": "/api/v1/usuarios/1",
+        "logs.coleta": "/api/v1/logs/coleta",
+        "logs.uso_endpoint": "/api/v1/logs/uso",
+        "logs.uso_minuto": "/api/v1/logs/uso?agrupar=minuto&limite=1440",
+    }
+
+async def executar(url_base: str, concorrencias: List[int], total: int, aquecimento: int, tickers_base: int,
+                   api_key: Optional[str], filtro: Optional[str] = None) -> dict:
+    headers = {"X-API-Key": api_key} if api_key else None
+    rotas = catalogo_rotas(tickers_base)
+    if filtro:
+        rotas = {nome: caminho for nome, caminho in rotas.items() if re.search(filtro, nome)}
+    resultados = []
+    for nome, caminho in rotas.items():
+        url = url_base.rstrip("/") + caminho
+        await medir_rota(url, min(max(concorrencias), aquecimento), aquecimento, headers)
+        for concorrencia in concorrencias:
+            resultado = await medir_rota(url, concorrencia, max(total, concorrencia), headers)
+            resultado["rota"] = nome
+            resultados.append(resultado)
+            print(f"{nome:<36} c={concorrencia:<4} {resultado['req_por_s']:>9} req/s  p50 {resultado['p50_ms']:>8} ms  "
+                  f"p95 {resultado['p95_ms']:>8} ms  p99 {resultado['p99_ms']:>8} ms  erros {resultado['erros']}")
+            if resultado["status"].get("429"):
+                print(f"   ⚠️  {resultado['status']['429']} respostas 429: aumente os limites de taxa do servidor.")
+    return {
+        "gerado_em": datetime.datetime.now().isoformat(timespec="seconds"),
+        "url": url_base,
+        "python": platform.python_version(),
+        "parametros": {"concorrencias": concorrencias, "total": total, "aquecimento": aquecimento, "tickers_base": tickers_base},
+        "resultados": resultados,
+    }
+
+def comparar(base: dict, novo: dict, tolerancia: float) -> List[dict]:
+    """
+    Compara dois resultados por (rota, concorrência). É regressão quando o p95 ou o p99
+    sobem, ou a vazão cai, mais que `tolerancia` (fração), ou quando aparecem erros.
+    """
+    anteriores = {(r["rota"], r["concorrencia"]): r for r in base["resultados"]}
+    linhas = []
+    for atual in novo["resultados"]:
+        anterior = anteriores.get((atual["rota"], atual["concorrencia"]))
+        if anterior is None:
+            continue
+        motivos = []
+        for campo in ("p95_ms", "p99_ms"):
+            if anterior[campo] and atual[campo] > anterior[campo] * (1 + tolerancia):
+                motivos.append(f"{campo} +{(atual[campo] / anterior[campo] - 1) * 100:.0f}%")
+        if anterior["req_por_s"] and atual["req_por_s"] < anterior["req_por_s"] * (1 - tolerancia):
+            motivos.append(f"vazão {(atual['req_por_s'] / anterior['req_por_s'] - 1) * 100:.0f}%")
+        if atual["erros"] > anterior["erros"]:
+            motivos.append(f"erros {anterior['erros']} -> {atual['erros']}")
+        linhas.append({
+            "rota": atual["rota"],
+            "concorrencia": atual["concorrencia"],
+            "p95_ms": (anterior["p95_ms"], atual["p95_ms"]),
+            "req_por_s": (anterior["req_por_s"], atual["req_por_s"]),
+            "regressoes": motivos,
+        })
+    return linhas
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas da API sobre uma base sintética.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    gerar = comandos.add_parser("gerar", help="Popula DATABASE_URL com a base sintética")
+    gerar.add_argument("--tickers", type=int, default=500)
+    gerar.add_argument("--dias", type=int, default=2520, help="Dias úteis de histórico por ticker (2520 ≈ 10 anos)")
+    gerar.add_argument("--eventos-por-ticker", type=int, default=8)
+    gerar.add_argument("--usuarios", type=int, default=100)
+    gerar.add_argument("--logs", type=int, default=200_000, help="Logs de requisição brutos")
+    gerar.add_argument("--dias-logs", type=int, default=30)
+    gerar.add_argument("--semente", type=int, default=42)
+
+    rodar = comandos.add_parser("executar", help="Mede as rotas em um servidor em execução")
+    rodar.add_argument("--url", default="http://127.0.0.1:8000")
+    rodar.add_argument("--api-key", default=chave_usuario(0), help="Chave de API (os usuários sintéticos usam bench-NNNNNN)")
+    rodar.add_argument("--concorrencias", default="1,16,64", help="Níveis de concorrência separados por vírgula")
+    rodar.add_argument("--total", type=int, default=500, help="Requisições por rota e nível de concorrência")
+    rodar.add_argument("--aquecimento", type=int, default=50)
+    rodar.add_argument("--tickers-base", type=int, default=500, help="Valor de --tickers usado no `gerar`")
+    rodar.add_argument("--rotas", help="Expressão regular sobre os nomes das rotas (ex.: 'grafico|buscar')")
+    rodar.add_argument("--saida", help="Arquivo JSON com os resultados")
+
+    cmp = comandos.add_parser("comparar", help="Compara dois resultados e aponta regressões")
+    cmp.add_argument("base")
+    cmp.add_argument("novo")
+    cmp.add_argument("--tolerancia", type=float, default=0.10, help="Variação aceita (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.comando == "gerar":
+        # Importado só aqui: executar/comparar não precisam de DATABASE_URL.
+        from app.scripts.dados_sinteticos import gerar as gerar_base
+        gerar_base(args.tickers, args.dias, args.eventos_por_ticker, args.usuarios, args.logs, args.dias_logs, args.semente)
+    elif args.comando == "executar":
+        concorrencias = [int(c) for c in args.concorrencias.split(",") if c.strip()]
+        resultado = asyncio.run(executar(args.url, concorrencias, args.total, args.aquecimento, args.tickers_base,
+                                         args.api_key, args.rotas))
+        if args.saida:
+            with open(args.saida, "w", encoding="utf-8") as f:
+                json.dump(resultado, f, ensure_ascii=False, indent=2)
+            print(f"\n💾 Resultados gravados em {args.saida}")
+    else:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.novo, encoding="utf-8") as f:
+            novo = json.load(f)
+        linhas = comparar(base, novo, args.tolerancia)
+        for linha in linhas:
+            marca = "❌" if linha["regressoes"] else "✅"
+            print(f"{marca} {linha['rota']:<36} c={linha['concorrencia']:<4} "
+                  f"p95 {linha['p95_ms'][0]} -> {linha['p95_ms'][1]} ms  "
+                  f"req/s {linha['req_por_s'][0]} -> {linha['req_por_s'][1]}  {'; '.join(linha['regressoes'])}")
+        regressoes = sum(1 for linha in linhas if linha["regressoes"])
+        print(f"\n{regressoes} regressões em {len(linhas)} medições (tolerância {args.tolerancia:.0%}).")
+        sys.exit(1 if regressoes else 0)
+
+if __name__ == "__main__":
+    main()
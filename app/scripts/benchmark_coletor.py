@@ -0,0 +1,161 @@
+"""
+Benchmark offline do coletor: roda `run_collection` de ponta a ponta contra o
+servidor de replay (páginas sintéticas), sem tocar no statusinvest.com.br.
+
+Cadastra N tickers sintéticos no banco de DATABASE_URL (use um banco descartável,
+criado com `python create_tables.py`), sobe o servidor de replay com a latência,
+taxa de erro e de 429 pedidas e executa a coleta. Relata o tempo de cada etapa
+(busca, gravação, artefatos), o tempo somado de rede e de extração dentro da busca
+(as duas se sobrepõem), o pico de memória (RSS do processo e do pool de extração) e
+tickers/s.
+
+Uso:
+    DATABASE_URL=sqlite:///coletor_bench.db python create_tables.py
+    DATABASE_URL=sqlite:///coletor_bench.db python -m app.scripts.benchmark_coletor \\
+        --tickers 5000 --latencia-ms 50 --variacao-ms 30 --taxa-429 0.01 --concorrencia 32 --saida coletor.json
+"""
+import argparse
+import json
+import logging
+import resource
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import SessionLocal
+from app.scripts import collect_data
+from app.scripts.benchmark_api import codigo_ticker
+from app.scripts.servidor_replay import adicionar_argumentos, iniciar_servidor, opcoes_dos_argumentos
+
+def _pico_rss_mb(quem: int) -> float:
+    # ru_maxrss vem em KB no Linux e em bytes no macOS.
+    pico = resource.getrusage(quem).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _pico_rss_pool_mb() -> float:
+    """
+    Maior pico de RSS entre os processos do pool de extração. Eles são filhos do
+    forkserver, não deste processo, então RUSAGE_CHILDREN só serve de alternativa
+    onde não há /proc.
+    """
+    pool = collect_data._pool[1] if collect_data._pool is not None else None
+    picos = []
+    for pid in (pool._processes or {}) if pool is not None else ():
+        try:
+            with open(f"/proc/{pid}/status") as status:
+                picos += [int(linha.split()[1]) for linha in status if linha.startswith("VmHWM:")]
+        except OSError:
+            pass
+    if not picos:
+        return _pico_rss_mb(resource.RUSAGE_CHILDREN)
+    return round(max(picos) / 1024, 1)
+
+def cadastrar_tickers(quantidade: int) -> int:
+    """Garante os N tickers sintéticos e devolve o total de tickers do banco (todos são coletados)."""
+    codigos = [codigo_ticker(i) for i in range(quantidade)]
+    db = SessionLocal()
+    try:
+        existentes = set(db.execute(select(models.Ticker.codigo).where(models.Ticker.codigo.in_(codigos))).scalars())
+        novos = [{"codigo": c, "nome": f"Empresa Sintética {c}"} for c in codigos if c not in existentes]
+        if novos:
+            db.execute(insert(models.Ticker), novos)
+            db.commit()
+        return len(db.execute(select(models.Ticker.codigo)).all())
+    finally:
+        db.close()
+
+def executar(tickers: int, opcoes_servidor: dict, concorrencia: int, req_por_segundo: float, motor: str,
+             processos: int, backoff: float, medir_heap: bool = False) -> dict:
+    total_tickers = cadastrar_tickers(tickers)
+    if total_tickers != tickers:
+        logging.warning(f"⚠️ O banco tem {total_tickers} tickers; todos serão coletados.")
+    servidor, base_url = iniciar_servidor(**opcoes_servidor)
+    settings.COLETA_BASE_URL = base_url
+    settings.COLETA_MAX_CONCORRENCIA = concorrencia
+    settings.COLETA_MAX_REQ_POR_SEGUNDO = req_por_segundo
+    settings.COLETA_MOTOR_EXTRACAO = motor
+    settings.COLETA_PROCESSOS_EXTRACAO = processos
+    settings.COLETA_BACKOFF_SEGUNDOS = backoff
+    rss_antes = _pico_rss_mb(resource.RUSAGE_SELF)
+    if medir_heap:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        resultado = collect_data.run_collection()
+    finally:
+        servidor.shutdown()
+    duracao = time.perf_counter() - inicio
+    rss_pool = _pico_rss_pool_mb()
+    heap = tracemalloc.get_traced_memory()[1] if medir_heap else None
+    if medir_heap:
+        tracemalloc.stop()
+    coleta = resultado["coleta"]
+    return {
+        "parametros": {
+            "tickers": total_tickers, "concorrencia": concorrencia, "req_por_segundo": req_por_segundo,
+            "motor": motor, "processos": processos, "backoff_s": backoff, "servidor": opcoes_servidor,
+        },
+        "resultado": resultado["resultado"],
+        "duracao_s": round(duracao, 3),
+        "tickers_por_s": round(total_tickers / duracao, 2) if duracao > 0 else 0.0,
+        "etapas_s": resultado["etapas_s"],
+        "coleta": coleta,
+        "memoria": {
+            "rss_pico_mb": _pico_rss_mb(resource.RUSAGE_SELF),
+            "rss_pico_antes_mb": rss_antes,
+            "rss_pico_pool_mb": rss_pool,
+            "heap_python_pico_mb": round(heap / 2 ** 20, 1) if heap is not None else None,
+        },
+    }
+
+def imprimir(relatorio: dict):
+    etapas, coleta, memoria = relatorio["etapas_s"], relatorio["coleta"], relatorio["memoria"]
+    print(f"\n📊 {relatorio['parametros']['tickers']} tickers em {relatorio['duracao_s']}s "
+          f"({relatorio['tickers_por_s']} tickers/s) — {relatorio['resultado']}")
+    for etapa in ("busca", "gravacao", "artefatos", "total"):
+        if etapa in etapas:
+            print(f"   {etapa:<10} {etapas[etapa]:>9.3f} s")
+    if coleta:
+        print(f"   rede (soma das requisições)  {coleta['rede_total_s']} s, p50 {coleta['latencia_p50_ms']} ms, "
+              f"p99 {coleta['latencia_p99_ms']} ms")
+        print(f"   extração (soma)              {coleta['extracao_total_s']} s")
+        print(f"   sucessos {coleta['sucessos']}, falhas {coleta['falhas']}, novas tentativas "
+              f"{coleta['tentativas_extras']}, respostas 429 {coleta['respostas_429']}")
+    heap = f", heap Python {memoria['heap_python_pico_mb']} MB" if memoria["heap_python_pico_mb"] is not None else ""
+    print(f"   memória: pico RSS {memoria['rss_pico_mb']} MB (antes da coleta {memoria['rss_pico_antes_mb']} MB), "
+          f"pool de extração {memoria['rss_pico_pool_mb']} MB{heap}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do coletor contra o servidor de replay.")
+    adicionar_argumentos(parser)
+    parser.add_argument("--tickers", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, default=settings.COLETA_MAX_CONCORRENCIA)
+    parser.add_argument("--req-por-segundo", type=float, default=0.0, help="Limite por host (0 = sem limite)")
+    parser.add_argument("--motor", default=settings.COLETA_MOTOR_EXTRACAO)
+    parser.add_argument("--processos", type=int, default=settings.COLETA_PROCESSOS_EXTRACAO,
+                        help="Processos de extração (0 = nº de CPUs, 1 = sem pool)")
+    parser.add_argument("--backoff", type=float, default=0.05, help="Backoff entre tentativas (s)")
+    parser.add_argument("--heap", action="store_true", help="Mede o pico do heap Python com tracemalloc (mais lento)")
+    parser.add_argument("--verboso", action="store_true", help="Mantém o log INFO por ticker do coletor")
+    parser.add_argument("--saida", help="Arquivo JSON com o relatório")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.verboso else logging.WARNING)
+    opcoes = opcoes_dos_argumentos(args)
+    opcoes["sinteticos"] = True
+    if args.diretorio:
+        opcoes["diretorio"] = args.diretorio
+    relatorio = executar(args.tickers, opcoes, args.concorrencia, args.req_por_segundo, args.motor,
+                         args.processos, args.backoff, args.heap)
+    imprimir(relatorio)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Relatório gravado em {args.saida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Teste de carga simples: dispara requisições com N conexões simultâneas e mede vazão
+e latência (p50/p95/p99). Usado para comparar o caminho síncrono (threadpool) com o
+assíncrono, rodando a mesma rota em dois servidores.
+
+Uso:
+    python -m app.scripts.benchmark_concorrencia --url http://127.0.0.1:8000/api/v1/acoes/PETR4 \\
+        --api-key SUA_CHAVE --concorrencia 500 --total 20000
+    python -m app.scripts.benchmark_concorrencia --url http://127.0.0.1:8000/api/v1/acoes/PETR4 \\
+        --url-comparacao http://127.0.0.1:8001/api/v1/acoes/PETR4 --concorrencia 500
+"""
+import argparse
+import asyncio
+import math
+import time
+from typing import Dict, Optional
+
+import httpx
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados), max(1, math.ceil(p / 100 * len(ordenados)))) - 1]
+
+async def medir_rota(url: str, concorrencia: int, total: int, headers: Optional[Dict[str, str]] = None,
+                     metodo: str = "GET", timeout: float = 30.0) -> dict:
+    """Executa `total` requisições com `concorrencia` conexões simultâneas e resume os resultados."""
+    latencias, status_codes = [], {}
+    restantes = total
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+
+    async with httpx.AsyncClient(headers=headers, limits=limites, timeout=timeout) as cliente:
+        async def trabalhador():
+            nonlocal restantes
+            while restantes > 0:
+                restantes -= 1
+                inicio = time.perf_counter()
+                try:
+                    resposta = await cliente.request(metodo, url)
+                    codigo = resposta.status_code
+                except httpx.HTTPError as e:
+                    codigo = type(e).__name__
+                latencias.append(time.perf_counter() - inicio)
+                status_codes[codigo] = status_codes.get(codigo, 0) + 1
+
+        inicio_total = time.perf_counter()
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+        duracao = time.perf_counter() - inicio_total
+
+    erros = sum(q for codigo, q in status_codes.items() if not (isinstance(codigo, int) and codigo < 400))
+    return {
+        "url": url,
+        "metodo": metodo,
+        "concorrencia": concorrencia,
+        "requisicoes": total,
+        "erros": erros,
+        "status": {str(k): v for k, v in status_codes.items()},
+        "duracao_s": round(duracao, 3),
+        "req_por_s": round(total / duracao, 1) if duracao > 0 else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+    }
+
+def imprimir(resultado: dict, rotulo: str = ""):
+    print(f"{rotulo}{resultado['url']} (c={resultado['concorrencia']}): {resultado['req_por_s']} req/s, "
+          f"p50 {resultado['p50_ms']} ms, p95 {resultado['p95_ms']} ms, p99 {resultado['p99_ms']} ms, "
+          f"{resultado['erros']} erros {resultado['status']}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Mede vazão e latência de uma rota sob concorrência.")
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--url-comparacao", help="Segunda URL (ex.: outro servidor) para comparação lado a lado")
+    parser.add_argument("--api-key")
+    parser.add_argument("--concorrencia", type=int, default=500)
+    parser.add_argument("--total", type=int, default=10000)
+    parser.add_argument("--aquecimento", type=int, default=200)
+    args = parser.parse_args()
+
+    headers = {"X-API-Key": args.api_key} if args.api_key else None
+    urls = [args.url] + ([args.url_comparacao] if args.url_comparacao else [])
+    resultados = []
+    for url in urls:
+        await medir_rota(url, min(args.concorrencia, args.aquecimento), args.aquecimento, headers)
+        resultados.append(await medir_rota(url, args.concorrencia, args.total, headers))
+    for i, resultado in enumerate(resultados):
+        imprimir(resultado, "A: " if i == 0 else "B: ")
+    if len(resultados) == 2 and resultados[0]["req_por_s"]:
+        print(f"B/A vazão: {resultados[1]['req_por_s'] / resultados[0]['req_por_s']:.2f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
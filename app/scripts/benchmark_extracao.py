@@ -0,0 +1,81 @@
+"""
+Benchmark dos motores de extração sobre um corpus de páginas salvas.
+
+Mede páginas/s de cada motor (serial e em pool de processos) e confere se todos
+extraem os mesmos valores que o motor de referência ("bs4").
+
+Uso:
+    python -m app.scripts.benchmark_extracao --diretorio paginas/ --repeticoes 5 --processos 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.scripts.extratores import EXTRATORES, extrair_pagina
+
+MOTOR_REFERENCIA = "bs4"
+
+def carregar_corpus(diretorio: str) -> dict:
+    paginas = {p.stem.upper(): p.read_text(encoding="utf-8", errors="replace") for p in sorted(Path(diretorio).glob("*.html"))}
+    if not paginas:
+        raise SystemExit(f"Nenhuma página .html encontrada em {diretorio}")
+    return paginas
+
+def medir_serial(motor: str, paginas: list, repeticoes: int) -> float:
+    extrator = EXTRATORES[motor]
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for html in paginas:
+            extrator(html)
+    return len(paginas) * repeticoes / (time.perf_counter() - inicio)
+
+def medir_pool(motor: str, paginas: list, repeticoes: int, processos: int) -> float:
+    carga = paginas * repeticoes
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        list(pool.map(extrair_pagina, paginas[:processos], [motor] * processos))
+        inicio = time.perf_counter()
+        list(pool.map(extrair_pagina, carga, [motor] * len(carga), chunksize=max(1, len(carga) // (processos * 8))))
+        return len(carga) / (time.perf_counter() - inicio)
+
+def comparar(corpus: dict) -> list:
+    divergencias = []
+    for ticker, html in corpus.items():
+        referencia = EXTRATORES[MOTOR_REFERENCIA](html)
+        for motor, extrator in EXTRATORES.items():
+            if motor == MOTOR_REFERENCIA:
+                continue
+            obtido = extrator(html)
+            for campo, esperado in referencia.items():
+                if obtido.get(campo) != esperado:
+                    divergencias.append((ticker, motor, campo, esperado, obtido.get(campo)))
+    return divergencias
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os motores de extração do coletor.")
+    parser.add_argument("--diretorio", required=True, help="Diretório com as páginas <ticker>.html")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    corpus = carregar_corpus(args.diretorio)
+    paginas = list(corpus.values())
+    print(f"Corpus: {len(paginas)} páginas, {sum(len(p) for p in paginas) / 1024:.0f} KiB\n")
+    print(f"{'motor':<8} {'serial (pág/s)':>16} {f'pool x{args.processos} (pág/s)':>20}")
+    for motor in EXTRATORES:
+        serial = medir_serial(motor, paginas, args.repeticoes)
+        pool = medir_pool(motor, paginas, args.repeticoes, args.processos) if args.processos > 1 else serial
+        print(f"{motor:<8} {serial:>16.1f} {pool:>20.1f}")
+
+    divergencias = comparar(corpus)
+    if divergencias:
+        print(f"\n❌ {len(divergencias)} divergências em relação ao motor '{MOTOR_REFERENCIA}':")
+        for ticker, motor, campo, esperado, obtido in divergencias[:50]:
+            print(f"   {ticker} [{motor}] {campo}: esperado={esperado!r} obtido={obtido!r}")
+        sys.exit(1)
+    print(f"\n✅ Todos os motores extraíram os mesmos valores que '{MOTOR_REFERENCIA}'.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark dos formatos das séries: JSON x Arrow IPC x Parquet.
+
+Mede bytes na rede (bruto e com gzip) e o tempo que o cliente leva para chegar a um
+DataFrame do pandas. Sem --url, usa o gráfico comparativo sintético (tickers x dias);
+com --url, baixa o endpoint informado uma vez em cada formato.
+
+Uso:
+    python -m app.scripts.benchmark_formatos --tickers 500 --dias 365
+    python -m app.scripts.benchmark_formatos --url http://localhost:8000/api/v1/acoes/grafico-comparativo?dias=365 --api-key KEY
+"""
+import argparse
+import gzip
+import io
+import time
+from datetime import date, timedelta
+
+import httpx
+import numpy as np
+import orjson
+import pandas as pd
+
+from app.core.formatos_colunares import FORMATO_ARROW, FORMATO_JSON, FORMATO_NDJSON, FORMATO_PARQUET, MIDIAS, montar_tabela, pa, serializar_tabela
+
+def payload_sintetico(tickers: int, dias: int) -> dict:
+    rng = np.random.default_rng(42)
+    datas = np.array([date.today() - timedelta(days=dias - i) for i in range(dias)], dtype="datetime64[D]")
+    colunas = {"date": datas}
+    for i in range(tickers):
+        colunas[f"T{i:04d}3"] = np.round(np.cumsum(rng.normal(0, 1, dias)), 2)
+    return colunas
+
+def codificar(colunas: dict, formato: str) -> bytes:
+    if formato == FORMATO_JSON:
+        labels = [str(d) for d in colunas["date"]]
+        datasets = [{"label": t, "data": v.tolist()} for t, v in colunas.items() if t != "date"]
+        return orjson.dumps({"labels": labels, "datasets": datasets})
+    return serializar_tabela(montar_tabela(colunas), formato)
+
+def decodificar(conteudo: bytes, formato: str) -> pd.DataFrame:
+    if formato == FORMATO_NDJSON:
+        return pd.DataFrame([orjson.loads(linha) for linha in conteudo.splitlines()])
+    if formato == FORMATO_JSON:
+        dados = orjson.loads(conteudo)
+        if "datasets" in dados:
+            return pd.DataFrame({d["label"]: d["data"] for d in dados["datasets"]}, index=pd.to_datetime(dados["labels"]))
+        return pd.DataFrame({"label": dados["labels"], "close": dados["data"]})
+    if formato == FORMATO_ARROW:
+        return pa.ipc.open_stream(conteudo).read_pandas()
+    return pd.read_parquet(io.BytesIO(conteudo))
+
+def medir(conteudo: bytes, formato: str, repeticoes: int) -> tuple:
+    decodificar(conteudo, formato)
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        df = decodificar(conteudo, formato)
+    return (time.perf_counter() - inicio) / repeticoes * 1000, df.shape
+
+def baixar(url: str, formato: str, api_key: str) -> tuple:
+    """(conteúdo, formato recebido); o pedido de JSON aceita NDJSON, que é o texto do /historico."""
+    aceita = f"{MIDIAS[FORMATO_JSON]}, {MIDIAS[FORMATO_NDJSON]};q=0.9" if formato == FORMATO_JSON else MIDIAS[formato]
+    headers = {"Accept": aceita}
+    if api_key:
+        headers["X-API-Key"] = api_key
+    resposta = httpx.get(url, headers=headers, timeout=120.0)
+    resposta.raise_for_status()
+    recebido = FORMATO_NDJSON if resposta.headers.get("content-type", "").startswith(MIDIAS[FORMATO_NDJSON]) else formato
+    return resposta.content, recebido
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara JSON, Arrow IPC e Parquet nas séries da API.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--url", help="Endpoint de série da API (grafico, grafico-comparativo ou historico)")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    if pa is None:
+        raise SystemExit("pyarrow não está instalado.")
+
+    colunas = None if args.url else payload_sintetico(args.tickers, args.dias)
+    origem = args.url or f"sintético: {args.tickers} tickers x {args.dias} dias"
+    print(origem)
+    print(f"{'formato':<10}{'bytes':>12}{'gzip':>12}{'decode ms':>12}  shape")
+    for formato in (FORMATO_JSON, FORMATO_ARROW, FORMATO_PARQUET):
+        if args.url:
+            conteudo, formato = baixar(args.url, formato, args.api_key)
+        else:
+            conteudo = codificar(colunas, formato)
+        comprimido = len(gzip.compress(conteudo, compresslevel=6))
+        ms, shape = medir(conteudo, formato, args.repeticoes)
+        print(f"{formato:<10}{len(conteudo):>12,}{comprimido:>12,}{ms:>12.2f}  {shape}")
+
+if __name__ == "__main__":
+    main()
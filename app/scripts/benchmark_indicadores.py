@@ -0,0 +1,94 @@
+"""
+Benchmark do motor de indicadores técnicos.
+
+Mede, para o conjunto de indicadores pedido, o cálculo completo (cache frio), a
+leitura com cache quente e a atualização incremental depois de um dia novo no fim
+de cada série — por ticker e para todos os tickers. Sem --banco usa séries
+sintéticas (tickers x dias); com --banco lê o histórico real.
+
+Uso:
+    python -m app.scripts.benchmark_indicadores --tickers 500 --dias 2500
+    python -m app.scripts.benchmark_indicadores --banco --indicadores sma:50,ema:20,rsi,volatilidade,drawdown
+"""
+import argparse
+import time
+from typing import Dict
+
+import numpy as np
+
+from app.services import indicadores
+from app.services.armazem_precos import SerieTicker
+
+def series_sinteticas(tickers: int, dias: int) -> Dict[str, SerieTicker]:
+    rng = np.random.default_rng(42)
+    datas = np.arange(np.datetime64("2000-01-03"), np.datetime64("2000-01-03") + dias)
+    return {
+        f"T{i:04d}3": SerieTicker(datas, {
+            "close": 30 * np.exp(np.cumsum(rng.normal(0, 0.02, dias))),
+            "volume": rng.integers(1_000, 1_000_000, dias).astype(np.float64),
+        })
+        for i in range(tickers)
+    }
+
+def series_do_banco() -> Dict[str, SerieTicker]:
+    from sqlalchemy import select
+
+    from app.db import models
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        tickers = db.execute(select(models.Ticker.codigo)).scalars().all()
+        return indicadores.carregar_series(db, tickers)
+    finally:
+        db.close()
+
+def com_dia_novo(serie: SerieTicker) -> SerieTicker:
+    """Mesma série com um pregão a mais no fim."""
+    proxima = serie.datas[-1] + 1 if len(serie.datas) else np.datetime64("2000-01-03")
+    ultimo = serie.colunas["close"][-1] if len(serie.datas) else 30.0
+    return SerieTicker(np.r_[serie.datas, proxima], {
+        "close": np.r_[serie.colunas["close"], ultimo * 1.01],
+        "volume": np.r_[serie.colunas["volume"], 1_000.0],
+    })
+
+def medir(motor: indicadores.MotorIndicadores, series: Dict[str, SerieTicker], pedidos, versao: int, com_serie: bool = True) -> float:
+    inicio = time.perf_counter()
+    for ticker, serie in series.items():
+        motor.calcular(ticker, pedidos, versao, serie if com_serie else None)
+    return time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de cálculo dos indicadores técnicos (completo, cache e incremental).")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=2500)
+    parser.add_argument("--banco", action="store_true", help="Usa o histórico do banco em vez de séries sintéticas")
+    parser.add_argument("--indicadores", default=",".join(indicadores.INDICADORES),
+                        help="Mesmo formato do parâmetro `indicadores` da API")
+    args = parser.parse_args()
+
+    series = series_do_banco() if args.banco else series_sinteticas(args.tickers, args.dias)
+    pedidos = indicadores.interpretar_pedidos(args.indicadores)
+    linhas = sum(len(s.datas) for s in series.values())
+    print(f"{len(series)} tickers, {linhas:,} linhas, indicadores: {', '.join(map(indicadores.nome_coluna, pedidos))}")
+
+    motor = indicadores.MotorIndicadores(capacidade=len(series) * len(pedidos))
+    completo = medir(motor, series, pedidos, versao=1)
+    quente = medir(motor, series, pedidos, versao=1, com_serie=False)
+    incremental = medir(motor, {t: com_dia_novo(s) for t, s in series.items()}, pedidos, versao=2)
+
+    print("\nPor indicador (cálculo completo, todos os tickers):")
+    for pedido in pedidos:
+        inicio = time.perf_counter()
+        for serie in series.values():
+            indicadores.calcular(pedido, serie)
+        decorrido = time.perf_counter() - inicio
+        print(f"  {indicadores.nome_coluna(pedido):<18}{decorrido * 1000:>10.1f} ms  ({decorrido / len(series) * 1e6:>8.1f} µs/ticker)")
+
+    print(f"\n{'cenário':<28}{'total ms':>12}{'ms/ticker':>12}")
+    for nome, segundos in (("completo (cache frio)", completo), ("cache quente", quente), ("incremental (+1 dia)", incremental)):
+        print(f"{nome:<28}{segundos * 1000:>12.1f}{segundos / len(series) * 1000:>12.3f}")
+    print(f"\n{motor.estatisticas()}")
+
+if __name__ == "__main__":
+    main()
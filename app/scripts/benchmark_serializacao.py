@@ -0,0 +1,87 @@
+"""
+Benchmark da serialização das respostas grandes, de 1 KB a 10 MB.
+
+"antes" é o caminho padrão do FastAPI: revalidação do retorno contra o
+`response_model` (`serialize_response`) seguida do `JSONResponse` da biblioteca
+padrão. "depois" é o modelo entregue direto à `RespostaJSONRapida` (orjson).
+
+Uso:
+    python -m app.scripts.benchmark_serializacao --repeticoes 20
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.json_rapido import DECIMAIS_FLOAT, DECIMAIS_TEXTO, RespostaJSONRapida
+from app.schemas.grafico import GraficoComparativoOut, GraficoDataOut, GraficoDataset
+
+TAMANHOS_KB = [1, 10, 100, 1024, 10 * 1024]
+
+def _labels(n: int) -> list:
+    inicio = date(2000, 1, 1)
+    return [(inicio + timedelta(days=i)).strftime("%d/%m") for i in range(n)]
+
+def payload_grafico(bytes_alvo: int) -> GraficoDataOut:
+    """Série de um ticker com preços Decimal; ~20 bytes por ponto no JSON."""
+    n = max(1, bytes_alvo // 20)
+    precos = [Decimal(f"{random.uniform(5, 80):.2f}") for _ in range(n)]
+    return GraficoDataOut(labels=_labels(n), data=precos)
+
+def payload_grafico_float(bytes_alvo: int) -> dict:
+    """Como o endpoint /{ticker}/grafico entrega agora: preços já em float (CAST no SQL)."""
+    modelo = payload_grafico(bytes_alvo)
+    return {"labels": modelo.labels, "data": [float(p) for p in modelo.data]}
+
+def payload_comparativo(bytes_alvo: int) -> GraficoComparativoOut:
+    """365 pontos por ticker, ~7 KB por ticker no JSON; o número de tickers cresce com o alvo."""
+    pontos = 365 if bytes_alvo >= 8 * 1024 else max(1, bytes_alvo // 24)
+    n_tickers = max(1, bytes_alvo // (pontos * 19))
+    datasets = [GraficoDataset(label=f"T{i:04d}3", data=[round(random.uniform(-50, 50), 2) for _ in range(pontos)])
+                for i in range(n_tickers)]
+    return GraficoComparativoOut(labels=_labels(pontos), datasets=datasets)
+
+def _antes(campo, tipo, modelo) -> bytes:
+    if not isinstance(modelo, tipo):
+        modelo = tipo(**modelo)
+    conteudo = asyncio.run(serialize_response(field=campo, response_content=modelo))
+    return JSONResponse(conteudo).body
+
+def medir(funcao, repeticoes: int) -> float:
+    funcao()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a serialização padrão com a RespostaJSONRapida.")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args()
+    random.seed(42)
+
+    casos = [
+        ("grafico (Decimal→float)", GraficoDataOut, payload_grafico, DECIMAIS_FLOAT),
+        ("grafico (Decimal→texto)", GraficoDataOut, payload_grafico, DECIMAIS_TEXTO),
+        ("grafico (float)", GraficoDataOut, payload_grafico_float, DECIMAIS_FLOAT),
+        ("comparativo", GraficoComparativoOut, payload_comparativo, DECIMAIS_FLOAT),
+    ]
+    print(f"{'caso':<26}{'alvo':>9}{'tamanho':>11}{'antes ms':>11}{'depois ms':>11}{'ganho':>8}")
+    for nome, tipo, gerar, decimais in casos:
+        campo = create_response_field(name="resposta", type_=tipo)
+        for kb in TAMANHOS_KB:
+            modelo = gerar(kb * 1024)
+            repeticoes = max(1, args.repeticoes if kb < 1024 else args.repeticoes // 5)
+            antes = medir(lambda: _antes(campo, tipo, modelo), repeticoes)
+            depois = medir(lambda: RespostaJSONRapida(modelo, decimais=decimais).body, repeticoes)
+            tamanho = len(RespostaJSONRapida(modelo, decimais=decimais).body)
+            print(f"{nome:<26}{kb:>7}KB{tamanho / 1024:>9.0f}KB{antes:>11.2f}{depois:>11.2f}{antes / depois:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,37 @@
+import math
+import multiprocessing
+import os
+import time
+import threading
 import requests
 import pandas as pd
 import logging
-from bs4 import BeautifulSoup
-from datetime import datetime
-from sqlalchemy import text
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
+from requests.adapters import HTTPAdapter
+from sqlalchemy import delete, select, text
 
+from app.core import metricas
+from app.core.config import settings
 from app.db.database import SessionLocal
-from app.db.models import Ticker, HistoricoAcao, ColetaLog
+from app.db.carga import inserir_snapshots, upsert_historico
+from app.db.models import Ticker, HistoricoAcao, ColetaLog, SnapshotAcao
+from app.scripts.extratores import extrair_pagina_medindo, obter_extrator
+from app.services import acao_service, log_service
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+CAMADAS_INTRADAY = ("principal", "cauda")
+
+def agora_bolsa() -> datetime:
+    """Instante atual no fuso da bolsa (COLETA_FUSO_HORARIO), com tzinfo."""
+    return datetime.now(ZoneInfo(settings.COLETA_FUSO_HORARIO))
+
 def salvar_log_no_banco(db_session, mensagem: str, status: str = "INFO"):
     """Salva um log na tabela 'coleta_logs' de forma segura."""
     try:
@@ -20,13 +42,152 @@ def salvar_log_no_banco(db_session, mensagem: str, status: str = "INFO"):
         logging.error(f"Falha ao salvar log no banco de dados: {e}")
         db_session.rollback()
 
-class DataCollector:
+def _percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados), max(1, math.ceil(p / 100 * len(ordenados)))) - 1
+    return ordenados[indice]
+
+def _contexto_processos():
+    """
+    forkserver (spawn onde não existe): o pool é criado com as threads de download e as
+    do scheduler rodando, e um fork copiaria locks ocupados por elas (logging, urllib3)
+    para os processos de extração, que poderiam travar.
+    """
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+
+_pool_lock = threading.Lock()
+_pool = None
+
+def pool_extracao(processos: int) -> ProcessPoolExecutor:
+    """
+    Pool de extração do processo, criado na primeira coleta e reaproveitado pelas
+    seguintes (e pelas camadas intradiárias ao mesmo tempo): sem fork, cada processo
+    novo reimporta o módulo principal, custo que não deve se repetir a cada minuto.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool[0] != processos:
+            if _pool is not None:
+                _pool[1].shutdown(wait=False)
+            _pool = (processos, ProcessPoolExecutor(max_workers=processos, mp_context=_contexto_processos()))
+        return _pool[1]
+
+def _descartar_pool(pool: Optional[ProcessPoolExecutor]):
+    """Um processo de extração morreu: o pool quebrado é trocado na próxima coleta."""
+    global _pool
+    if pool is None:
+        return
+    with _pool_lock:
+        if _pool is not None and _pool[1] is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+class LimitadorTaxa:
+    """Garante um intervalo mínimo entre requisições disparadas para o mesmo host."""
+    def __init__(self, max_por_segundo: float):
+        self.intervalo = 1.0 / max_por_segundo if max_por_segundo > 0 else 0.0
+        self._proximo_disparo = {}
+        self._lock = threading.Lock()
+
+    def aguardar(self, host: str):
+        if not self.intervalo:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            disparo = max(agora, self._proximo_disparo.get(host, agora))
+            self._proximo_disparo[host] = disparo + self.intervalo
+        espera = disparo - agora
+        if espera > 0:
+            time.sleep(espera)
+
+_recursos_lock = threading.Lock()
+_recursos = {}
+
+def _recursos_compartilhados() -> Tuple[LimitadorTaxa, threading.BoundedSemaphore]:
+    """
+    Limitador de taxa e semáforo de requisições em andamento comuns a todas as coletas
+    do processo: as camadas do scheduler rodando ao mesmo tempo dividem
+    COLETA_MAX_REQ_POR_SEGUNDO e COLETA_MAX_CONCORRENCIA em vez de somá-los.
+    """
+    chave = (settings.COLETA_MAX_REQ_POR_SEGUNDO, settings.COLETA_MAX_CONCORRENCIA)
+    with _recursos_lock:
+        if chave not in _recursos:
+            _recursos[chave] = (LimitadorTaxa(chave[0]), threading.BoundedSemaphore(max(1, chave[1])))
+        return _recursos[chave]
+
+class EstatisticasColeta:
+    """Acumula latências e contadores de uma execução do coletor (thread-safe)."""
     def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = []
+        self.sucessos = 0
+        self.falhas = 0
+        self.tentativas_extras = 0
+        self.respostas_429 = 0
+        self.tempo_rede = 0.0
+        self.tempo_extracao = 0.0
+        self.inicio = None
+        self.fim = None
+
+    def registrar(self, latencia: float, sucesso: bool, tentativas: int, tempo_rede: float = 0.0, respostas_429: int = 0):
+        with self._lock:
+            self.latencias.append(latencia)
+            self.tentativas_extras += max(0, tentativas - 1)
+            self.tempo_rede += tempo_rede
+            self.respostas_429 += respostas_429
+            if sucesso:
+                self.sucessos += 1
+            else:
+                self.falhas += 1
+
+    def registrar_extracao(self, duracao: float):
+        with self._lock:
+            self.tempo_extracao += duracao
+
+    def resumo(self) -> dict:
+        duracao = (self.fim or time.monotonic()) - (self.inicio or time.monotonic())
+        total = self.sucessos + self.falhas
+        return {
+            "tickers": total,
+            "sucessos": self.sucessos,
+            "falhas": self.falhas,
+            "tentativas_extras": self.tentativas_extras,
+            "respostas_429": self.respostas_429,
+            "rede_total_s": round(self.tempo_rede, 3),
+            "extracao_total_s": round(self.tempo_extracao, 3),
+            "duracao_s": round(duracao, 3),
+            "tickers_por_s": round(total / duracao, 2) if duracao > 0 else 0.0,
+            "latencia_p50_ms": round(_percentil(self.latencias, 50) * 1000, 1),
+            "latencia_p99_ms": round(_percentil(self.latencias, 99) * 1000, 1),
+        }
+
+    def __str__(self) -> str:
+        r = self.resumo()
+        return (f"{r['sucessos']}/{r['tickers']} tickers em {r['duracao_s']}s "
+                f"({r['tickers_por_s']} tickers/s, p50 {r['latencia_p50_ms']} ms, "
+                f"p99 {r['latencia_p99_ms']} ms, {r['tentativas_extras']} novas tentativas)")
+
+class DataCollector:
+    def __init__(self, base_url: Optional[str] = None, max_concorrencia: Optional[int] = None):
         self.db_session = SessionLocal()
-        self.base_url = "https://statusinvest.com.br/acoes/"
+        self.base_url = base_url or settings.COLETA_BASE_URL
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
         }
+        self.max_concorrencia = max(1, max_concorrencia or settings.COLETA_MAX_CONCORRENCIA)
+        self.http = requests.Session()
+        self.http.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concorrencia)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.limitador, self.em_andamento = _recursos_compartilhados()
+        self.estatisticas = EstatisticasColeta()
+        self.motor_extracao = settings.COLETA_MOTOR_EXTRACAO
+        obter_extrator(self.motor_extracao)
+        self.processos_extracao = settings.COLETA_PROCESSOS_EXTRACAO or (os.cpu_count() or 1)
         logging.info("✅ Coletor de dados inicializado.")
     def get_tickers_from_db(self) -> list:
         logging.info("Buscando lista de tickers do banco de dados...")
@@ -41,37 +202,107 @@ class DataCollector:
         except Exception as e:
             logging.error(f"❌ Erro ao buscar tickers do banco de dados: {e}")
             return []
-    def fetch_stock_data(self, tickers: list) -> pd.DataFrame:
-        all_data = []
-        for ticker in tickers:
+    def _requisitar(self, url: str) -> Optional[requests.Response]:
+        """GET com limite de taxa por host e novas tentativas com backoff exponencial."""
+        host = urlparse(url).netloc
+        tentativa = 0
+        latencia = 0.0
+        tempo_rede = 0.0
+        respostas_429 = 0
+        response = None
+        while tentativa < settings.COLETA_MAX_TENTATIVAS:
+            tentativa += 1
+            self.limitador.aguardar(host)
+            inicio = time.monotonic()
             try:
-                url = f"{self.base_url}{ticker}"
-                response = requests.get(url, headers=self.headers, timeout=10)
-                if response.status_code != 200:
-                    logging.error(f"❌ Erro ao acessar {url}, código {response.status_code}")
+                with self.em_andamento:
+                    response = self.http.get(url, timeout=settings.COLETA_TIMEOUT_SEGUNDOS)
+                latencia = time.monotonic() - inicio
+                tempo_rede += latencia
+                respostas_429 += response.status_code == 429
+                if response.status_code not in STATUS_REPETIVEIS:
+                    break
+                logging.warning(f"⚠️ {url} respondeu {response.status_code} (tentativa {tentativa})")
+            except requests.RequestException as e:
+                response = None
+                latencia = time.monotonic() - inicio
+                tempo_rede += latencia
+                logging.warning(f"⚠️ Falha de rede em {url} (tentativa {tentativa}): {e}")
+            if tentativa < settings.COLETA_MAX_TENTATIVAS:
+                espera = settings.COLETA_BACKOFF_SEGUNDOS * (2 ** (tentativa - 1))
+                retry_after = response.headers.get("Retry-After") if response is not None else None
+                if retry_after and retry_after.isdigit():
+                    espera = max(espera, float(retry_after))
+                time.sleep(espera)
+        sucesso = response is not None and response.status_code == 200
+        self.estatisticas.registrar(latencia, sucesso, tentativa, tempo_rede, respostas_429)
+        return response
+    def _baixar_pagina(self, ticker: str) -> Optional[str]:
+        try:
+            url = f"{self.base_url}{ticker}"
+            response = self._requisitar(url)
+            if response is None:
+                logging.error(f"❌ Erro ao acessar {url}: sem resposta após {settings.COLETA_MAX_TENTATIVAS} tentativas")
+                return None
+            if response.status_code != 200:
+                logging.error(f"❌ Erro ao acessar {url}, código {response.status_code}")
+                return None
+            return response.text
+        except Exception as e:
+            logging.error(f"❌ Erro geral ao buscar dados de {ticker}: {e}")
+            return None
+    def _montar_registro(self, ticker: str, campos: dict) -> dict:
+        logging.info(f"✅ Dados coletados para {ticker}")
+        # Uma única leitura do relógio: a data do pregão é a da bolsa e coletado_em fica em UTC
+        # (sem tzinfo), como as demais colunas de data e hora.
+        agora = agora_bolsa()
+        coletado_em = agora.astimezone(timezone.utc).replace(tzinfo=None)
+        return {"date": agora.date(), "coletado_em": coletado_em, "ticker": ticker, **campos}
+    def fetch_stock_data(self, tickers: list) -> pd.DataFrame:
+        """
+        Baixa as páginas em paralelo (threads) e, conforme chegam, envia o HTML para
+        extração em um pool de processos, sobrepondo rede e CPU.
+        """
+        self.estatisticas.inicio = time.monotonic()
+        resultados = [None] * len(tickers)
+        pool = pool_extracao(self.processos_extracao) if self.processos_extracao > 1 else None
+        with ThreadPoolExecutor(max_workers=min(self.max_concorrencia, max(1, len(tickers)))) as executor:
+            downloads = {executor.submit(self._baixar_pagina, ticker): i for i, ticker in enumerate(tickers)}
+            extracoes = {}
+            for futuro in as_completed(downloads):
+                i = downloads.pop(futuro)
+                html = futuro.result()
+                # Sem isso o futuro (e o HTML) ficaria vivo até o fim da coleta.
+                del futuro
+                if html is None:
                     continue
-                soup = BeautifulSoup(response.text, "html.parser")
-                def clean_value(value_str):
-                    if not value_str: return None
+                if pool is not None:
                     try:
-                        cleaned_str = value_str.replace("R$", "").strip().replace(".", "").replace("%", "").replace(",", ".")
-                        return float(cleaned_str)
-                    except (ValueError, AttributeError):
-                        return None
-                price_tag = soup.find("strong", class_="value")
-                close_price = clean_value(price_tag.text) if price_tag else None
-                indicators = {}
-                indicator_elements = soup.find_all("h3", class_="title")
-                for element in indicator_elements:
-                    title = element.text.strip()
-                    value_element = element.find_next_sibling("strong", class_="value")
-                    if value_element:
-                        indicators[title] = clean_value(value_element.text)
-                stock_info = {"date": datetime.now().date(), "ticker": ticker, "close": close_price, "variacao_percentual": indicators.get("Variação (dia)"), "price_earnings": indicators.get("P/L"), "dividend_yield": indicators.get("Dividend Yield"), "roe": indicators.get("ROE"), "market_value": indicators.get("Valor de mercado"),"volume": indicators.get("Volume (média 21 dias)")}
-                all_data.append(stock_info)
-                logging.info(f"✅ Dados coletados para {ticker}")
-            except Exception as e:
-                logging.error(f"❌ Erro geral ao buscar dados de {ticker}: {e}")
+                        extracoes[pool.submit(extrair_pagina_medindo, html, self.motor_extracao)] = i
+                        continue
+                    except BrokenProcessPool:
+                        # O restante desta coleta é extraído aqui mesmo.
+                        _descartar_pool(pool)
+                        pool = None
+                try:
+                    campos, duracao = extrair_pagina_medindo(html, self.motor_extracao)
+                    self.estatisticas.registrar_extracao(duracao)
+                    resultados[i] = self._montar_registro(tickers[i], campos)
+                except Exception as e:
+                    logging.error(f"❌ Erro ao extrair dados de {tickers[i]}: {e}")
+            for futuro in as_completed(extracoes):
+                i = extracoes[futuro]
+                try:
+                    campos, duracao = futuro.result()
+                    self.estatisticas.registrar_extracao(duracao)
+                    resultados[i] = self._montar_registro(tickers[i], campos)
+                except BrokenProcessPool as e:
+                    logging.error(f"❌ Erro ao extrair dados de {tickers[i]}: {e}")
+                    _descartar_pool(pool)
+                except Exception as e:
+                    logging.error(f"❌ Erro ao extrair dados de {tickers[i]}: {e}")
+        self.estatisticas.fim = time.monotonic()
+        all_data = [r for r in resultados if r is not None]
         if all_data:
             return pd.DataFrame(all_data)
         else:
@@ -83,42 +314,147 @@ class DataCollector:
             return
         try:
             engine = self.db_session.get_bind()
-            df.to_sql("acoes_historico", engine, if_exists="append", index=False)
-            logging.info(f"✅ Dados salvos na tabela acoes_historico com sucesso!")
+            total = upsert_historico(engine, df.to_dict("records"))
+            logging.info(f"✅ {total} linhas gravadas (upsert) na tabela acoes_historico com sucesso!")
         except Exception as e:
             logging.error(f"❌ Erro ao salvar dados no banco: {e}")
+    def save_snapshots(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        try:
+            total = inserir_snapshots(self.db_session.get_bind(), df.to_dict("records"))
+            logging.info(f"✅ {total} snapshots gravados na tabela acoes_snapshots.")
+        except Exception as e:
+            logging.error(f"❌ Erro ao salvar snapshots no banco: {e}")
 
-
-def run_collection():
+def run_collection(tickers: Optional[List[str]] = None, camada: Optional[str] = None) -> dict:
     """
     Função principal que executa a coleta e agora também é responsável
     por registrar seus próprios logs de início e fim no banco de dados.
+    Retorna o resultado, a duração de cada etapa e as estatísticas da coleta.
+
+    Sem argumentos, coleta todos os tickers do banco (execução diária). Com `camada`,
+    é uma coleta intradiária dos `tickers` informados: grava também os snapshots em
+    acoes_snapshots e só registra erros em coleta_logs (ela roda a cada minuto).
+    As duas regeneram os artefatos do gráfico comparativo, já que a gravação muda a
+    versão do histórico e sem isso o /grafico-comparativo recalcularia a cada requisição.
     """
     db = SessionLocal()
+    inicio = time.perf_counter()
+    resultado = "erro"
+    etapas = {}
+    estatisticas = {}
+    intradiaria = camada is not None
+
+    def medir(nome: str, desde: float):
+        etapas[nome] = time.perf_counter() - desde
+        metricas.coletor_duracao.observar(etapas[nome], nome)
+
     try:
-        salvar_log_no_banco(db, "🚀 Processo de coleta de dados iniciado.", "INFO")
+        if not intradiaria:
+            salvar_log_no_banco(db, "🚀 Processo de coleta de dados iniciado.", "INFO")
         
         collector = DataCollector()
         collector.db_session = db 
         
-        tickers_to_fetch = collector.get_tickers_from_db()
+        tickers_to_fetch = collector.get_tickers_from_db() if tickers is None else tickers
         
         if tickers_to_fetch:
+            etapa = time.perf_counter()
             df_prices = collector.fetch_stock_data(tickers_to_fetch)
+            medir("busca", etapa)
+            etapa = time.perf_counter()
             collector.save_to_database(df_prices)
-            salvar_log_no_banco(db, "✅ Processo de coleta finalizado com sucesso!", "SUCCESS")
-            print("\n✅ Processo de coleta finalizado com sucesso!")
+            if intradiaria:
+                collector.save_snapshots(df_prices)
+            medir("gravacao", etapa)
+            if not df_prices.empty:
+                etapa = time.perf_counter()
+                try:
+                    janelas = acao_service.gerar_artefatos_grafico_comparativo(db)
+                    logging.info(f"✅ {janelas} artefatos do gráfico comparativo atualizados.")
+                except Exception as e:
+                    db.rollback()
+                    salvar_log_no_banco(db, f"⚠️ Falha ao gerar artefatos do gráfico comparativo: {e}", "WARNING")
+                medir("artefatos", etapa)
+            estatisticas = collector.estatisticas.resumo()
+            metricas.coletor_tickers.incrementar("sucesso", valor=collector.estatisticas.sucessos)
+            metricas.coletor_tickers.incrementar("falha", valor=collector.estatisticas.falhas)
+            if intradiaria:
+                logging.info(f"📈 Coleta intradiária ({camada}): {collector.estatisticas}")
+            else:
+                msg_desempenho = f"📈 Desempenho da coleta: {collector.estatisticas}"
+                logging.info(msg_desempenho)
+                salvar_log_no_banco(db, msg_desempenho, "INFO")
+                salvar_log_no_banco(db, "✅ Processo de coleta finalizado com sucesso!", "SUCCESS")
+                print("\n✅ Processo de coleta finalizado com sucesso!")
+            resultado = "sucesso"
+        elif intradiaria:
+            logging.info(f"ℹ️ Nenhum ticker na camada {camada} da coleta intradiária.")
+            resultado = "sem_tickers"
         else:
             msg = "ℹ️ Nenhum ticker no banco de dados para coletar. Processo não executado."
             salvar_log_no_banco(db, msg, "WARNING")
             print(f"\n{msg}")
+            resultado = "sem_tickers"
             
     except Exception as e:
-        msg_erro = f"❌ Erro crítico durante a execução da coleta: {e}"
+        tipo = f" intradiária ({camada})" if intradiaria else ""
+        msg_erro = f"❌ Erro crítico durante a execução da coleta{tipo}: {e}"
         salvar_log_no_banco(db, msg_erro, "ERROR")
         logging.error(msg_erro, exc_info=True)
     finally:
         db.close()
+        medir("total", inicio)
+        metricas.coletor_execucoes.incrementar(resultado)
+        # O coletor roda fora da API: o snapshot em METRICAS_DIR é o que o /metrics enxerga.
+        metricas.registro_metricas.gravar_snapshot()
+    return {"resultado": resultado, "etapas_s": {k: round(v, 3) for k, v in etapas.items()}, "coleta": estatisticas}
+
+def tickers_da_camada(db, camada: str) -> List[str]:
+    """
+    "principal": os COLETA_INTRADAY_TOP_TICKERS tickers cadastrados mais consultados na API
+    nas últimas COLETA_INTRADAY_JANELA_HORAS; "cauda": todos os outros.
+    """
+    if camada not in CAMADAS_INTRADAY:
+        raise ValueError(f"Camada inválida: {camada}. Use uma de {CAMADAS_INTRADAY}.")
+    cadastrados = list(db.execute(select(Ticker.codigo).order_by(Ticker.codigo)).scalars())
+    principais = []
+    if settings.COLETA_INTRADAY_TOP_TICKERS > 0:
+        desde = datetime.utcnow() - timedelta(hours=settings.COLETA_INTRADAY_JANELA_HORAS)
+        existentes = set(cadastrados)
+        # Pede uma folga porque tickers consultados mas não cadastrados (404) são descartados.
+        mais_consultados = log_service.tickers_mais_consultados(db, desde, settings.COLETA_INTRADAY_TOP_TICKERS * 2)
+        principais = [t for t in mais_consultados if t in existentes][:settings.COLETA_INTRADAY_TOP_TICKERS]
+    if camada == "principal":
+        return principais
+    ignorar = set(principais)
+    return [t for t in cadastrados if t not in ignorar]
+
+def run_intraday(camada: str) -> dict:
+    """Coleta intradiária de uma camada de tickers (ver `tickers_da_camada`)."""
+    db = SessionLocal()
+    try:
+        tickers = tickers_da_camada(db, camada)
+    finally:
+        db.close()
+    return run_collection(tickers, camada)
+
+def aplicar_retencao_snapshots() -> int:
+    """Apaga os snapshots com mais de COLETA_SNAPSHOTS_RETENCAO_DIAS dias."""
+    db = SessionLocal()
+    try:
+        corte = datetime.utcnow() - timedelta(days=settings.COLETA_SNAPSHOTS_RETENCAO_DIAS)
+        removidos = db.execute(delete(SnapshotAcao).where(SnapshotAcao.coletado_em < corte)).rowcount
+        db.commit()
+        logging.info(f"🧹 {removidos} snapshots intradiários com mais de {settings.COLETA_SNAPSHOTS_RETENCAO_DIAS} dias apagados.")
+        return removidos
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Erro ao aplicar a retenção dos snapshots: {e}")
+        return 0
+    finally:
+        db.close()
 
 if __name__ == "__main__":
     run_collection()
\ No newline at end of file
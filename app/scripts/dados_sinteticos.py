@@ -0,0 +1,192 @@
+"""
+Gera uma base sintética em escala (para benchmarks) no banco de DATABASE_URL.
+
+N tickers × M dias úteis de acoes_historico (passeio aleatório até hoje, gravado pelo
+caminho em massa de `app.db.carga`, com os agregados semanais/mensais), eventos
+corporativos, usuários, índices, logs de coleta e logs de requisições particionados já
+consolidados por minuto. Os códigos dos tickers e as chaves de API são determinísticos
+(`codigo_ticker`, `chave_usuario`), então o benchmark sabe o que consultar sem ler o
+banco. Reexecutar com os mesmos parâmetros não duplica tickers, usuários nem histórico.
+
+Uso:
+    python create_tables.py
+    python -m app.scripts.dados_sinteticos --tickers 500 --dias 2520 --usuarios 100 --logs 1000000
+"""
+import argparse
+import datetime
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select
+
+from app.db import logs_particionados, models
+from app.db.carga import COLUNAS_HISTORICO, upsert_historico_dataframe
+from app.db.database import SessionLocal, engine
+from app.db.versoes import VERSAO_HISTORICO, VERSAO_TICKERS, incrementar_versao
+from app.scripts.benchmark_api import chave_usuario, codigo_ticker
+from app.services import acao_service, log_service
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+TICKERS_POR_LOTE = 100
+LOGS_POR_LOTE = 50_000
+TIPOS_EVENTO = ("DIVIDENDO", "JCP", "DESDOBRAMENTO")
+ENDPOINTS_LOGS = (
+    ("/api/v1/acoes/{ticker}", "GET", 0.45), ("/api/v1/acoes/{ticker}/grafico", "GET", 0.2),
+    ("/api/v1/acoes/buscar", "GET", 0.15), ("/api/v1/acoes/grafico-comparativo", "GET", 0.1),
+    ("/api/v1/acoes/{ticker}/indicadores", "GET", 0.05), ("/api/v1/usuarios/", "POST", 0.05),
+)
+
+def _gerar_tickers(db, quantidade: int):
+    codigos = [codigo_ticker(i) for i in range(quantidade)]
+    existentes = set(db.execute(select(models.Ticker.codigo).where(models.Ticker.codigo.in_(codigos))).scalars())
+    novos = [{"codigo": c, "nome": f"Empresa Sintética {c}"} for c in codigos if c not in existentes]
+    if novos:
+        db.execute(insert(models.Ticker), novos)
+    for nome, valor in (("IBOV", 120000), ("IFIX", 3350)):
+        if db.execute(select(models.Indice.id).where(models.Indice.nome == nome)).first() is None:
+            db.add(models.Indice(nome=nome, valor_atual=valor, variacao_dia=0))
+    incrementar_versao(db, VERSAO_TICKERS)
+    db.commit()
+    return codigos
+
+def _historico(codigos: list, datas: pd.DatetimeIndex, rng: np.random.Generator) -> pd.DataFrame:
+    n, m = len(codigos), len(datas)
+    retornos = rng.normal(0.0003, 0.02, size=(n, m))
+    precos = np.round(rng.uniform(5, 100, size=(n, 1)) * np.exp(np.cumsum(retornos, axis=1)), 2)
+    variacao = np.zeros_like(precos)
+    variacao[:, 1:] = np.round((precos[:, 1:] / precos[:, :-1] - 1) * 100, 2)
+    lucro = rng.uniform(0.5, 10, size=(n, 1))
+    acoes_emitidas = rng.integers(10 ** 8, 10 ** 10, size=(n, 1))
+    df = pd.DataFrame({
+        "ticker": np.repeat(codigos, m),
+        "date": np.tile(datas.date, n),
+        "close": precos.ravel(),
+        "variacao_percentual": variacao.ravel(),
+        "price_earnings": np.round(precos / lucro, 2).ravel(),
+        "dividend_yield": np.round(rng.uniform(0, 12, size=(n, m)), 2).ravel(),
+        "roe": np.round(np.repeat(rng.uniform(-5, 35, size=(n, 1)), m, axis=1), 2).ravel(),
+        "market_value": np.round(precos * acoes_emitidas, 0).ravel(),
+        "volume": rng.integers(10 ** 4, 10 ** 8, size=n * m),
+    })
+    return df[COLUNAS_HISTORICO]
+
+def _gerar_historico(codigos: list, dias: int, rng: np.random.Generator) -> int:
+    hoje = pd.Timestamp(datetime.date.today())
+    datas = pd.bdate_range(end=hoje, periods=dias)
+    if datas[-1] != hoje:
+        # O último registro precisa ser de hoje para a API não tratar os dados como desatualizados.
+        datas = datas[1:].append(pd.DatetimeIndex([hoje]))
+    total = 0
+    for i in range(0, len(codigos), TICKERS_POR_LOTE):
+        total += upsert_historico_dataframe(engine, _historico(codigos[i:i + TICKERS_POR_LOTE], datas, rng), incrementar=False)
+        logging.info(f"   {total:,} linhas de histórico gravadas...")
+    with engine.begin() as conn:
+        incrementar_versao(conn, VERSAO_HISTORICO)
+    return total
+
+def _gerar_eventos(db, codigos: list, por_ticker: int, dias: int, rng: np.random.Generator) -> int:
+    db.execute(delete(models.EventoCorporativo).where(models.EventoCorporativo.ticker_codigo.in_(codigos)))
+    hoje = datetime.date.today()
+    eventos = []
+    for codigo in codigos:
+        for atras in rng.integers(0, int(dias * 1.4), size=por_ticker):
+            data_com = hoje - datetime.timedelta(days=int(atras))
+            eventos.append({
+                "ticker_codigo": codigo,
+                "tipo_evento": TIPOS_EVENTO[int(rng.integers(len(TIPOS_EVENTO)))],
+                "data_com": data_com,
+                "data_pagamento": data_com + datetime.timedelta(days=int(rng.integers(5, 60))),
+                "valor": round(float(rng.uniform(0.01, 3)), 4),
+            })
+    if eventos:
+        db.execute(insert(models.EventoCorporativo), eventos)
+    db.commit()
+    return len(eventos)
+
+def _gerar_usuarios(db, quantidade: int) -> list:
+    emails = [f"bench{i}@benchmark.com.br" for i in range(quantidade)]
+    existentes = set(db.execute(select(models.Usuario.email).where(models.Usuario.email.in_(emails))).scalars())
+    novos = [{"nome": f"Benchmark {i}", "email": e, "api_key": chave_usuario(i), "ativo": True}
+             for i, e in enumerate(emails) if e not in existentes]
+    if novos:
+        db.execute(insert(models.Usuario), novos)
+    db.commit()
+    return list(db.execute(select(models.Usuario.id).where(models.Usuario.email.in_(emails))).scalars())
+
+def _gerar_logs(db, quantidade: int, dias: int, codigos: list, usuarios: list, rng: np.random.Generator) -> int:
+    agora = datetime.datetime.utcnow()
+    pesos = np.array([p for _, _, p in ENDPOINTS_LOGS])
+    gravados = 0
+    while gravados < quantidade:
+        n = min(LOGS_POR_LOTE, quantidade - gravados)
+        segundos = np.sort(rng.uniform(0, dias * 86400, size=n))[::-1]
+        rotas = rng.choice(len(ENDPOINTS_LOGS), size=n, p=pesos / pesos.sum())
+        tickers = rng.choice(codigos, size=n)
+        status = rng.choice([200, 200, 200, 200, 200, 200, 304, 404, 429, 500], size=n)
+        latencias = np.minimum(rng.lognormal(3, 0.8, size=n), 30000).astype(int)
+        donos = rng.choice(usuarios + [None], size=n) if usuarios else [None] * n
+        linhas = [{
+            "usuario_id": None if donos[i] is None else int(donos[i]),
+            "endpoint": ENDPOINTS_LOGS[rotas[i]][0].replace("{ticker}", tickers[i]),
+            "method": ENDPOINTS_LOGS[rotas[i]][1],
+            "status_code": int(status[i]),
+            "response_time_ms": int(latencias[i]),
+            "timestamp": agora - datetime.timedelta(seconds=float(segundos[i])),
+        } for i in range(n)]
+        logs_particionados.inserir(db.connection(), linhas)
+        db.commit()
+        gravados += n
+        logging.info(f"   {gravados:,} logs de requisição gravados...")
+    return gravados
+
+def _gerar_logs_coleta(db, dias: int):
+    agora = datetime.datetime.utcnow()
+    db.execute(insert(models.ColetaLog), [
+        {"timestamp": agora - datetime.timedelta(days=d), "status": "SUCCESS", "mensagem": "✅ Processo de coleta finalizado com sucesso!"}
+        for d in range(min(dias, 200))
+    ])
+    db.commit()
+
+def gerar(tickers: int = 500, dias: int = 2520, eventos_por_ticker: int = 8, usuarios: int = 100,
+          logs: int = 200_000, dias_logs: int = 30, semente: int = 42) -> dict:
+    """Popula o banco e devolve a quantidade gerada de cada tipo."""
+    rng = np.random.default_rng(semente)
+    db = SessionLocal()
+    resumo = {}
+    try:
+        inicio = time.perf_counter()
+        codigos = _gerar_tickers(db, tickers)
+        resumo["tickers"] = len(codigos)
+        logging.info(f"📈 Gerando {tickers} tickers × {dias} dias de histórico...")
+        resumo["historico"] = _gerar_historico(codigos, dias, rng)
+        resumo["eventos"] = _gerar_eventos(db, codigos, eventos_por_ticker, dias, rng)
+        ids_usuarios = _gerar_usuarios(db, usuarios)
+        resumo["usuarios"] = len(ids_usuarios)
+        logging.info(f"📝 Gerando {logs:,} logs de requisição em {dias_logs} dias...")
+        resumo["logs_requisicoes"] = _gerar_logs(db, logs, dias_logs, codigos, ids_usuarios, rng)
+        resumo["logs_minuto"] = log_service.consolidar_minutos(db, ate=datetime.datetime.utcnow())
+        _gerar_logs_coleta(db, dias_logs)
+        resumo["artefatos_comparativo"] = acao_service.gerar_artefatos_grafico_comparativo(db)
+        resumo["duracao_s"] = round(time.perf_counter() - inicio, 1)
+    finally:
+        db.close()
+    logging.info(f"✅ Base sintética pronta: {resumo}")
+    return resumo
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera uma base sintética em escala para benchmarks.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=2520, help="Dias úteis de histórico por ticker (2520 ≈ 10 anos)")
+    parser.add_argument("--eventos-por-ticker", type=int, default=8)
+    parser.add_argument("--usuarios", type=int, default=100)
+    parser.add_argument("--logs", type=int, default=200_000, help="Logs de requisição brutos")
+    parser.add_argument("--dias-logs", type=int, default=30)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    gerar(args.tickers, args.dias, args.eventos_por_ticker, args.usuarios, args.logs, args.dias_logs, args.semente)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Motores de extração das páginas do Status Invest usados pelo coletor.
+
+Todos os motores recebem o HTML bruto e devolvem o mesmo dicionário de campos
+de `acoes_historico` (close, variacao_percentual, price_earnings, ...):
+
+* "bs4": árvore completa do BeautifulSoup (comportamento original, mais lento);
+* "regex": padrões pré-compilados + varredura linear das tags, sem montar DOM.
+  Se o preço não for encontrado, cai no motor "bs4".
+
+As funções são de nível de módulo para poderem ser enviadas a um ProcessPoolExecutor.
+"""
+import html as html_lib
+import re
+import time
+from typing import Callable, Dict, Optional
+
+from bs4 import BeautifulSoup
+
+INDICADORES = {
+    "variacao_percentual": "Variação (dia)",
+    "price_earnings": "P/L",
+    "dividend_yield": "Dividend Yield",
+    "roe": "ROE",
+    "market_value": "Valor de mercado",
+    "volume": "Volume (média 21 dias)",
+}
+
+def limpar_valor(value_str: Optional[str]) -> Optional[float]:
+    if not value_str: return None
+    try:
+        cleaned_str = value_str.replace("R$", "").strip().replace(".", "").replace("%", "").replace(",", ".")
+        return float(cleaned_str)
+    except (ValueError, AttributeError):
+        return None
+
+def _montar_resultado(close_price: Optional[float], indicators: Dict[str, Optional[float]]) -> dict:
+    dados = {"close": close_price}
+    for campo, titulo in INDICADORES.items():
+        dados[campo] = indicators.get(titulo)
+    return dados
+
+def extrair_bs4(html: str) -> dict:
+    soup = BeautifulSoup(html, "html.parser")
+    price_tag = soup.find("strong", class_="value")
+    close_price = limpar_valor(price_tag.text) if price_tag else None
+    indicators = {}
+    for element in soup.find_all("h3", class_="title"):
+        title = element.text.strip()
+        value_element = element.find_next_sibling("strong", class_="value")
+        if value_element:
+            indicators[title] = limpar_valor(value_element.text)
+    return _montar_resultado(close_price, indicators)
+
+_CLASSE = r"""\bclass\s*=\s*["'](?:[^"']*\s)?{nome}(?:\s[^"']*)?["']"""
+_H3_TITLE = re.compile(r"<h3\b[^>]*" + _CLASSE.format(nome="title") + r"[^>]*>(.*?)</h3\s*>", re.S | re.I)
+_STRONG_VALUE = re.compile(r"<strong\b[^>]*" + _CLASSE.format(nome="value") + r"[^>]*>(.*?)</strong\s*>", re.S | re.I)
+_ABRE_STRONG_VALUE = re.compile(r"<strong\b[^>]*" + _CLASSE.format(nome="value"), re.I)
+_TAG = re.compile(r"<(/?)([a-zA-Z][\w:-]*)[^>]*?(/?)>")
+_TAGS_VAZIAS = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"})
+
+def _texto(fragmento: str) -> str:
+    return html_lib.unescape(_TAG.sub("", fragmento))
+
+def _proximo_irmao_valor(html: str, inicio: int) -> Optional[str]:
+    """Equivalente a find_next_sibling("strong", class_="value") varrendo as tags a partir de `inicio`."""
+    profundidade = 0
+    for tag in _TAG.finditer(html, inicio):
+        fechando, nome, auto_fechada = tag.group(1), tag.group(2).lower(), tag.group(3)
+        if fechando:
+            profundidade -= 1
+            if profundidade < 0:
+                return None
+            continue
+        if profundidade == 0 and nome == "strong" and _ABRE_STRONG_VALUE.match(html, tag.start()):
+            valor = _STRONG_VALUE.match(html, tag.start())
+            return _texto(valor.group(1)) if valor else None
+        if not auto_fechada and nome not in _TAGS_VAZIAS:
+            profundidade += 1
+    return None
+
+def extrair_regex(html: str) -> dict:
+    price_tag = _STRONG_VALUE.search(html)
+    close_price = limpar_valor(_texto(price_tag.group(1))) if price_tag else None
+    if close_price is None:
+        return extrair_bs4(html)
+    indicators = {}
+    for element in _H3_TITLE.finditer(html):
+        valor = _proximo_irmao_valor(html, element.end())
+        if valor is not None:
+            indicators[_texto(element.group(1)).strip()] = limpar_valor(valor)
+    return _montar_resultado(close_price, indicators)
+
+EXTRATORES: Dict[str, Callable[[str], dict]] = {
+    "bs4": extrair_bs4,
+    "regex": extrair_regex,
+}
+
+def obter_extrator(nome: str) -> Callable[[str], dict]:
+    try:
+        return EXTRATORES[nome]
+    except KeyError:
+        raise ValueError(f"Motor de extração desconhecido: '{nome}'. Opções: {', '.join(EXTRATORES)}")
+
+def extrair_pagina(html: str, motor: str = "regex") -> dict:
+    """Ponto de entrada usado pelo pool de processos do coletor."""
+    return obter_extrator(motor)(html)
+
+def extrair_pagina_medindo(html: str, motor: str = "regex"):
+    """`extrair_pagina` devolvendo também o tempo gasto (medido no processo que extraiu)."""
+    inicio = time.perf_counter()
+    campos = extrair_pagina(html, motor)
+    return campos, time.perf_counter() - inicio
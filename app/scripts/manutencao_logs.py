@@ -0,0 +1,63 @@
+"""
+Manutenção de logs_requisicoes: cria as partições dos próximos meses, consolida os
+logs por minuto em logs_requisicoes_minuto e aplica a retenção (DROP das partições
+vencidas e remoção dos agregados antigos).
+
+O scheduler.py roda a consolidação a cada minuto e a retenção uma vez por dia; este
+script serve para rodar à mão ou por cron.
+
+Uso:
+    python -m app.scripts.manutencao_logs               # tudo
+    python -m app.scripts.manutencao_logs --consolidar  # só os agregados por minuto
+    python -m app.scripts.manutencao_logs --retencao
+"""
+import argparse
+import logging
+import time
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.services import log_service
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def consolidar():
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        log_service.preparar_particoes(db)
+        gravadas = log_service.consolidar_minutos(db)
+        logging.info(f"📊 Logs consolidados: {gravadas} agregados por minuto em {time.perf_counter() - inicio:.2f}s")
+        return gravadas
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Erro ao consolidar logs de requisição: {e}")
+    finally:
+        db.close()
+
+def aplicar_retencao():
+    db = SessionLocal()
+    try:
+        resultado = log_service.aplicar_retencao(db)
+        logging.info(f"🧹 Retenção de logs: {len(resultado['particoes_removidas'])} partições removidas, "
+                     f"{resultado['minutos_removidos']} agregados com mais de {settings.LOGS_MINUTO_RETENCAO_DIAS} dias apagados")
+        return resultado
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Erro ao aplicar a retenção de logs: {e}")
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Partições, agregados por minuto e retenção de logs_requisicoes.")
+    parser.add_argument("--consolidar", action="store_true", help="Só cria partições e consolida os agregados por minuto")
+    parser.add_argument("--retencao", action="store_true", help="Só aplica a retenção")
+    args = parser.parse_args()
+    todos = not (args.consolidar or args.retencao)
+    if todos or args.consolidar:
+        consolidar()
+    if todos or args.retencao:
+        aplicar_retencao()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Servidor HTTP local que substitui o statusinvest.com.br nos testes do coletor.
+
+Serve páginas salvas de um diretório: `GET /acoes/PETR4` devolve
+`<diretorio>/petr4.html` (ou `PETR4.html`) e 404 quando a página não existe. Com
+`--sinteticos`, tickers sem página salva recebem uma página gerada com a mesma
+estrutura (preço e indicadores com valores derivados do código, mais `--tamanho-kb`
+de marcação de enchimento para o custo de extração ficar próximo do real).
+
+Para simular o site sob carga, cada resposta pode atrasar `--latencia-ms`
+(± `--variacao-ms`), e uma fração das requisições recebe 500 (`--taxa-erro`) ou
+429 com Retry-After (`--taxa-429`).
+
+Uso:
+    python -m app.scripts.servidor_replay --diretorio paginas/ --porta 8800
+    python -m app.scripts.servidor_replay --sinteticos --latencia-ms 80 --taxa-429 0.02 --porta 8800
+    COLETA_BASE_URL=http://127.0.0.1:8800/acoes/ python -m app.scripts.collect_data
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+import zlib
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Tuple
+
+_ENCHIMENTO = (
+    '<div class="card"><span class="sub-title">Informação</span>'
+    '<a href="/acoes/relacionadas" class="link">Relacionadas</a><p>Texto descritivo da empresa.</p></div>\n'
+)
+
+def _formatar(valor: float, casas: int = 2) -> str:
+    inteiro, _, decimal = f"{abs(valor):,.{casas}f}".partition(".")
+    return ("-" if valor < 0 else "") + inteiro.replace(",", ".") + ("," + decimal if decimal else "")
+
+def pagina_sintetica(ticker: str, tamanho_kb: int = 300) -> bytes:
+    """Página no formato do Status Invest com valores determinísticos para o ticker."""
+    aleatorio = random.Random(zlib.crc32(ticker.upper().encode()))
+    preco = aleatorio.uniform(5, 150)
+    indicadores = [
+        ("Variação (dia)", _formatar(aleatorio.uniform(-5, 5)) + "%"),
+        ("P/L", _formatar(aleatorio.uniform(-20, 60))),
+        ("Dividend Yield", _formatar(aleatorio.uniform(0, 15)) + "%"),
+        ("ROE", _formatar(aleatorio.uniform(-10, 40)) + "%"),
+        ("Valor de mercado", "R$ " + _formatar(preco * aleatorio.randint(10 ** 8, 10 ** 10), 0)),
+        ("Volume (média 21 dias)", _formatar(aleatorio.randint(10 ** 4, 10 ** 8), 0)),
+    ]
+    blocos = [f'<div class="info"><h3 class="title">{titulo}</h3><strong class="value">{valor}</strong></div>'
+              for titulo, valor in indicadores]
+    enchimento = _ENCHIMENTO * max(0, tamanho_kb * 1024 // len(_ENCHIMENTO))
+    html = (
+        f"<!DOCTYPE html><html><head><title>{ticker.upper()}</title></head><body>"
+        f'<div class="top-info"><strong class="value">{_formatar(preco)}</strong></div>'
+        f"{enchimento}{''.join(blocos)}</body></html>"
+    )
+    return html.encode("utf-8")
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, *args, diretorio: Optional[Path], sinteticos: bool = False, tamanho_kb: int = 300,
+                 latencia_ms: float = 0.0, variacao_ms: float = 0.0, taxa_erro: float = 0.0,
+                 taxa_429: float = 0.0, retry_after: int = 1, **kwargs):
+        self.diretorio = diretorio
+        self.sinteticos = sinteticos
+        self.tamanho_kb = tamanho_kb
+        self.latencia_ms = latencia_ms
+        self.variacao_ms = variacao_ms
+        self.taxa_erro = taxa_erro
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        super().__init__(*args, **kwargs)
+
+    def _localizar_pagina(self, ticker: str):
+        if self.diretorio is None:
+            return None
+        for nome in (ticker.lower(), ticker.upper(), ticker):
+            caminho = self.diretorio / f"{nome}.html"
+            if caminho.is_file():
+                return caminho
+        return None
+
+    def _responder(self, status: int, corpo: bytes, content_type: str = "text/html; charset=utf-8", cabecalhos: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        if self.latencia_ms or self.variacao_ms:
+            time.sleep(max(0.0, self.latencia_ms + random.uniform(-self.variacao_ms, self.variacao_ms)) / 1000)
+        sorteio = random.random()
+        if sorteio < self.taxa_429:
+            self._responder(429, b"Too Many Requests", "text/plain", {"Retry-After": str(self.retry_after)})
+            return
+        if sorteio < self.taxa_429 + self.taxa_erro:
+            self._responder(500, b"Internal Server Error", "text/plain")
+            return
+        partes = [p for p in self.path.split("?")[0].split("/") if p]
+        if len(partes) != 2 or partes[0] != "acoes":
+            self._responder(404, b"Not Found", "text/plain")
+            return
+        pagina = self._localizar_pagina(partes[1])
+        if pagina is not None:
+            self._responder(200, pagina.read_bytes())
+        elif self.sinteticos:
+            self._responder(200, pagina_sintetica(partes[1], self.tamanho_kb))
+        else:
+            self._responder(404, b"Not Found", "text/plain")
+
+    def log_message(self, format, *args):
+        logging.debug("replay: " + format, *args)
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+def iniciar_servidor(diretorio: Optional[str] = None, host: str = "127.0.0.1", porta: int = 0, **opcoes) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Sobe o servidor em uma thread daemon e retorna (servidor, base_url para o coletor).
+    `opcoes` são as de ReplayHandler: sinteticos, tamanho_kb, latencia_ms, variacao_ms,
+    taxa_erro, taxa_429 e retry_after.
+    """
+    handler = partial(ReplayHandler, diretorio=Path(diretorio) if diretorio else None, **opcoes)
+    servidor = _Servidor((host, porta), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    host_real, porta_real = servidor.server_address[:2]
+    return servidor, f"http://{host_real}:{porta_real}/acoes/"
+
+def adicionar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--diretorio", help="Diretório com as páginas <ticker>.html")
+    parser.add_argument("--sinteticos", action="store_true", help="Gera páginas para tickers sem página salva")
+    parser.add_argument("--tamanho-kb", type=int, default=300, help="Tamanho aproximado das páginas sintéticas")
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--variacao-ms", type=float, default=0.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="Fração de respostas 500")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração de respostas 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After (segundos) das respostas 429")
+
+def opcoes_dos_argumentos(args: argparse.Namespace) -> dict:
+    return {
+        "sinteticos": args.sinteticos, "tamanho_kb": args.tamanho_kb, "latencia_ms": args.latencia_ms,
+        "variacao_ms": args.variacao_ms, "taxa_erro": args.taxa_erro, "taxa_429": args.taxa_429,
+        "retry_after": args.retry_after,
+    }
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Servidor local de páginas salvas do Status Invest.")
+    adicionar_argumentos(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8800)
+    args = parser.parse_args()
+    if not args.diretorio and not args.sinteticos:
+        parser.error("informe --diretorio e/ou --sinteticos")
+
+    servidor, base_url = iniciar_servidor(args.diretorio, args.host, args.porta, **opcoes_dos_argumentos(args))
+    logging.info(f"Servidor de replay em {base_url} (Ctrl+C para encerrar)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -1,16 +1,23 @@
 import logging
 import requests
+import numpy as np
 import pandas as pd
 from sqlalchemy.orm import Session
-from sqlalchemy import select, desc, delete
-from typing import List, Optional, Tuple
+from sqlalchemy import select, desc, delete, func, cast, Float
+from sqlalchemy.orm import aliased
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, date, timedelta
 from fastapi import HTTPException
 
+from app.core import formatos_colunares
 from app.core.config import settings
+from app.core.formatos_colunares import FORMATO_ARROW
 from app.db import models
+from app.db.rollups import INTERVALO_DIARIO, INTERVALO_MENSAL
+from app.db.versoes import VERSAO_TICKERS, incrementar_versao, ler_versao
 from app.schemas.acao import TickerCreate, TickerUpdate
 from app.schemas.grafico import GraficoDataOut, GraficoComparativoOut, GraficoDataset
+from app.services.armazem_precos import armazem_precos
 
 def _valida_ticker_externamente(ticker_code: str) -> bool:
     logging.info(f"Validando ticker '{ticker_code}' externamente...")
@@ -34,27 +41,98 @@ def create_ticker(db: Session, ticker_data: TickerCreate) -> models.Ticker:
     new_ticker = models.Ticker(**ticker_data.model_dump())
     new_ticker.codigo = ticker_upper
     db.add(new_ticker)
+    incrementar_versao(db, VERSAO_TICKERS)
     db.commit()
     db.refresh(new_ticker)
+    armazem_precos.marcar_desatualizado()
     return new_ticker
 
+def _dados_atualizados(ultimo_historico: models.HistoricoAcao) -> bool:
+    data_registro = datetime.combine(ultimo_historico.date, datetime.now().time())
+    return data_registro >= datetime.now() - timedelta(minutes=settings.DATA_MAX_AGE_MINUTES)
+
+def _consulta_ticker(ticker_code: str):
+    return select(models.Ticker).where(models.Ticker.codigo == ticker_code.upper())
+
+def _consulta_ultimo_snapshot(ticker_code: str):
+    """Ticker e seu registro de histórico mais recente em uma única consulta (índice ticker, date DESC)."""
+    codigo = ticker_code.upper()
+    return (
+        select(models.Ticker, models.HistoricoAcao)
+        .join(models.HistoricoAcao, models.HistoricoAcao.ticker_codigo == models.Ticker.codigo)
+        .where(models.Ticker.codigo == codigo, models.HistoricoAcao.ticker_codigo == codigo)
+        .order_by(desc(models.HistoricoAcao.date))
+        .limit(1)
+    )
+
+def get_ultimo_snapshot(db: Session, ticker_code: str) -> Optional[Tuple[models.Ticker, models.HistoricoAcao]]:
+    resultado = db.execute(_consulta_ultimo_snapshot(ticker_code)).first()
+    return tuple(resultado) if resultado else None
+
+def _armazem_ativo(db: Session) -> bool:
+    armazem_precos.atualizar_se_necessario(db)
+    return armazem_precos.ativo
+
 def get_dados_completos_acao(db: Session, ticker_code: str) -> Optional[Tuple[models.Ticker, models.HistoricoAcao]]:
-    stmt_ticker = select(models.Ticker).where(models.Ticker.codigo == ticker_code.upper())
-    ticker_info = db.execute(stmt_ticker).scalar_one_or_none()
-    if not ticker_info:
-        return None
+    if _armazem_ativo(db):
+        dados = armazem_precos.ultimo_registro(ticker_code.upper())
+    else:
+        dados = get_ultimo_snapshot(db, ticker_code)
+    return _se_atualizados(ticker_code, dados)
 
-    stmt_historico = select(models.HistoricoAcao).where(models.HistoricoAcao.ticker_codigo == ticker_code.upper()).order_by(desc(models.HistoricoAcao.date)).limit(1)
-    ultimo_historico = db.execute(stmt_historico).scalar_one_or_none()
-    if not ultimo_historico:
+def _se_atualizados(ticker_code: str, dados: Optional[tuple]) -> Optional[tuple]:
+    if not dados:
         return None
 
-    data_registro = datetime.combine(ultimo_historico.date, datetime.now().time())
-    if data_registro < datetime.now() - timedelta(minutes=settings.DATA_MAX_AGE_MINUTES):
+    if not _dados_atualizados(dados[1]):
         logging.warning(f"Dados para {ticker_code} estão desatualizados.")
         return None
 
-    return ticker_info, ultimo_historico
+    return dados
+
+def _consulta_ultimos_registros(codigos: set):
+    posicao = func.row_number().over(
+        partition_by=models.HistoricoAcao.ticker_codigo,
+        order_by=desc(models.HistoricoAcao.date),
+    ).label("posicao")
+    ranqueados = select(models.HistoricoAcao, posicao).where(models.HistoricoAcao.ticker_codigo.in_(codigos)).subquery()
+    historico = aliased(models.HistoricoAcao, ranqueados)
+    return (
+        select(models.Ticker, historico)
+        .join(historico, historico.ticker_codigo == models.Ticker.codigo)
+        .where(ranqueados.c.posicao == 1)
+    )
+
+def _por_codigo(linhas) -> dict:
+    return {ticker_info.codigo: (ticker_info, ultimo_historico) for ticker_info, ultimo_historico in linhas}
+
+def get_dados_completos_acoes(db: Session, ticker_codes: List[str]) -> Tuple[List[Tuple[models.Ticker, models.HistoricoAcao]], List[str]]:
+    """
+    Versão em lote de get_dados_completos_acao: resolve todos os tickers e seus registros
+    mais recentes em uma única consulta (IN + ROW_NUMBER() por ticker). Retorna
+    (encontrados, nao_encontrados) na ordem pedida, com a mesma regra de atualização.
+    """
+    codigos = {codigo.upper() for codigo in ticker_codes}
+    if not codigos:
+        return [], []
+
+    if _armazem_ativo(db):
+        por_codigo = {codigo: armazem_precos.ultimo_registro(codigo) for codigo in codigos}
+    else:
+        por_codigo = _por_codigo(db.execute(_consulta_ultimos_registros(codigos)).all())
+    return _separar_atualizados(ticker_codes, por_codigo)
+
+def _separar_atualizados(ticker_codes: List[str], por_codigo: dict) -> Tuple[list, List[str]]:
+    encontrados, nao_encontrados = [], []
+    for ticker_code in ticker_codes:
+        dados = por_codigo.get(ticker_code.upper())
+        if dados and _dados_atualizados(dados[1]):
+            encontrados.append(dados)
+        else:
+            if dados:
+                logging.warning(f"Dados para {ticker_code} estão desatualizados.")
+            nao_encontrados.append(ticker_code)
+    return encontrados, nao_encontrados
 
 def get_todos_os_tickers(db: Session) -> list[models.Ticker]:
     return db.execute(select(models.Ticker).order_by(models.Ticker.codigo)).scalars().all()
@@ -75,53 +153,255 @@ def delete_acao_by_ticker(db: Session, ticker_code: str) -> Optional[models.Tick
         return None
 
     db.execute(delete(models.HistoricoAcao).where(models.HistoricoAcao.ticker_codigo == ticker_code.upper()))
+    db.execute(delete(models.RollupHistorico).where(models.RollupHistorico.ticker_codigo == ticker_code.upper()))
     db.execute(delete(models.EventoCorporativo).where(models.EventoCorporativo.ticker_codigo == ticker_code.upper()))
+    db.execute(delete(models.SnapshotAcao).where(models.SnapshotAcao.ticker_codigo == ticker_code.upper()))
     db.delete(db_ticker)
+    incrementar_versao(db, VERSAO_TICKERS)
     db.commit()
+    armazem_precos.marcar_desatualizado()
     return db_ticker
 
-def get_dados_para_grafico(db: Session, ticker_code: str) -> Optional[GraficoDataOut]:
-    if not db.execute(select(models.Ticker).where(models.Ticker.codigo == ticker_code.upper())).scalar_one_or_none():
-        return None
-    
+def _janela_grafico(dias: Optional[int]) -> Tuple[Optional[date], date]:
+    """(início, fim) da janela do gráfico; dias=None = todo o histórico."""
     data_fim = date.today()
-    data_inicio = data_fim - timedelta(days=90)
-    stmt = select(models.HistoricoAcao.date, models.HistoricoAcao.close).where(models.HistoricoAcao.ticker_codigo == ticker_code.upper(), models.HistoricoAcao.date.between(data_inicio, data_fim)).order_by(models.HistoricoAcao.date.asc())
-    resultados = db.execute(stmt).all()
-    if not resultados:
-        return GraficoDataOut(labels=[], data=[])
+    return (None if dias is None else data_fim - timedelta(days=dias)), data_fim
 
-    labels = [res.date.strftime('%d/%m') for res in resultados]
-    data = [res.close for res in resultados]
-    return GraficoDataOut(labels=labels, data=data)
+def _consulta_agregados_grafico(ticker_code: str, intervalo: str, data_inicio: Optional[date], como_float: bool = False):
+    """Linhas (periodo_inicio, open, high, low, close, volume) de acoes_historico_rollup dentro da janela."""
+    r = models.RollupHistorico
+    precos = [cast(c, Float) if como_float else c for c in (r.open, r.high, r.low, r.close)]
+    stmt = select(r.periodo_inicio, *precos, r.volume).where(r.ticker_codigo == ticker_code.upper(), r.intervalo == intervalo)
+    if data_inicio is not None:
+        stmt = stmt.where(r.ultima_data >= data_inicio)
+    return stmt.order_by(r.periodo_inicio.asc())
 
-def get_dados_grafico_comparativo(db: Session, dias: int = 90) -> GraficoComparativoOut:
-    data_fim = date.today()
-    data_inicio = data_fim - timedelta(days=dias)
-    stmt = select(models.HistoricoAcao.date, models.HistoricoAcao.ticker_codigo, models.HistoricoAcao.close).where(models.HistoricoAcao.date.between(data_inicio, data_fim)).order_by(models.HistoricoAcao.date.asc())
-    resultados = db.execute(stmt).all()
+def _consulta_serie_diaria(ticker_code: str, data_inicio: Optional[date], data_fim: date, como_float: bool = False):
+    close = cast(models.HistoricoAcao.close, Float) if como_float else models.HistoricoAcao.close
+    stmt = select(models.HistoricoAcao.date, close).where(models.HistoricoAcao.ticker_codigo == ticker_code.upper(), models.HistoricoAcao.date <= data_fim)
+    if data_inicio is not None:
+        stmt = stmt.where(models.HistoricoAcao.date >= data_inicio)
+    return stmt.order_by(models.HistoricoAcao.date.asc())
+
+def _serie_armazem(ticker_code: str, data_inicio: Optional[date], data_fim: date) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    codigo = ticker_code.upper()
+    if armazem_precos.nome(codigo) is None:
+        return None
+    serie = armazem_precos.serie(codigo)
+    if serie is None:
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+    fatia = serie.fatia(data_inicio, data_fim)
+    return serie.datas[fatia], serie.colunas["close"][fatia]
+
+def _colunas(linhas, *posicoes) -> tuple:
+    return tuple([l[p] for l in linhas] for p in posicoes)
+
+def _serie_grafico(db: Session, ticker_code: str, como_float: bool = False, dias: Optional[int] = 90,
+                   intervalo: str = INTERVALO_DIARIO) -> Optional[Tuple[Sequence, Sequence]]:
+    """
+    (datas, fechamentos) da janela do gráfico: vetores NumPy vindos do armazém ou listas vindas do banco.
+    Intervalos semanal/mensal vêm dos agregados, com a data de início de cada período.
+    """
+    data_inicio, data_fim = _janela_grafico(dias)
+
+    if intervalo == INTERVALO_DIARIO and _armazem_ativo(db):
+        return _serie_armazem(ticker_code, data_inicio, data_fim)
+
+    if not db.execute(_consulta_ticker(ticker_code)).scalar_one_or_none():
+        return None
+
+    if intervalo != INTERVALO_DIARIO:
+        return _colunas(db.execute(_consulta_agregados_grafico(ticker_code, intervalo, data_inicio, como_float)).all(), 0, 4)
+    return _colunas(db.execute(_consulta_serie_diaria(ticker_code, data_inicio, data_fim, como_float)).all(), 0, 1)
+
+def _rotulos_grafico(datas: Sequence, intervalo: str = INTERVALO_DIARIO) -> List[str]:
+    if isinstance(datas, np.ndarray):
+        datas = datas.astype(date)
+    if intervalo == INTERVALO_MENSAL:
+        formato = '%m/%Y'
+    elif len(datas) and (datas[-1] - datas[0]).days > 366:
+        formato = '%d/%m/%Y'
+    else:
+        formato = '%d/%m'
+    return [d.strftime(formato) for d in datas]
+
+def _valores(valores: Sequence) -> list:
+    return valores.tolist() if isinstance(valores, np.ndarray) else list(valores)
+
+def _grafico(serie: Tuple[Sequence, Sequence], intervalo: str = INTERVALO_DIARIO) -> GraficoDataOut:
+    datas, fechamentos = serie
+    return GraficoDataOut(labels=_rotulos_grafico(datas, intervalo), data=_valores(fechamentos))
+
+def _serie_para_resposta(serie: Tuple[Sequence, Sequence], intervalo: str = INTERVALO_DIARIO) -> dict:
+    datas, fechamentos = serie
+    return {"labels": _rotulos_grafico(datas, intervalo), "data": _valores(fechamentos)}
 
+def get_dados_para_grafico(db: Session, ticker_code: str, dias: Optional[int] = 90, intervalo: str = INTERVALO_DIARIO) -> Optional[GraficoDataOut]:
+    serie = _serie_grafico(db, ticker_code, dias=dias, intervalo=intervalo)
+    return None if serie is None else _grafico(serie, intervalo)
+
+def get_serie_grafico(db: Session, ticker_code: str, dias: Optional[int] = 90, intervalo: str = INTERVALO_DIARIO) -> Optional[dict]:
+    """Mesma série de get_dados_para_grafico com preços já em float, sem Decimal nem validação."""
+    serie = _serie_grafico(db, ticker_code, como_float=True, dias=dias, intervalo=intervalo)
+    return None if serie is None else _serie_para_resposta(serie, intervalo)
+
+def get_colunas_grafico(db: Session, ticker_code: str, dias: Optional[int] = 90, intervalo: str = INTERVALO_DIARIO) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Série do gráfico como colunas NumPy, para os formatos Arrow/Parquet: (date, close) no
+    diário; (date, open, high, low, close, volume) nos agregados.
+    """
+    if intervalo != INTERVALO_DIARIO:
+        if not db.execute(_consulta_ticker(ticker_code)).scalar_one_or_none():
+            return None
+        return _colunas_agregados(db.execute(_consulta_agregados_grafico(ticker_code, intervalo, _janela_grafico(dias)[0], como_float=True)).all())
+    serie = _serie_grafico(db, ticker_code, como_float=True, dias=dias)
+    return None if serie is None else _colunas_serie(serie)
+
+def _colunas_agregados(linhas: list) -> Dict[str, np.ndarray]:
+    colunas = list(zip(*linhas)) or [()] * 6
+    resultado = {"date": np.asarray(colunas[0], dtype="datetime64[D]")}
+    for nome, valores in zip(("open", "high", "low", "close"), colunas[1:5]):
+        resultado[nome] = np.asarray(valores, dtype=np.float64)
+    resultado["volume"] = np.asarray([v or 0 for v in colunas[5]], dtype=np.int64)
+    return resultado
+
+def _colunas_serie(serie: Tuple[Sequence, Sequence]) -> Dict[str, np.ndarray]:
+    datas, fechamentos = serie
+    return {"date": np.asarray(datas, dtype="datetime64[D]"), "close": np.asarray(fechamentos, dtype=np.float64)}
+
+def _precos_comparativos_armazem(data_inicio: date, data_fim: date) -> pd.DataFrame:
+    colunas = {}
+    for ticker in armazem_precos.tickers():
+        serie = armazem_precos.serie(ticker)
+        fatia = serie.fatia(data_inicio, data_fim)
+        if fatia.stop > fatia.start:
+            colunas[ticker] = pd.Series(serie.colunas["close"][fatia], index=serie.datas[fatia])
+    return pd.DataFrame(colunas)
+
+def _consulta_precos_comparativos(intervalo: str, data_inicio: date, data_fim: date):
+    """(date, ticker, close) da janela: do histórico no diário, dos agregados nos demais intervalos."""
+    if intervalo != INTERVALO_DIARIO:
+        r = models.RollupHistorico
+        return select(r.periodo_inicio, r.ticker_codigo, r.close).where(r.intervalo == intervalo, r.ultima_data >= data_inicio).order_by(r.periodo_inicio.asc())
+    return select(models.HistoricoAcao.date, models.HistoricoAcao.ticker_codigo, models.HistoricoAcao.close).where(models.HistoricoAcao.date.between(data_inicio, data_fim)).order_by(models.HistoricoAcao.date.asc())
+
+def _pivotar_precos(resultados: list) -> pd.DataFrame:
     if not resultados:
-        return GraficoComparativoOut(labels=[], datasets=[])
+        return pd.DataFrame()
 
     df = pd.DataFrame(resultados, columns=['date', 'ticker', 'close'])
-    df = df.drop_duplicates(subset=['date', 'ticker'], keep='last')
-    
-    df_pivot = df.pivot(index='date', columns='ticker', values='close')
-    df_pivot = df_pivot.ffill()
+    return df.pivot(index='date', columns='ticker', values='close')
+
+def _janela_comparativo(dias: int) -> Tuple[date, date]:
+    data_fim = date.today()
+    return data_fim - timedelta(days=dias), data_fim
+
+def _normalizado_comparativo(db: Session, dias: int, intervalo: str = INTERVALO_DIARIO) -> pd.DataFrame:
+    data_inicio, data_fim = _janela_comparativo(dias)
+    if intervalo == INTERVALO_DIARIO and _armazem_ativo(db):
+        df_pivot = _precos_comparativos_armazem(data_inicio, data_fim)
+    else:
+        df_pivot = _pivotar_precos(db.execute(_consulta_precos_comparativos(intervalo, data_inicio, data_fim)).all())
+    return _normalizar_comparativo(df_pivot)
+
+def _normalizar_comparativo(df_pivot: pd.DataFrame) -> pd.DataFrame:
+    """Variação % de cada ticker desde o primeiro dia da janela; índice em datetime64, uma coluna por ticker."""
+    if df_pivot.empty:
+        return pd.DataFrame()
+
+    df_pivot = df_pivot.sort_index().ffill()
     df_pivot = df_pivot.apply(pd.to_numeric, errors='coerce')
     df_pivot = df_pivot.dropna(axis='columns') 
 
     if df_pivot.empty:
-        return GraficoComparativoOut(labels=[], datasets=[])
+        return pd.DataFrame()
 
     df_normalized = (df_pivot / df_pivot.iloc[0] - 1) * 100
     df_normalized.index = pd.to_datetime(df_normalized.index)
+    return df_normalized
+
+def _grafico_comparativo(df_normalized: pd.DataFrame) -> GraficoComparativoOut:
+    if df_normalized.empty:
+        return GraficoComparativoOut(labels=[], datasets=[])
     labels = df_normalized.index.strftime('%Y-%m-%d').tolist()
     
     datasets = [GraficoDataset(label=ticker, data=df_normalized[ticker].round(2).tolist()) for ticker in df_normalized.columns]
     return GraficoComparativoOut(labels=labels, datasets=datasets)
 
+def _tabela_comparativo(df_normalized: pd.DataFrame):
+    """Formato largo em Arrow direto dos vetores: coluna `date` e uma coluna float64 (sem arredondar) por ticker."""
+    pa = formatos_colunares.pa
+    colunas = {"date": pa.array(df_normalized.index.to_numpy(dtype="datetime64[D]"), type=pa.date32())}
+    for ticker in df_normalized.columns:
+        colunas[ticker] = pa.array(df_normalized[ticker].to_numpy(dtype=np.float64))
+    return pa.table(colunas)
+
+def _data_mais_recente_historico(db: Session) -> Optional[date]:
+    return db.execute(select(func.max(models.HistoricoAcao.date))).scalar()
+
+def gerar_artefatos_grafico_comparativo(db: Session, janelas: Optional[List[int]] = None) -> int:
+    """
+    Calcula a série comparativa de cada janela e grava o resultado pronto (JSON e,
+    com pyarrow, a tabela Arrow) em `graficos_comparativos`. Chamado como etapa final da coleta.
+    """
+    # Lida antes do cálculo: uma escrita concorrente deixa o artefato marcado como desatualizado.
+    versao = ler_versao(db)[0]
+    data_referencia = _data_mais_recente_historico(db)
+    for dias in janelas or settings.GRAFICO_COMPARATIVO_JANELAS:
+        df_normalized = _normalizado_comparativo(db, dias)
+        tabela = None
+        if formatos_colunares.pa is not None:
+            tabela = formatos_colunares.serializar_tabela(_tabela_comparativo(df_normalized), FORMATO_ARROW)
+        db.merge(models.GraficoComparativoArtefato(
+            janela_dias=dias,
+            data_referencia=data_referencia,
+            versao_dados=versao,
+            gerado_em=datetime.utcnow(),
+            conteudo=_grafico_comparativo(df_normalized).model_dump_json(),
+            tabela_arrow=tabela,
+        ))
+    db.commit()
+    return len(janelas or settings.GRAFICO_COMPARATIVO_JANELAS)
+
+def _consulta_artefato(dias: int, coluna):
+    """(versão dos dados, `coluna`) do artefato da janela; só a coluna pedida sai do banco."""
+    a = models.GraficoComparativoArtefato
+    return select(a.versao_dados, coluna).where(a.janela_dias == dias)
+
+def _artefato_grafico_comparativo(db: Session, dias: int, coluna):
+    """
+    Conteúdo do artefato da janela, se ele foi calculado com a versão atual dos dados.
+    Regravações do mesmo dia, coletas intradiárias e backfills não mudam a data mais
+    recente do histórico, mas mudam a versão.
+    """
+    return _conteudo_atual(db.execute(_consulta_artefato(dias, coluna)).first(), ler_versao(db)[0])
+
+def _conteudo_atual(linha, versao: int):
+    if linha is not None and linha[0] is not None and linha[0] == versao:
+        return linha[1]
+    return None
+
+def get_dados_grafico_comparativo(db: Session, dias: int = 90, intervalo: str = INTERVALO_DIARIO) -> GraficoComparativoOut:
+    """Serve o artefato pré-calculado; só calcula na hora se ele faltar ou estiver desatualizado."""
+    conteudo = _artefato_grafico_comparativo(db, dias, models.GraficoComparativoArtefato.conteudo) if intervalo == INTERVALO_DIARIO else None
+    if conteudo is not None:
+        return GraficoComparativoOut.model_validate_json(conteudo)
+    return _grafico_comparativo(_normalizado_comparativo(db, dias, intervalo))
+
+def get_json_grafico_comparativo(db: Session, dias: int = 90, intervalo: str = INTERVALO_DIARIO) -> str:
+    """Mesmo conteúdo de get_dados_grafico_comparativo já em JSON; o artefato sai sem passar pelo pydantic."""
+    conteudo = _artefato_grafico_comparativo(db, dias, models.GraficoComparativoArtefato.conteudo) if intervalo == INTERVALO_DIARIO else None
+    if conteudo is not None:
+        return conteudo
+    return _grafico_comparativo(_normalizado_comparativo(db, dias, intervalo)).model_dump_json()
+
+def get_tabela_grafico_comparativo(db: Session, dias: int = 90, intervalo: str = INTERVALO_DIARIO):
+    """Gráfico comparativo como tabela Arrow em formato largo (ver `_tabela_comparativo`)."""
+    tabela = _artefato_grafico_comparativo(db, dias, models.GraficoComparativoArtefato.tabela_arrow) if intervalo == INTERVALO_DIARIO else None
+    if tabela is not None:
+        return formatos_colunares.ler_stream(tabela)
+    return _tabela_comparativo(_normalizado_comparativo(db, dias, intervalo))
+
 def update_ticker_nome(db: Session, ticker_code: str, ticker_update: TickerUpdate) -> Optional[models.Ticker]:
     """
     Encontra um ticker pelo seu código e atualiza seu nome.
@@ -134,7 +414,9 @@ def update_ticker_nome(db: Session, ticker_code: str, ticker_update: TickerUpdat
 
     db_ticker.nome = ticker_update.nome
     
+    incrementar_versao(db, VERSAO_TICKERS)
     db.commit()
     db.refresh(db_ticker)
+    armazem_precos.marcar_desatualizado()
     
     return db_ticker
\ No newline at end of file
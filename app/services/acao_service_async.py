@@ -0,0 +1,227 @@
+"""
+Versões assíncronas das funções de `acao_service`, usadas pelos endpoints da API.
+
+Todas as consultas rodam pela AsyncSession da requisição, com as mesmas instruções
+(`_consulta_*`) e regras de `acao_service` e `indicadores`. Só o passo de CPU sobre as
+linhas já lidas (pivot do pandas, vetores NumPy, indicadores, rótulos e JSON) vai para
+o threadpool: na thread do event loop ele travaria as demais requisições.
+"""
+import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from sqlalchemy import select, desc, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core import formatos_colunares
+from app.core.perfilamento import perfilador
+from app.db import models
+from app.db.rollups import INTERVALO_DIARIO
+from app.db.versoes import VERSAO_TICKERS, incrementar_versao, ler_versao
+from app.schemas.acao import TickerCreate, TickerUpdate
+from app.schemas.grafico import GraficoDataOut, GraficoComparativoOut
+from app.services import acao_service, indicadores
+from app.services.armazem_precos import SerieTicker, armazem_precos
+
+async def _em_thread(funcao, *args):
+    """`funcao(*args)` no threadpool, incluída na amostragem do perfil em andamento."""
+    def executar():
+        with perfilador.thread_auxiliar():
+            return funcao(*args)
+    return await run_in_threadpool(executar)
+
+async def _buscar_ticker(db: AsyncSession, ticker_code: str) -> Optional[models.Ticker]:
+    return (await db.execute(acao_service._consulta_ticker(ticker_code))).scalar_one_or_none()
+
+async def _armazem_ativo(db: AsyncSession) -> bool:
+    await armazem_precos.atualizar_se_necessario_async(db)
+    return armazem_precos.ativo
+
+async def ticker_existe(db: AsyncSession, ticker_code: str) -> bool:
+    return await _buscar_ticker(db, ticker_code) is not None
+
+async def create_ticker(db: AsyncSession, ticker_data: TickerCreate) -> models.Ticker:
+    ticker_upper = ticker_data.codigo.upper()
+    if not await run_in_threadpool(acao_service._valida_ticker_externamente, ticker_upper):
+        raise HTTPException(status_code=400, detail=f"Ticker '{ticker_upper}' não encontrado ou inválido na fonte de dados externa.")
+
+    if await _buscar_ticker(db, ticker_upper):
+        raise HTTPException(status_code=409, detail="Ticker já cadastrado.")
+
+    new_ticker = models.Ticker(**ticker_data.model_dump())
+    new_ticker.codigo = ticker_upper
+    db.add(new_ticker)
+    await db.run_sync(incrementar_versao, VERSAO_TICKERS)
+    await db.commit()
+    await db.refresh(new_ticker)
+    armazem_precos.marcar_desatualizado()
+    return new_ticker
+
+async def get_dados_completos_acao(db: AsyncSession, ticker_code: str) -> Optional[Tuple[models.Ticker, models.HistoricoAcao]]:
+    if await _armazem_ativo(db):
+        dados = armazem_precos.ultimo_registro(ticker_code.upper())
+    else:
+        resultado = (await db.execute(acao_service._consulta_ultimo_snapshot(ticker_code))).first()
+        dados = tuple(resultado) if resultado else None
+    return acao_service._se_atualizados(ticker_code, dados)
+
+async def get_dados_completos_acoes(db: AsyncSession, ticker_codes: List[str]) -> Tuple[List[Tuple[models.Ticker, models.HistoricoAcao]], List[str]]:
+    codigos = {codigo.upper() for codigo in ticker_codes}
+    if not codigos:
+        return [], []
+
+    if await _armazem_ativo(db):
+        por_codigo = {codigo: armazem_precos.ultimo_registro(codigo) for codigo in codigos}
+    else:
+        por_codigo = acao_service._por_codigo((await db.execute(acao_service._consulta_ultimos_registros(codigos))).all())
+    return acao_service._separar_atualizados(ticker_codes, por_codigo)
+
+async def get_todos_os_tickers(db: AsyncSession) -> List[models.Ticker]:
+    return (await db.execute(select(models.Ticker).order_by(models.Ticker.codigo))).scalars().all()
+
+async def get_eventos_por_ticker(db: AsyncSession, ticker: str) -> Optional[List[models.EventoCorporativo]]:
+    if not await _buscar_ticker(db, ticker):
+        return None
+    stmt = select(models.EventoCorporativo).where(models.EventoCorporativo.ticker_codigo == ticker.upper()).order_by(desc(models.EventoCorporativo.data_com))
+    return (await db.execute(stmt)).scalars().all()
+
+async def get_snapshots_por_ticker(db: AsyncSession, ticker: str, desde: datetime.datetime, limite: int) -> Optional[List[models.SnapshotAcao]]:
+    """Snapshots intradiários do ticker a partir de `desde`, do mais recente para o mais antigo."""
+    if not await _buscar_ticker(db, ticker):
+        return None
+    stmt = (
+        select(models.SnapshotAcao)
+        .where(models.SnapshotAcao.ticker_codigo == ticker.upper(), models.SnapshotAcao.coletado_em >= desde)
+        .order_by(desc(models.SnapshotAcao.coletado_em))
+        .limit(limite)
+    )
+    return (await db.execute(stmt)).scalars().all()
+
+async def get_principais_indices(db: AsyncSession) -> List[models.Indice]:
+    return (await db.execute(select(models.Indice).where(models.Indice.nome.in_(["IBOV", "IFIX"])))).scalars().all()
+
+async def get_versao_dados(db: AsyncSession) -> Tuple[int, Optional[datetime.datetime]]:
+    return await db.run_sync(ler_versao)
+
+async def get_versao_indices(db: AsyncSession) -> Tuple[int, Optional[datetime.datetime]]:
+    stmt = select(func.count(), func.max(models.Indice.atualizado_em)).where(models.Indice.nome.in_(["IBOV", "IFIX"]))
+    quantidade, atualizado_em = (await db.execute(stmt)).one()
+    return quantidade, atualizado_em
+
+async def delete_acao_by_ticker(db: AsyncSession, ticker_code: str) -> Optional[models.Ticker]:
+    db_ticker = await _buscar_ticker(db, ticker_code)
+    if not db_ticker:
+        return None
+
+    await db.execute(delete(models.HistoricoAcao).where(models.HistoricoAcao.ticker_codigo == ticker_code.upper()))
+    await db.execute(delete(models.RollupHistorico).where(models.RollupHistorico.ticker_codigo == ticker_code.upper()))
+    await db.execute(delete(models.EventoCorporativo).where(models.EventoCorporativo.ticker_codigo == ticker_code.upper()))
+    await db.execute(delete(models.SnapshotAcao).where(models.SnapshotAcao.ticker_codigo == ticker_code.upper()))
+    await db.delete(db_ticker)
+    await db.run_sync(incrementar_versao, VERSAO_TICKERS)
+    await db.commit()
+    armazem_precos.marcar_desatualizado()
+    return db_ticker
+
+async def _serie_grafico(db: AsyncSession, ticker_code: str, como_float: bool = False, dias: Optional[int] = 90,
+                         intervalo: str = INTERVALO_DIARIO) -> Optional[Tuple[Sequence, Sequence]]:
+    data_inicio, data_fim = acao_service._janela_grafico(dias)
+    if intervalo == INTERVALO_DIARIO and await _armazem_ativo(db):
+        return acao_service._serie_armazem(ticker_code, data_inicio, data_fim)
+
+    if not await _buscar_ticker(db, ticker_code):
+        return None
+
+    if intervalo != INTERVALO_DIARIO:
+        stmt = acao_service._consulta_agregados_grafico(ticker_code, intervalo, data_inicio, como_float)
+        return acao_service._colunas((await db.execute(stmt)).all(), 0, 4)
+    stmt = acao_service._consulta_serie_diaria(ticker_code, data_inicio, data_fim, como_float)
+    return acao_service._colunas((await db.execute(stmt)).all(), 0, 1)
+
+async def get_dados_para_grafico(db: AsyncSession, ticker_code: str, dias: Optional[int] = 90, intervalo: str = INTERVALO_DIARIO) -> Optional[GraficoDataOut]:
+    serie = await _serie_grafico(db, ticker_code, dias=dias, intervalo=intervalo)
+    return None if serie is None else await _em_thread(acao_service._grafico, serie, intervalo)
+
+async def get_serie_grafico(db: AsyncSession, ticker_code: str, dias: Optional[int] = 90, intervalo: str = INTERVALO_DIARIO) -> Optional[dict]:
+    serie = await _serie_grafico(db, ticker_code, como_float=True, dias=dias, intervalo=intervalo)
+    return None if serie is None else await _em_thread(acao_service._serie_para_resposta, serie, intervalo)
+
+async def get_colunas_grafico(db: AsyncSession, ticker_code: str, dias: Optional[int] = 90, intervalo: str = INTERVALO_DIARIO) -> Optional[Dict[str, np.ndarray]]:
+    if intervalo != INTERVALO_DIARIO:
+        if not await _buscar_ticker(db, ticker_code):
+            return None
+        stmt = acao_service._consulta_agregados_grafico(ticker_code, intervalo, acao_service._janela_grafico(dias)[0], como_float=True)
+        return await _em_thread(acao_service._colunas_agregados, (await db.execute(stmt)).all())
+    serie = await _serie_grafico(db, ticker_code, como_float=True, dias=dias)
+    return None if serie is None else await _em_thread(acao_service._colunas_serie, serie)
+
+async def _carregar_series(db: AsyncSession, tickers: Sequence[str]) -> Dict[str, SerieTicker]:
+    if await _armazem_ativo(db):
+        return indicadores._series_armazem(tickers)
+    existentes = set((await db.execute(indicadores._consulta_existentes(tickers))).scalars())
+    linhas = (await db.execute(indicadores._consulta_series(existentes))).all()
+    return await _em_thread(indicadores._montar_series, existentes, linhas)
+
+async def get_indicadores(db: AsyncSession, tickers: List[str], pedidos: List[indicadores.Pedido], versao: int,
+                          dias: Optional[int] = None) -> Tuple[Dict[str, tuple], List[str]]:
+    """Mesma regra de `indicadores.get_indicadores`; uma série que saiu do cache no meio do cálculo é lida e o ticker recalculado."""
+    codigos = list(dict.fromkeys(t.upper() for t in tickers))
+    faltando = set(indicadores.motor_indicadores.pendentes(codigos, pedidos, versao))
+    series = await _carregar_series(db, list(faltando)) if faltando else {}
+    calculaveis = [c for c in codigos if c not in faltando or c in series]
+    resultados, sem_serie = await _em_thread(indicadores.calcular_indicadores, calculaveis, pedidos, versao, series, dias)
+    if sem_serie:
+        series = await _carregar_series(db, sem_serie)
+        recalculados, _ = await _em_thread(indicadores.calcular_indicadores, [c for c in sem_serie if c in series],
+                                           pedidos, versao, series, dias)
+        resultados.update(recalculados)
+    return resultados, [c for c in codigos if c not in resultados]
+
+async def _artefato_grafico_comparativo(db: AsyncSession, dias: int, intervalo: str, coluna):
+    if intervalo != INTERVALO_DIARIO:
+        return None
+    linha = (await db.execute(acao_service._consulta_artefato(dias, coluna))).first()
+    return acao_service._conteudo_atual(linha, (await db.run_sync(ler_versao))[0])
+
+async def _calcular_grafico_comparativo(db: AsyncSession, dias: int, intervalo: str, saida: Callable[[pd.DataFrame], object]):
+    """Lê os preços da janela e entrega pivot, normalização e `saida` ao threadpool em um único passo."""
+    data_inicio, data_fim = acao_service._janela_comparativo(dias)
+    if intervalo == INTERVALO_DIARIO and await _armazem_ativo(db):
+        montar = lambda: acao_service._precos_comparativos_armazem(data_inicio, data_fim)
+    else:
+        linhas = (await db.execute(acao_service._consulta_precos_comparativos(intervalo, data_inicio, data_fim))).all()
+        montar = lambda: acao_service._pivotar_precos(linhas)
+    return await _em_thread(lambda: saida(acao_service._normalizar_comparativo(montar())))
+
+async def get_dados_grafico_comparativo(db: AsyncSession, dias: int = 90, intervalo: str = INTERVALO_DIARIO) -> GraficoComparativoOut:
+    conteudo = await _artefato_grafico_comparativo(db, dias, intervalo, models.GraficoComparativoArtefato.conteudo)
+    if conteudo is not None:
+        return GraficoComparativoOut.model_validate_json(conteudo)
+    return await _calcular_grafico_comparativo(db, dias, intervalo, acao_service._grafico_comparativo)
+
+async def get_json_grafico_comparativo(db: AsyncSession, dias: int = 90, intervalo: str = INTERVALO_DIARIO) -> str:
+    conteudo = await _artefato_grafico_comparativo(db, dias, intervalo, models.GraficoComparativoArtefato.conteudo)
+    if conteudo is not None:
+        return conteudo
+    return await _calcular_grafico_comparativo(db, dias, intervalo, lambda df: acao_service._grafico_comparativo(df).model_dump_json())
+
+async def get_tabela_grafico_comparativo(db: AsyncSession, dias: int = 90, intervalo: str = INTERVALO_DIARIO):
+    tabela = await _artefato_grafico_comparativo(db, dias, intervalo, models.GraficoComparativoArtefato.tabela_arrow)
+    if tabela is not None:
+        return formatos_colunares.ler_stream(tabela)
+    return await _calcular_grafico_comparativo(db, dias, intervalo, acao_service._tabela_comparativo)
+
+async def update_ticker_nome(db: AsyncSession, ticker_code: str, ticker_update: TickerUpdate) -> Optional[models.Ticker]:
+    db_ticker = await _buscar_ticker(db, ticker_code)
+    if not db_ticker:
+        return None
+
+    db_ticker.nome = ticker_update.nome
+    await db.run_sync(incrementar_versao, VERSAO_TICKERS)
+    await db.commit()
+    await db.refresh(db_ticker)
+    armazem_precos.marcar_desatualizado()
+    return db_ticker
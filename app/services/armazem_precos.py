@@ -0,0 +1,291 @@
+"""
+Armazém colunar em memória de `acoes_historico`.
+
+Carregado na inicialização da API (ARMAZEM_PRECOS_ATIVO=True), guarda por ticker um
+vetor NumPy ordenado de datas e um vetor float64 por coluna (NaN onde o banco tem
+NULL). As leituras do `acao_service` passam a ser buscas binárias e fatiamentos em
+vez de SQL. A atualização só acontece quando a versão dos dados muda e relê apenas
+as linhas a partir da menor data gravada desde a anterior (`historico_alteracoes`),
+o que cobre o dia corrente e também correções e backfills de datas antigas.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db import models
+from app.db.versoes import RETENCAO_ALTERACOES, alteracoes_historico, ler_versao
+
+COLUNAS = ["close", "variacao_percentual", "price_earnings", "dividend_yield", "roe", "market_value", "volume"]
+_TAMANHO_BLOCO = 50_000
+
+@dataclass
+class SerieTicker:
+    datas: np.ndarray
+    colunas: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        return self.datas.nbytes + sum(v.nbytes for v in self.colunas.values())
+
+    def fatia(self, inicio: Optional[date] = None, fim: Optional[date] = None) -> slice:
+        i = 0 if inicio is None else int(np.searchsorted(self.datas, np.datetime64(inicio, "D"), side="left"))
+        j = len(self.datas) if fim is None else int(np.searchsorted(self.datas, np.datetime64(fim, "D"), side="right"))
+        return slice(i, j)
+
+def _float(valor) -> float:
+    return np.nan if valor is None else float(valor)
+
+def _montar_series(linhas: List[tuple]) -> Dict[str, SerieTicker]:
+    """Converte linhas (ticker, date, *COLUNAS) ordenadas por ticker e data em séries por ticker."""
+    if not linhas:
+        return {}
+    tickers = np.array([l[0] for l in linhas], dtype=object)
+    datas = np.array([l[1] for l in linhas], dtype="datetime64[D]")
+    colunas = {c: np.array([_float(l[2 + i]) for l in linhas], dtype=np.float64) for i, c in enumerate(COLUNAS)}
+    inicios = np.flatnonzero(np.r_[True, tickers[1:] != tickers[:-1]])
+    fins = np.r_[inicios[1:], len(linhas)]
+    return {
+        tickers[i]: SerieTicker(datas[i:j].copy(), {c: v[i:j].copy() for c, v in colunas.items()})
+        for i, j in zip(inicios, fins)
+    }
+
+def _concatenar(antiga: Optional[SerieTicker], nova: SerieTicker) -> SerieTicker:
+    if antiga is None:
+        return nova
+    corte = int(np.searchsorted(antiga.datas, nova.datas[0], side="left"))
+    manter = slice(0, corte)
+    return SerieTicker(
+        np.concatenate([antiga.datas[manter], nova.datas]),
+        {c: np.concatenate([antiga.colunas[c][manter], nova.colunas[c]]) for c in COLUNAS},
+    )
+
+def _juntar(partes: Dict[str, List[SerieTicker]]) -> Dict[str, SerieTicker]:
+    series = {}
+    for ticker, pedacos in partes.items():
+        serie = pedacos[0]
+        for pedaco in pedacos[1:]:
+            serie = _concatenar(serie, pedaco)
+        series[ticker] = serie
+    return series
+
+class ArmazemPrecos:
+    def __init__(self):
+        self._series: Dict[str, SerieTicker] = {}
+        self._nomes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._lock_atualizacao = threading.Lock()
+        self._ultima_data: Optional[date] = None
+        self._ultima_verificacao = 0.0
+        self._sincronizado_em = 0.0
+        self._versao: Optional[int] = None
+        self._ultima_alteracao = 0
+        self.atualizacoes = 0
+        self.carregado = False
+        self.tempo_carga_s = 0.0
+
+    @property
+    def ativo(self) -> bool:
+        return settings.ARMAZEM_PRECOS_ATIVO and self.carregado
+
+    def _consulta(self, desde: Optional[date] = None):
+        h = models.HistoricoAcao
+        stmt = select(h.ticker_codigo, h.date, *[getattr(h, c) for c in COLUNAS])
+        if desde is not None:
+            stmt = stmt.where(h.date >= desde)
+        return stmt.order_by(h.ticker_codigo, h.date).execution_options(yield_per=_TAMANHO_BLOCO)
+
+    def _ler_series(self, db: Session, desde: Optional[date] = None) -> Dict[str, SerieTicker]:
+        partes: Dict[str, List[SerieTicker]] = {}
+        for bloco in db.execute(self._consulta(desde)).partitions(_TAMANHO_BLOCO):
+            for ticker, serie in _montar_series(bloco).items():
+                partes.setdefault(ticker, []).append(serie)
+        return _juntar(partes)
+
+    async def _ler_series_async(self, db: AsyncSession, desde: Optional[date] = None) -> Dict[str, SerieTicker]:
+        """Como `_ler_series`, em blocos pela AsyncSession; a montagem dos vetores vai para o threadpool."""
+        partes: Dict[str, List[SerieTicker]] = {}
+        resultado = await db.stream(self._consulta(desde))
+        async for bloco in resultado.partitions(_TAMANHO_BLOCO):
+            for ticker, serie in (await run_in_threadpool(_montar_series, bloco)).items():
+                partes.setdefault(ticker, []).append(serie)
+        return await run_in_threadpool(_juntar, partes)
+
+    def _consulta_nomes(self):
+        return select(models.Ticker.codigo, models.Ticker.nome)
+
+    def _recarregar_tudo(self) -> bool:
+        return not self.carregado or time.monotonic() - self._sincronizado_em > RETENCAO_ALTERACOES.total_seconds()
+
+    def _verificacao_vencida(self) -> bool:
+        return time.monotonic() - self._ultima_verificacao >= settings.ARMAZEM_PRECOS_INTERVALO_SEGUNDOS
+
+    def _marcar_sincronizado(self):
+        self._ultima_verificacao = self._sincronizado_em = time.monotonic()
+
+    def _aplicar_carga(self, series: Dict[str, SerieTicker], nomes: Dict[str, str], versao: int, ultima_alteracao: int):
+        with self._lock:
+            self._series = {t: s for t, s in series.items() if t in nomes}
+            self._nomes = nomes
+            self._ultima_data = self._maior_data()
+            self._versao = versao
+            self._ultima_alteracao = ultima_alteracao
+            self._marcar_sincronizado()
+            self.carregado = True
+
+    def _aplicar_atualizacao(self, novas: Dict[str, SerieTicker], nomes: Dict[str, str], versao: int, ultima_alteracao: int):
+        with self._lock:
+            series = {t: s for t, s in self._series.items() if t in nomes}
+            for ticker, serie in novas.items():
+                if ticker in nomes:
+                    series[ticker] = _concatenar(series.get(ticker), serie)
+            self._series = series
+            self._nomes = nomes
+            self._ultima_data = self._maior_data()
+            self._versao = versao
+            self._ultima_alteracao = ultima_alteracao
+            self._marcar_sincronizado()
+        self.atualizacoes += 1
+
+    def _registrar_carga(self, inicio: float):
+        self.tempo_carga_s = time.perf_counter() - inicio
+        e = self.estatisticas()
+        logging.info(f"📦 Armazém de preços carregado: {e['tickers']} tickers, {e['linhas']} linhas, "
+                     f"{e['memoria_mb']} MB em {e['tempo_carga_s']}s")
+
+    def carregar(self, db: Session):
+        inicio = time.perf_counter()
+        # Lidas antes dos dados: o que for gravado durante a carga é relido na próxima atualização.
+        versao = ler_versao(db)[0]
+        ultima_alteracao = alteracoes_historico(db)[0]
+        series = self._ler_series(db)
+        self._aplicar_carga(series, dict(db.execute(self._consulta_nomes()).all()), versao, ultima_alteracao)
+        self._registrar_carga(inicio)
+
+    async def carregar_async(self, db: AsyncSession):
+        inicio = time.perf_counter()
+        versao = (await db.run_sync(ler_versao))[0]
+        ultima_alteracao = (await db.run_sync(alteracoes_historico))[0]
+        series = await self._ler_series_async(db)
+        self._aplicar_carga(series, dict((await db.execute(self._consulta_nomes())).all()), versao, ultima_alteracao)
+        self._registrar_carga(inicio)
+
+    def _maior_data(self) -> Optional[date]:
+        datas = [s.datas[-1] for s in self._series.values() if len(s.datas)]
+        return max(datas).astype(date) if datas else None
+
+    def atualizar(self, db: Session):
+        """
+        Com a versão dos dados inalterada, não lê nada. Senão relê, de todos os tickers,
+        as linhas a partir da menor data gravada desde a última atualização, substituindo
+        o trecho correspondente das séries. Sem atualizar por mais que RETENCAO_ALTERACOES,
+        o registro de alterações pode ter perdido entradas, e tudo é recarregado.
+        """
+        if self._recarregar_tudo():
+            self.carregar(db)
+            return
+        versao = ler_versao(db)[0]
+        if versao == self._versao:
+            self._marcar_sincronizado()
+            return
+        ultima_alteracao, desde = alteracoes_historico(db, self._ultima_alteracao)
+        novas = self._ler_series(db, desde=desde) if desde is not None else {}
+        self._aplicar_atualizacao(novas, dict(db.execute(self._consulta_nomes()).all()), versao, ultima_alteracao)
+
+    async def atualizar_async(self, db: AsyncSession):
+        """`atualizar` pela AsyncSession da requisição."""
+        if self._recarregar_tudo():
+            await self.carregar_async(db)
+            return
+        versao = (await db.run_sync(ler_versao))[0]
+        if versao == self._versao:
+            self._marcar_sincronizado()
+            return
+        ultima_alteracao, desde = await db.run_sync(alteracoes_historico, self._ultima_alteracao)
+        novas = await self._ler_series_async(db, desde=desde) if desde is not None else {}
+        nomes = dict((await db.execute(self._consulta_nomes())).all())
+        await run_in_threadpool(self._aplicar_atualizacao, novas, nomes, versao, ultima_alteracao)
+
+    def atualizar_se_necessario(self, db: Session):
+        """
+        Verifica a versão dos dados a cada ARMAZEM_PRECOS_INTERVALO_SEGUNDOS. Uma requisição
+        atualiza por vez; as que chegam durante a atualização seguem com os dados atuais.
+        """
+        if not self.ativo or not self._verificacao_vencida():
+            return
+        if not self._lock_atualizacao.acquire(blocking=False):
+            return
+        try:
+            if self._verificacao_vencida():
+                self.atualizar(db)
+        except Exception as e:
+            logging.error(f"Erro ao atualizar o armazém de preços: {e}")
+            self._ultima_verificacao = time.monotonic()
+        finally:
+            self._lock_atualizacao.release()
+
+    async def atualizar_se_necessario_async(self, db: AsyncSession):
+        """Mesma regra de `atualizar_se_necessario`; o lock nunca espera, então não bloqueia o event loop."""
+        if not self.ativo or not self._verificacao_vencida():
+            return
+        if not self._lock_atualizacao.acquire(blocking=False):
+            return
+        try:
+            if self._verificacao_vencida():
+                await self.atualizar_async(db)
+        except Exception as e:
+            logging.error(f"Erro ao atualizar o armazém de preços: {e}")
+            self._ultima_verificacao = time.monotonic()
+        finally:
+            self._lock_atualizacao.release()
+
+    def marcar_desatualizado(self):
+        """Força a atualização na próxima leitura (ex.: após cadastrar ou remover um ticker)."""
+        self._versao = None
+        self._ultima_verificacao = 0.0
+
+    def nome(self, ticker: str) -> Optional[str]:
+        return self._nomes.get(ticker)
+
+    def serie(self, ticker: str) -> Optional[SerieTicker]:
+        return self._series.get(ticker)
+
+    def tickers(self) -> List[str]:
+        return sorted(self._series)
+
+    def ultimo_registro(self, ticker: str) -> Optional[Tuple[models.Ticker, models.HistoricoAcao]]:
+        """Mesmo formato de `acao_service.get_ultimo_snapshot`, montado a partir dos vetores."""
+        serie = self._series.get(ticker)
+        if serie is None or not len(serie.datas):
+            return None
+        valores = {c: serie.colunas[c][-1] for c in COLUNAS}
+        historico = models.HistoricoAcao(
+            ticker_codigo=ticker,
+            date=serie.datas[-1].astype(date),
+            **{c: (None if np.isnan(v) else (int(v) if c == "volume" else float(v))) for c, v in valores.items()},
+        )
+        return models.Ticker(codigo=ticker, nome=self._nomes[ticker]), historico
+
+    def estatisticas(self) -> dict:
+        series = list(self._series.values())
+        return {
+            "ativo": self.ativo,
+            "tickers": len(series),
+            "linhas": sum(len(s.datas) for s in series),
+            "memoria_mb": round(sum(s.nbytes for s in series) / 1024 ** 2, 2),
+            "tempo_carga_s": round(self.tempo_carga_s, 3),
+            "ultima_data": self._ultima_data.isoformat() if self._ultima_data else None,
+            "versao_dados": self._versao,
+            "atualizacoes": self.atualizacoes,
+        }
+
+armazem_precos = ArmazemPrecos()
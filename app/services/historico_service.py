@@ -0,0 +1,132 @@
+"""
+Exportação das linhas de `acoes_historico` em streaming (NDJSON, CSV, Arrow IPC ou Parquet).
+
+A leitura usa cursor do lado do servidor (`AsyncSession.stream` + `yield_per`) e
+cada bloco é formatado e enviado assim que chega, então a memória do servidor não
+depende do tamanho da exportação. A paginação é por chave (ticker, date): o cursor
+é a chave da última linha da página, e a próxima começa logo depois dela. Ele é
+calculado antes do envio, para poder ir no cabeçalho X-Proximo-Cursor.
+"""
+import base64
+import csv
+import io
+from datetime import date
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import Float, cast, desc, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core import formatos_colunares
+from app.core.config import settings
+from app.core.formatos_colunares import FORMATO_CSV, FORMATO_NDJSON, COLUNARES, EscritorIncremental
+from app.db import models
+
+COLUNAS_EXPORTAVEIS = ["close", "variacao_percentual", "price_earnings", "dividend_yield", "roe", "market_value", "volume"]
+FORMATOS = [FORMATO_NDJSON, FORMATO_CSV, *COLUNARES]
+
+def codificar_cursor(ticker: str, data: date) -> str:
+    return base64.urlsafe_b64encode(f"{ticker}|{data.isoformat()}".encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str) -> Tuple[str, date]:
+    """Levanta ValueError se o cursor não foi gerado por `codificar_cursor`."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ticker, data = texto.split("|")
+        return ticker, date.fromisoformat(data)
+    except Exception:
+        raise ValueError("Cursor inválido.")
+
+def validar_colunas(colunas: Optional[str]) -> List[str]:
+    """Colunas pedidas (separadas por vírgula) na ordem informada; None = todas."""
+    if not colunas:
+        return list(COLUNAS_EXPORTAVEIS)
+    pedidas = [c.strip() for c in colunas.split(",") if c.strip()]
+    invalidas = [c for c in pedidas if c not in COLUNAS_EXPORTAVEIS]
+    if invalidas:
+        raise ValueError(f"Colunas inválidas: {', '.join(invalidas)}. Disponíveis: {', '.join(COLUNAS_EXPORTAVEIS)}.")
+    return pedidas
+
+def _coluna(nome: str):
+    coluna = getattr(models.HistoricoAcao, nome)
+    # NUMERIC vira float já no banco: evita um Decimal por célula na formatação.
+    return coluna if nome == "volume" else cast(coluna, Float).label(nome)
+
+def _filtros(tickers: Sequence[str], inicio: Optional[date], fim: Optional[date], apos: Optional[Tuple[str, date]]) -> list:
+    h = models.HistoricoAcao
+    filtros = [h.ticker_codigo.in_([t.upper() for t in tickers])]
+    if inicio is not None:
+        filtros.append(h.date >= inicio)
+    if fim is not None:
+        filtros.append(h.date <= fim)
+    if apos is not None:
+        filtros.append(tuple_(h.ticker_codigo, h.date) > apos)
+    return filtros
+
+def _apos(cursor: Optional[str]) -> Optional[Tuple[str, date]]:
+    return decodificar_cursor(cursor) if cursor is not None else None
+
+def montar_consulta(tickers: Sequence[str], colunas: List[str], inicio: Optional[date] = None, fim: Optional[date] = None,
+                    cursor: Optional[str] = None, limite: Optional[int] = None):
+    h = models.HistoricoAcao
+    stmt = (
+        select(h.ticker_codigo.label("ticker"), h.date, *[_coluna(c) for c in colunas])
+        .where(*_filtros(tickers, inicio, fim, _apos(cursor)))
+        .order_by(h.ticker_codigo, h.date)
+    )
+    return stmt.limit(limite) if limite is not None else stmt
+
+async def proximo_cursor(db: AsyncSession, tickers: Sequence[str], inicio: Optional[date], fim: Optional[date],
+                         cursor: Optional[str], limite: Optional[int]) -> Optional[str]:
+    """
+    Chave da última linha desta página, ou None se não houver linhas depois dela. Só o
+    índice (ticker, date) é lido: as chaves da página e uma sondagem logo após a última.
+    """
+    if limite is None:
+        return None
+    h = models.HistoricoAcao
+    pagina = (
+        select(h.ticker_codigo.label("ticker"), h.date)
+        .where(*_filtros(tickers, inicio, fim, _apos(cursor)))
+        .order_by(h.ticker_codigo, h.date)
+        .limit(limite)
+        .subquery()
+    )
+    ultima = (await db.execute(select(pagina.c.ticker, pagina.c.date).order_by(desc(pagina.c.ticker), desc(pagina.c.date)).limit(1))).first()
+    if ultima is None:
+        return None
+    seguinte = select(h.ticker_codigo).where(*_filtros(tickers, inicio, fim, tuple(ultima))).limit(1)
+    return codificar_cursor(*ultima) if (await db.execute(seguinte)).first() else None
+
+def _ndjson(nomes: List[str], bloco) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(nomes, linha))) + b"\n" for linha in bloco)
+
+def _csv(bloco) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(bloco)
+    return buffer.getvalue().encode()
+
+def schema_arrow(colunas: List[str]):
+    pa = formatos_colunares.pa
+    campos = [pa.field("ticker", pa.string()), pa.field("date", pa.date32())]
+    campos += [pa.field(c, pa.int64() if c == "volume" else pa.float64()) for c in colunas]
+    return pa.schema(campos)
+
+async def transmitir(engine: AsyncEngine, stmt, colunas: List[str], formato: str) -> AsyncIterator[bytes]:
+    """Gerador do corpo da resposta; abre a própria sessão porque roda depois que o endpoint retorna."""
+    nomes = ["ticker", "date", *colunas]
+    tamanho_bloco = settings.HISTORICO_TAMANHO_BLOCO
+    escritor = EscritorIncremental(schema_arrow(colunas), formato) if formato in COLUNARES else None
+    if formato == FORMATO_CSV:
+        yield (",".join(nomes) + "\n").encode()
+    async with AsyncSession(bind=engine) as db:
+        resultado = await db.stream(stmt.execution_options(yield_per=tamanho_bloco))
+        async for bloco in resultado.partitions(tamanho_bloco):
+            if escritor is not None:
+                yield escritor.escrever(bloco)
+            elif formato == FORMATO_CSV:
+                yield _csv(bloco)
+            else:
+                yield _ndjson(nomes, bloco)
+    if escritor is not None:
+        yield escritor.fechar()
@@ -0,0 +1,379 @@
+"""
+Indicadores técnicos calculados sobre as séries de fechamento/volume de `acoes_historico`.
+
+Cada indicador é uma função vetorizada que calcula as posições a partir de `k`,
+reaproveitando o resultado anterior até `k - 1`: médias móveis, retornos e
+volatilidade só precisam de uma janela de aquecimento antes de `k`; EMA, RSI e
+drawdown continuam a partir do estado guardado na posição `k - 1`. As suavizações
+recursivas (EMA e a média de Wilder do RSI) usam `ewm(adjust=False)` do pandas, que
+roda em C sobre o vetor inteiro.
+
+O `MotorIndicadores` memoriza o resultado por (ticker, indicador, parâmetro) junto
+com a versão dos dados. Com a versão igual, a resposta sai do cache sem ler a
+série; com versão nova, a série é comparada com a que gerou o cache e só o trecho
+a partir da primeira divergência é recalculado (dia novo no fim ou regravação do
+último dia).
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, cast, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+from app.db.versoes import ler_versao
+from app.services.armazem_precos import SerieTicker, armazem_precos
+
+DIAS_POR_ANO = 252
+# Abaixo disso (tipicamente o trecho de uma atualização incremental) o laço em Python
+# sai mais barato que montar uma pd.Series.
+_TRECHO_CURTO = 32
+
+def _suavizar(semente: float, valores: np.ndarray, alfa: float) -> np.ndarray:
+    """y[i] = alfa * x[i] + (1 - alfa) * y[i - 1], com y[-1] = semente."""
+    if not len(valores):
+        return np.empty(0)
+    if len(valores) <= _TRECHO_CURTO and not np.isnan(semente) and not np.isnan(valores).any():
+        saida = np.empty(len(valores))
+        y = semente
+        for i, x in enumerate(valores.tolist()):
+            y = alfa * x + (1 - alfa) * y
+            saida[i] = y
+        return saida
+    serie = pd.Series(np.r_[semente, valores])
+    return serie.ewm(alpha=alfa, adjust=False).mean().to_numpy()[1:]
+
+def _sma(x: np.ndarray, k: int, anterior: Optional[dict], janela: int) -> dict:
+    inicio = max(0, k - janela + 1)
+    trecho = x[inicio:]
+    # Somas acumuladas com NaN zerado; janelas que contêm algum NaN ficam NaN.
+    acumulado = np.concatenate(([0.0], np.cumsum(np.nan_to_num(trecho))))
+    faltantes = np.concatenate(([0], np.cumsum(np.isnan(trecho))))
+    valor = np.full(len(trecho), np.nan)
+    if len(trecho) >= janela:
+        valor[janela - 1:] = (acumulado[janela:] - acumulado[:-janela]) / janela
+        valor[janela - 1:][faltantes[janela:] - faltantes[:-janela] > 0] = np.nan
+    return {"valor": valor[k - inicio:]}
+
+def _volume_medio(x: np.ndarray, k: int, anterior: Optional[dict], janela: int) -> dict:
+    """Média simples do volume, com dias sem volume contando como zero."""
+    inicio = max(0, k - janela + 1)
+    return _sma(np.nan_to_num(x[inicio:]), k - inicio, None, janela)
+
+def _ema(x: np.ndarray, k: int, anterior: Optional[dict], janela: int) -> dict:
+    alfa = 2.0 / (janela + 1)
+    if k >= janela:
+        return {"valor": _suavizar(anterior["valor"][k - 1], x[k:], alfa)}
+    valor = np.full(len(x), np.nan)
+    if len(x) >= janela:
+        valor[janela - 1] = x[:janela].mean()
+        valor[janela:] = _suavizar(valor[janela - 1], x[janela:], alfa)
+    return {"valor": valor[k:]}
+
+def _retornos(x: np.ndarray, k: int, anterior: Optional[dict], periodo: int) -> dict:
+    inicio = max(0, k - periodo)
+    trecho = x[inicio:]
+    valor = np.full(len(trecho), np.nan)
+    if len(trecho) > periodo:
+        valor[periodo:] = trecho[periodo:] / trecho[:-periodo] - 1
+    return {"valor": valor[k - inicio:]}
+
+def _volatilidade(x: np.ndarray, k: int, anterior: Optional[dict], janela: int) -> dict:
+    """Desvio padrão dos log-retornos diários na janela, anualizado."""
+    inicio = max(0, k - janela)
+    trecho = x[inicio:]
+    valor = np.full(len(trecho), np.nan)
+    if len(trecho) > janela:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_retornos = np.diff(np.log(trecho))
+        janelas = np.lib.stride_tricks.sliding_window_view(log_retornos, janela)
+        valor[janela:] = janelas.std(axis=1, ddof=1) * np.sqrt(DIAS_POR_ANO)
+    return {"valor": valor[k - inicio:]}
+
+def _drawdown(x: np.ndarray, k: int, anterior: Optional[dict], _parametro: Optional[int]) -> dict:
+    trecho = x[k:]
+    if k == 0:
+        pico = np.fmax.accumulate(trecho)
+    else:
+        pico = np.fmax.accumulate(np.r_[anterior["pico"][k - 1], trecho])[1:]
+    return {"valor": trecho / pico - 1, "pico": pico}
+
+def _rsi(x: np.ndarray, k: int, anterior: Optional[dict], janela: int) -> dict:
+    """RSI de Wilder: médias de ganhos e perdas com alfa = 1/janela, semeadas pela média simples."""
+    alfa = 1.0 / janela
+    if k > janela:
+        delta = np.diff(x[k - 1:])
+        ganho = _suavizar(anterior["ganho"][k - 1], np.maximum(delta, 0), alfa)
+        perda = _suavizar(anterior["perda"][k - 1], np.maximum(-delta, 0), alfa)
+    else:
+        ganho = np.full(len(x), np.nan)
+        perda = np.full(len(x), np.nan)
+        if len(x) > janela:
+            delta = np.diff(x)
+            altas, baixas = np.maximum(delta, 0), np.maximum(-delta, 0)
+            ganho[janela] = altas[:janela].mean()
+            perda[janela] = baixas[:janela].mean()
+            ganho[janela + 1:] = _suavizar(ganho[janela], altas[janela:], alfa)
+            perda[janela + 1:] = _suavizar(perda[janela], baixas[janela:], alfa)
+        ganho, perda = ganho[k:], perda[k:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        valor = 100 - 100 / (1 + ganho / perda)
+    valor = np.where((perda == 0) & ~np.isnan(ganho), 100.0, valor)
+    return {"valor": valor, "ganho": ganho, "perda": perda}
+
+@dataclass(frozen=True)
+class Indicador:
+    funcao: Callable[[np.ndarray, int, Optional[dict], Optional[int]], dict]
+    parametro_padrao: Optional[int]
+    coluna: str = "close"
+
+INDICADORES: Dict[str, Indicador] = {
+    "sma": Indicador(_sma, 20),
+    "ema": Indicador(_ema, 20),
+    "retornos": Indicador(_retornos, 1),
+    "volatilidade": Indicador(_volatilidade, 21),
+    "drawdown": Indicador(_drawdown, None),
+    "rsi": Indicador(_rsi, 14),
+    "volume_medio": Indicador(_volume_medio, 20, "volume"),
+}
+PARAMETRO_MAXIMO = 1000
+
+Pedido = Tuple[str, Optional[int]]
+
+def interpretar_pedidos(especificacao: Optional[str]) -> List[Pedido]:
+    """`sma:20,ema:50,rsi,drawdown` -> [(nome, parâmetro)]. Levanta ValueError se algo não for reconhecido."""
+    if not especificacao:
+        especificacao = "sma,ema,rsi"
+    pedidos = []
+    for item in (p.strip().lower() for p in especificacao.split(",")):
+        if not item:
+            continue
+        nome, _, parametro = item.partition(":")
+        indicador = INDICADORES.get(nome)
+        if indicador is None:
+            raise ValueError(f"Indicador '{nome}' desconhecido. Disponíveis: {', '.join(INDICADORES)}.")
+        if indicador.parametro_padrao is None:
+            pedidos.append((nome, None))
+            continue
+        if not parametro:
+            pedidos.append((nome, indicador.parametro_padrao))
+        elif parametro.isdigit() and 1 <= int(parametro) <= PARAMETRO_MAXIMO:
+            pedidos.append((nome, int(parametro)))
+        else:
+            raise ValueError(f"Parâmetro inválido em '{item}': use um inteiro entre 1 e {PARAMETRO_MAXIMO}.")
+    if len(pedidos) > settings.INDICADORES_MAX_POR_CONSULTA:
+        raise ValueError(f"Máximo de {settings.INDICADORES_MAX_POR_CONSULTA} indicadores por consulta.")
+    return list(dict.fromkeys(pedidos))
+
+def nome_coluna(pedido: Pedido) -> str:
+    nome, parametro = pedido
+    return nome if parametro is None else f"{nome}_{parametro}"
+
+def calcular(pedido: Pedido, serie: SerieTicker) -> np.ndarray:
+    """Cálculo completo, sem cache (benchmarks e conferência do incremental)."""
+    nome, parametro = pedido
+    indicador = INDICADORES[nome]
+    return indicador.funcao(serie.colunas[indicador.coluna], 0, None, parametro)["valor"]
+
+def _inicio_divergencia(antigo: np.ndarray, novo: np.ndarray) -> int:
+    """Primeira posição em que os vetores diferem (NaN = NaN); o menor tamanho se um for prefixo do outro."""
+    n = min(len(antigo), len(novo))
+    iguais = antigo[:n] == novo[:n]
+    if antigo.dtype.kind == "f":
+        iguais |= np.isnan(antigo[:n]) & np.isnan(novo[:n])
+    diferentes = np.flatnonzero(~iguais)
+    return int(diferentes[0]) if len(diferentes) else n
+
+@dataclass
+class _Entrada:
+    versao: int
+    datas: np.ndarray
+    entrada: np.ndarray
+    series: Dict[str, np.ndarray]
+
+class MotorIndicadores:
+    def __init__(self, capacidade: Optional[int] = None):
+        self._capacidade = capacidade
+        self._cache: "OrderedDict[Tuple[str, str, Optional[int]], _Entrada]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.incrementais = 0
+        self.completos = 0
+
+    @property
+    def capacidade(self) -> int:
+        return self._capacidade if self._capacidade is not None else settings.INDICADORES_CACHE_CAPACIDADE
+
+    def _buscar(self, chave) -> Optional[_Entrada]:
+        with self._lock:
+            entrada = self._cache.get(chave)
+            if entrada is not None:
+                self._cache.move_to_end(chave)
+            return entrada
+
+    def _guardar(self, chave, entrada: _Entrada):
+        if self.capacidade <= 0:
+            return
+        with self._lock:
+            self._cache[chave] = entrada
+            self._cache.move_to_end(chave)
+            while len(self._cache) > self.capacidade:
+                self._cache.popitem(last=False)
+
+    def pendentes(self, tickers: Sequence[str], pedidos: Sequence[Pedido], versao: int) -> List[str]:
+        """Tickers com algum indicador fora do cache ou de versão antiga (precisam da série)."""
+        faltando = []
+        for ticker in tickers:
+            for pedido in pedidos:
+                entrada = self._buscar((ticker, *pedido))
+                if entrada is None or entrada.versao != versao:
+                    faltando.append(ticker)
+                    break
+        return faltando
+
+    def calcular(self, ticker: str, pedidos: Sequence[Pedido], versao: int, serie: Optional[SerieTicker] = None,
+                 carregar: Optional[Callable[[], Optional[SerieTicker]]] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        (datas, {coluna: valores}). A série só é necessária se algum pedido não estiver no
+        cache desta versão; sem `serie`, ela vem de `carregar()`, pois uma entrada vista em
+        `pendentes` pode ter saído do cache (LRU) antes deste cálculo.
+        """
+        datas = serie.datas if serie is not None else None
+        resultado = {}
+        divergencias: Dict[tuple, int] = {}
+        for pedido in pedidos:
+            chave = (ticker, *pedido)
+            entrada = self._buscar(chave)
+            if entrada is None or entrada.versao != versao:
+                if serie is None:
+                    serie = carregar() if carregar is not None else None
+                    if serie is None:
+                        raise LookupError(f"Série de {ticker} indisponível para calcular {nome_coluna(pedido)}.")
+                entrada = self._atualizar(entrada, pedido, versao, serie, divergencias)
+                self._guardar(chave, entrada)
+            else:
+                self.acertos += 1
+            datas = entrada.datas if datas is None else datas
+            resultado[nome_coluna(pedido)] = entrada.series["valor"]
+        return datas, resultado
+
+    def _atualizar(self, entrada: Optional[_Entrada], pedido: Pedido, versao: int, serie: SerieTicker,
+                   divergencias: Dict[tuple, int]) -> _Entrada:
+        nome, parametro = pedido
+        indicador = INDICADORES[nome]
+        x = serie.colunas[indicador.coluna]
+        k = 0
+        if entrada is not None:
+            # Indicadores calculados sobre a mesma série antiga compartilham os vetores: compara uma vez só.
+            marca = (id(entrada.datas), id(entrada.entrada), indicador.coluna)
+            if marca not in divergencias:
+                divergencias[marca] = min(_inicio_divergencia(entrada.datas, serie.datas), _inicio_divergencia(entrada.entrada, x))
+            k = divergencias[marca]
+        if k == 0:
+            self.completos += 1
+            series = indicador.funcao(x, 0, None, parametro)
+        else:
+            self.incrementais += 1
+            anteriores = {c: v[:k] for c, v in entrada.series.items()}
+            novos = indicador.funcao(x, k, anteriores, parametro)
+            series = {c: np.concatenate([anteriores[c], novos[c]]) for c in anteriores}
+        return _Entrada(versao, serie.datas, x, series)
+
+    def limpar(self):
+        with self._lock:
+            self._cache.clear()
+
+    def estatisticas(self) -> dict:
+        return {
+            "entradas": len(self._cache),
+            "capacidade": self.capacidade,
+            "acertos": self.acertos,
+            "incrementais": self.incrementais,
+            "completos": self.completos,
+        }
+
+motor_indicadores = MotorIndicadores()
+
+def _series_armazem(tickers: Sequence[str]) -> Dict[str, SerieTicker]:
+    vazia = SerieTicker(np.array([], dtype="datetime64[D]"), {"close": np.empty(0), "volume": np.empty(0)})
+    return {t: armazem_precos.serie(t) or vazia for t in tickers if armazem_precos.nome(t) is not None}
+
+def _consulta_existentes(tickers: Sequence[str]):
+    return select(models.Ticker.codigo).where(models.Ticker.codigo.in_(tickers))
+
+def _consulta_series(existentes: set):
+    h = models.HistoricoAcao
+    return (
+        select(h.ticker_codigo, h.date, cast(h.close, Float), h.volume)
+        .where(h.ticker_codigo.in_(existentes))
+        .order_by(h.ticker_codigo, h.date)
+    )
+
+def _montar_series(existentes: set, linhas: list) -> Dict[str, SerieTicker]:
+    df = pd.DataFrame(linhas, columns=["ticker", "date", "close", "volume"])
+    vazio = df.iloc[0:0]
+    grupos = dict(tuple(df.groupby("ticker", sort=False))) if len(df) else {}
+    series = {}
+    for ticker in existentes:
+        linhas = grupos.get(ticker, vazio)
+        series[ticker] = SerieTicker(
+            linhas["date"].to_numpy(dtype="datetime64[D]"),
+            {
+                "close": pd.to_numeric(linhas["close"]).to_numpy(dtype=np.float64),
+                "volume": pd.to_numeric(linhas["volume"]).to_numpy(dtype=np.float64),
+            },
+        )
+    return series
+
+def carregar_series(db: Session, tickers: Sequence[str]) -> Dict[str, SerieTicker]:
+    """Séries (date, close, volume) dos tickers cadastrados; tickers sem histórico vêm com vetores vazios."""
+    if armazem_precos.ativo:
+        armazem_precos.atualizar_se_necessario(db)
+        return _series_armazem(tickers)
+
+    existentes = set(db.execute(_consulta_existentes(tickers)).scalars())
+    return _montar_series(existentes, db.execute(_consulta_series(existentes)).all())
+
+def calcular_indicadores(codigos: Sequence[str], pedidos: Sequence[Pedido], versao: int, series: Dict[str, SerieTicker],
+                         dias: Optional[int] = None, carregar: Optional[Callable[[str], Optional[SerieTicker]]] = None
+                         ) -> Tuple[Dict[str, Tuple[np.ndarray, Dict[str, np.ndarray]]], List[str]]:
+    """
+    Parte de CPU de `get_indicadores`, sobre séries já lidas. Devolve também os tickers
+    cuja série faltou (a entrada saiu do cache entre `pendentes` e o cálculo) e que
+    `carregar(ticker)` não resolveu.
+    """
+    inicio = None if dias is None else np.datetime64(date.today(), "D") - np.timedelta64(dias, "D")
+    resultados, sem_serie = {}, []
+    for codigo in codigos:
+        try:
+            datas, valores = motor_indicadores.calcular(
+                codigo, pedidos, versao, series.get(codigo), carregar and (lambda c=codigo: carregar(c))
+            )
+        except LookupError:
+            sem_serie.append(codigo)
+            continue
+        i = 0 if inicio is None else int(np.searchsorted(datas, inicio, side="left"))
+        resultados[codigo] = (datas[i:], {c: v[i:] for c, v in valores.items()})
+    return resultados, sem_serie
+
+def get_indicadores(db: Session, tickers: Sequence[str], pedidos: Sequence[Pedido], versao: Optional[int] = None,
+                    dias: Optional[int] = None) -> Tuple[Dict[str, Tuple[np.ndarray, Dict[str, np.ndarray]]], List[str]]:
+    """
+    ({ticker: (datas, {coluna: valores})}, tickers não encontrados). O cálculo usa o
+    histórico inteiro (aquecimento correto); `dias` só recorta a resposta.
+    """
+    codigos = list(dict.fromkeys(t.upper() for t in tickers))
+    if versao is None:
+        versao = ler_versao(db)[0]
+    faltando = set(motor_indicadores.pendentes(codigos, pedidos, versao))
+    series = carregar_series(db, list(faltando)) if faltando else {}
+    calculaveis = [c for c in codigos if c not in faltando or c in series]
+    resultados, _ = calcular_indicadores(calculaveis, pedidos, versao, series, dias,
+                                         lambda c: carregar_series(db, [c]).get(c))
+    return resultados, [c for c in codigos if c not in resultados]
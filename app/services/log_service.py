@@ -1,10 +1,166 @@
+import datetime
+import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import select, desc
-from typing import List
+from sqlalchemy import select, desc, delete, func, text, Float, cast
+from typing import List, Optional
 
-from app.db import models
+import pandas as pd
+
+from app.core.config import settings
+from app.db import logs_particionados, models
 
 def get_coleta_logs(db: Session, limit: int = 100) -> List[models.ColetaLog]:
     """Busca os últimos logs de coleta, ordenados por mais recente."""
     stmt = select(models.ColetaLog).order_by(desc(models.ColetaLog.timestamp)).limit(limit)
-    return db.execute(stmt).scalars().all()
\ No newline at end of file
+    return db.execute(stmt).scalars().all()
+
+_SQL_UPSERT_MINUTO = text("""
+INSERT INTO logs_requisicoes_minuto
+    (minuto, endpoint, method, usuario_id, requisicoes, erros, erros_cliente,
+     latencia_soma_ms, latencia_max_ms, p50_ms, p95_ms, p99_ms)
+VALUES
+    (:minuto, :endpoint, :method, :usuario_id, :requisicoes, :erros, :erros_cliente,
+     :latencia_soma_ms, :latencia_max_ms, :p50_ms, :p95_ms, :p99_ms)
+ON CONFLICT (minuto, endpoint, method, usuario_id) DO UPDATE SET
+    requisicoes = excluded.requisicoes, erros = excluded.erros, erros_cliente = excluded.erros_cliente,
+    latencia_soma_ms = excluded.latencia_soma_ms, latencia_max_ms = excluded.latencia_max_ms,
+    p50_ms = excluded.p50_ms, p95_ms = excluded.p95_ms, p99_ms = excluded.p99_ms
+""")
+_BLOCO_CONSOLIDACAO = datetime.timedelta(hours=6)
+
+def _agregar_minutos(linhas: list) -> List[dict]:
+    df = pd.DataFrame(linhas, columns=["timestamp", "endpoint", "method", "usuario_id", "status_code", "response_time_ms"])
+    df["minuto"] = pd.to_datetime(df["timestamp"]).dt.floor("min")
+    df["usuario_id"] = df["usuario_id"].fillna(0).astype(int)
+    df["endpoint"] = df["endpoint"].fillna("")
+    df["method"] = df["method"].fillna("")
+    df["response_time_ms"] = df["response_time_ms"].fillna(0)
+    df["erro"] = df["status_code"] >= 500
+    df["erro_cliente"] = df["status_code"].between(400, 499)
+    grupos = df.groupby(["minuto", "endpoint", "method", "usuario_id"])
+    agregado = grupos.agg(
+        requisicoes=("status_code", "size"),
+        erros=("erro", "sum"),
+        erros_cliente=("erro_cliente", "sum"),
+        latencia_soma_ms=("response_time_ms", "sum"),
+        latencia_max_ms=("response_time_ms", "max"),
+    )
+    percentis = grupos["response_time_ms"].quantile([0.5, 0.95, 0.99]).unstack()
+    percentis.columns = ["p50_ms", "p95_ms", "p99_ms"]
+    agregado = agregado.join(percentis).reset_index()
+    agregado["minuto"] = agregado["minuto"].dt.to_pydatetime()
+    registros = agregado.to_dict("records")
+    for r in registros:
+        for coluna in ("usuario_id", "requisicoes", "erros", "erros_cliente", "latencia_soma_ms", "latencia_max_ms"):
+            r[coluna] = int(r[coluna])
+    return registros
+
+def consolidar_minutos(db: Session, ate: Optional[datetime.datetime] = None) -> int:
+    """
+    Agrega logs_requisicoes por minuto em logs_requisicoes_minuto, do último minuto já
+    consolidado (inclusive, para pegar gravações atrasadas) até `ate`. Minutos mais
+    recentes que LOGS_CONSOLIDACAO_ATRASO_SEGUNDOS ficam para a próxima execução.
+    Retorna o número de linhas de agregado gravadas.
+    """
+    limite = ate or datetime.datetime.utcnow() - datetime.timedelta(seconds=settings.LOGS_CONSOLIDACAO_ATRASO_SEGUNDOS)
+    limite = limite.replace(second=0, microsecond=0)
+    log = models.LogRequisicao
+    inicio = db.execute(select(func.max(models.LogRequisicaoMinuto.minuto))).scalar()
+    if inicio is None:
+        inicio = db.execute(select(func.min(log.timestamp))).scalar()
+    gravadas = 0
+    while inicio is not None and inicio < limite:
+        inicio = inicio.replace(second=0, microsecond=0)
+        fim = min(inicio + _BLOCO_CONSOLIDACAO, limite)
+        stmt = select(log.timestamp, log.endpoint, log.method, log.usuario_id, log.status_code, log.response_time_ms).where(
+            log.timestamp >= inicio, log.timestamp < fim
+        )
+        linhas = db.execute(stmt).all()
+        if linhas:
+            registros = _agregar_minutos(linhas)
+            db.execute(_SQL_UPSERT_MINUTO, registros)
+            db.commit()
+            gravadas += len(registros)
+            inicio = fim
+        else:
+            # Pula direto para o próximo log em vez de varrer janelas vazias.
+            inicio = db.execute(select(func.min(log.timestamp)).where(log.timestamp >= fim)).scalar()
+    return gravadas
+
+def aplicar_retencao(db: Session) -> dict:
+    """Remove partições de logs brutos vencidas (sem apagar o que ainda não foi consolidado) e agregados antigos."""
+    agora = datetime.datetime.utcnow()
+    corte = agora - datetime.timedelta(days=settings.LOGS_RETENCAO_DIAS)
+    consolidado = db.execute(select(func.max(models.LogRequisicaoMinuto.minuto))).scalar()
+    if consolidado is not None:
+        corte = min(corte, consolidado)
+    conn = db.connection()
+    particoes = logs_particionados.remover_antigas(conn, corte)
+    corte_minutos = agora - datetime.timedelta(days=settings.LOGS_MINUTO_RETENCAO_DIAS)
+    minutos = db.execute(delete(models.LogRequisicaoMinuto).where(models.LogRequisicaoMinuto.minuto < corte_minutos)).rowcount
+    db.commit()
+    for nome in particoes:
+        logging.info(f"🗑️  Partição {nome} removida (retenção de {settings.LOGS_RETENCAO_DIAS} dias).")
+    return {"particoes_removidas": particoes, "minutos_removidos": minutos}
+
+def preparar_particoes(db: Session):
+    """Cria as partições do mês corrente e dos LOGS_PARTICOES_A_FRENTE seguintes."""
+    logs_particionados.garantir_proximos_meses(db.connection(), settings.LOGS_PARTICOES_A_FRENTE)
+    db.commit()
+
+PREFIXO_ACOES = "/api/v1/acoes/"
+# Segmentos de /api/v1/acoes/ que são rotas, não tickers.
+_ROTAS_ACOES = {"buscar", "listar-todos", "grafico-comparativo", "indices", "historico", "indicadores"}
+
+def tickers_mais_consultados(db: Session, desde: datetime.datetime, limite: int) -> List[str]:
+    """
+    Os `limite` tickers com mais requisições em /api/v1/acoes/{ticker}[/...] desde `desde`,
+    somando as sub-rotas (gráfico, indicadores...), a partir de logs_requisicoes_minuto.
+    """
+    m = models.LogRequisicaoMinuto
+    stmt = (
+        select(m.endpoint, func.sum(m.requisicoes))
+        .where(m.minuto >= desde, m.endpoint.like(PREFIXO_ACOES + "%"))
+        .group_by(m.endpoint)
+    )
+    contagem = {}
+    for endpoint, requisicoes in db.execute(stmt):
+        ticker = endpoint[len(PREFIXO_ACOES):].split("/", 1)[0].upper()
+        if ticker and ticker.lower() not in _ROTAS_ACOES:
+            contagem[ticker] = contagem.get(ticker, 0) + int(requisicoes or 0)
+    return sorted(contagem, key=lambda t: (-contagem[t], t))[:limite]
+
+AGRUPAMENTOS_USO = ("endpoint", "usuario", "minuto")
+
+def consulta_uso(inicio: datetime.datetime, fim: datetime.datetime, agrupar: str = "endpoint",
+                 usuario_id: Optional[int] = None, endpoint: Optional[str] = None, limite: int = 100):
+    """
+    Uso agregado a partir de logs_requisicoes_minuto. O p95 é aproximado: média dos p95
+    de cada minuto ponderada pelo número de requisições.
+    """
+    m = models.LogRequisicaoMinuto
+    chave = {"endpoint": m.endpoint, "usuario": m.usuario_id, "minuto": m.minuto}[agrupar]
+    requisicoes = func.sum(m.requisicoes)
+    stmt = (
+        select(
+            chave.label("chave"),
+            requisicoes.label("requisicoes"),
+            func.sum(m.erros).label("erros"),
+            func.sum(m.erros_cliente).label("erros_cliente"),
+            (cast(func.sum(m.latencia_soma_ms), Float) / requisicoes).label("latencia_media_ms"),
+            func.max(m.latencia_max_ms).label("latencia_max_ms"),
+            (func.sum(m.p95_ms * m.requisicoes) / requisicoes).label("p95_ms"),
+        )
+        .where(m.minuto >= inicio, m.minuto < fim)
+        .group_by(chave)
+    )
+    if usuario_id is not None:
+        stmt = stmt.where(m.usuario_id == usuario_id)
+    if endpoint is not None:
+        stmt = stmt.where(m.endpoint.like(endpoint))
+    ordem = chave.asc() if agrupar == "minuto" else requisicoes.desc()
+    return stmt.order_by(ordem).limit(limite)
+
+def get_uso(db: Session, inicio: datetime.datetime, fim: datetime.datetime, agrupar: str = "endpoint",
+            usuario_id: Optional[int] = None, endpoint: Optional[str] = None, limite: int = 100) -> List[dict]:
+    return [dict(linha) for linha in db.execute(consulta_uso(inicio, fim, agrupar, usuario_id, endpoint, limite)).mappings()]
@@ -0,0 +1,17 @@
+import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, desc
+from typing import List, Optional
+
+from app.db import models
+from app.services import log_service
+
+async def get_coleta_logs(db: AsyncSession, limit: int = 100) -> List[models.ColetaLog]:
+    """Busca os últimos logs de coleta, ordenados por mais recente."""
+    stmt = select(models.ColetaLog).order_by(desc(models.ColetaLog.timestamp)).limit(limit)
+    return (await db.execute(stmt)).scalars().all()
+
+async def get_uso(db: AsyncSession, inicio: datetime.datetime, fim: datetime.datetime, agrupar: str = "endpoint",
+                  usuario_id: Optional[int] = None, endpoint: Optional[str] = None, limite: int = 100) -> List[dict]:
+    stmt = log_service.consulta_uso(inicio, fim, agrupar, usuario_id, endpoint, limite)
+    return [dict(linha) for linha in (await db.execute(stmt)).mappings()]
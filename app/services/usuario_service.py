@@ -4,6 +4,7 @@ from sqlalchemy import select
 from typing import List, Optional
 from fastapi import HTTPException, status
 
+from app.core.auth_cache import cache_chaves_api
 from app.db import models
 from app.schemas.usuario import UsuarioCreate, UsuarioUpdate
 
@@ -35,6 +36,7 @@ def create_usuario(db: Session, user: UsuarioCreate) -> models.Usuario:
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    cache_chaves_api.invalidar_chave(api_key_unica)
     print(f"Novo usuário criado: {db_user.email}, Chave API: {db_user.api_key}")
     return db_user
 
@@ -55,6 +57,7 @@ def update_usuario(db: Session, user_id: int, user_update: UsuarioUpdate) -> Opt
 
     db.commit()
     db.refresh(db_user)
+    cache_chaves_api.invalidar_usuario(user_id)
     return db_user
 
 def delete_usuario(db: Session, user_id: int) -> Optional[models.Usuario]:
@@ -65,4 +68,5 @@ def delete_usuario(db: Session, user_id: int) -> Optional[models.Usuario]:
         
     db.delete(db_user)
     db.commit()
+    cache_chaves_api.invalidar_usuario(user_id)
     return db_user
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""Versões assíncronas das funções de `usuario_service`, usadas pelos endpoints da API."""
+import logging
+import uuid
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth_cache import cache_chaves_api
+from app.db import models
+from app.schemas.usuario import UsuarioCreate, UsuarioUpdate
+
+async def get_usuario(db: AsyncSession, user_id: int) -> Optional[models.Usuario]:
+    """Busca um único usuário pelo seu ID."""
+    return await db.get(models.Usuario, user_id)
+
+async def get_usuario_by_email(db: AsyncSession, email: str) -> Optional[models.Usuario]:
+    """Busca um único usuário pelo seu email."""
+    stmt = select(models.Usuario).where(models.Usuario.email == email)
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+async def get_usuarios(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[models.Usuario]:
+    """Busca todos os usuários com paginação."""
+    stmt = select(models.Usuario).offset(skip).limit(limit)
+    return (await db.execute(stmt)).scalars().all()
+
+async def create_usuario(db: AsyncSession, user: UsuarioCreate) -> models.Usuario:
+    """Cria um novo usuário e gera uma chave de API única."""
+    if await get_usuario_by_email(db, email=user.email):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email já cadastrado.")
+
+    api_key_unica = str(uuid.uuid4())
+    db_user = models.Usuario(
+        email=user.email,
+        nome=user.nome,
+        api_key=api_key_unica
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    cache_chaves_api.invalidar_chave(api_key_unica)
+    logging.info(f"👤 Novo usuário criado: id {db_user.id}.")
+    return db_user
+
+async def update_usuario(db: AsyncSession, user_id: int, user_update: UsuarioUpdate) -> Optional[models.Usuario]:
+    """Atualiza o nome e/ou email de um usuário."""
+    db_user = await get_usuario(db, user_id)
+    if not db_user:
+        return None
+
+    if user_update.email:
+        existing_user_with_email = await get_usuario_by_email(db, email=user_update.email)
+        if existing_user_with_email and existing_user_with_email.id != user_id:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email já está em uso por outro usuário.")
+        db_user.email = user_update.email
+
+    if user_update.nome:
+        db_user.nome = user_update.nome
+
+    await db.commit()
+    await db.refresh(db_user)
+    cache_chaves_api.invalidar_usuario(user_id)
+    return db_user
+
+async def delete_usuario(db: AsyncSession, user_id: int) -> Optional[models.Usuario]:
+    """Deleta um usuário do banco de dados."""
+    db_user = await get_usuario(db, user_id)
+    if not db_user:
+        return None
+
+    await db.delete(db_user)
+    await db.commit()
+    cache_chaves_api.invalidar_usuario(user_id)
+    return db_user
@@ -1,7 +1,8 @@
 import time
 from sqlalchemy.exc import OperationalError
 from app.db.database import engine
-from app.db import models
+from app.db import logs_particionados, models
+from app.db.migracoes import aplicar_migracoes
 
 from app.db.models import Ticker, HistoricoAcao, Indice, LogRequisicao, Usuario, EventoCorporativo
 
@@ -12,15 +13,22 @@ def create_database_tables():
         time.sleep(2)
         
         print(f"Conectando ao banco de dados em: {engine.url}")
+        if engine.dialect.name == "sqlite":
+            # No SQLite, logs_requisicoes é uma view sobre as tabelas mensais; criada antes para o create_all pulá-la.
+            with engine.begin() as conn:
+                logs_particionados.preparar(conn)
         models.Base.metadata.create_all(bind=engine)
+        migracoes = aplicar_migracoes(engine)
         
         print("\n✅ Tabelas verificadas/criadas com sucesso!")
         print("   - tickers")
         print("   - acoes_historico")
         print("   - indices")
         print("   - usuarios")
-        print("   - logs_requisicoes")
+        print("   - logs_requisicoes (particionada por mês) e logs_requisicoes_minuto")
         print("   - eventos_corporativos  <-- Tabela de eventos adicionada!")
+        for nome in migracoes:
+            print(f"   - migração aplicada: {nome}")
 
     except OperationalError as e:
         print("\n❌ Erro de conexão com o banco de dados.")
@@ -1,18 +1,78 @@
 import schedule
 import time
 import logging
+import threading
+from datetime import datetime
 
-from app.scripts.collect_data import run_collection
+from app.core.config import settings
+from app.scripts.collect_data import agora_bolsa, run_collection, run_intraday, aplicar_retencao_snapshots
+from app.scripts import manutencao_logs
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+def em_thread(nome: str, tarefa):
+    """
+    Roda `tarefa` em uma thread própria, para uma coleta longa não atrasar as demais
+    tarefas do agendador. Se a execução anterior da mesma tarefa ainda não terminou,
+    esta é pulada em vez de se sobrepor a ela.
+    """
+    ocupado = threading.Lock()
+
+    def rodar():
+        try:
+            tarefa()
+        except Exception as e:
+            logging.error(f"❌ Erro na tarefa {nome}: {e}", exc_info=True)
+        finally:
+            ocupado.release()
+
+    def disparar():
+        if not ocupado.acquire(blocking=False):
+            logging.warning(f"⏭️  {nome}: a execução anterior ainda não terminou; pulando esta.")
+            return
+        threading.Thread(target=rodar, name=nome, daemon=True).start()
+    return disparar
+
+def no_horario_intraday(agora: datetime) -> bool:
+    """Dia útil dentro de COLETA_INTRADAY_HORARIO ("HH:MM-HH:MM" no fuso da bolsa; vazio = o dia todo)."""
+    if agora.weekday() >= 5:
+        return False
+    if not settings.COLETA_INTRADAY_HORARIO:
+        return True
+    inicio, fim = (datetime.strptime(h.strip(), "%H:%M").time() for h in settings.COLETA_INTRADAY_HORARIO.split("-"))
+    return inicio <= agora.time() <= fim
+
+def coleta_intraday(camada: str):
+    def tarefa():
+        if no_horario_intraday(agora_bolsa()):
+            run_intraday(camada)
+    return tarefa
+
+def agendar_com_jitter(intervalo: int, tarefa):
+    """Intervalo sorteado a cada execução em intervalo ± COLETA_INTRADAY_JITTER_SEGUNDOS."""
+    jitter = min(settings.COLETA_INTRADAY_JITTER_SEGUNDOS, intervalo - 1)
+    if jitter > 0:
+        return schedule.every(intervalo - jitter).to(intervalo + jitter).seconds.do(tarefa)
+    return schedule.every(intervalo).seconds.do(tarefa)
+
 if __name__ == '__main__':
     logging.info("Agendador de Coleta de Dados iniciado.")
-    
-    schedule.every().day.at("03:00").do(run_collection)
-    
+
+    schedule.every().day.at("03:00").do(em_thread("coleta diária", run_collection))
+    camadas = {
+        "principal": settings.COLETA_INTRADAY_TOP_INTERVALO_SEGUNDOS if settings.COLETA_INTRADAY_TOP_TICKERS > 0 else 0,
+        "cauda": settings.COLETA_INTRADAY_CAUDA_INTERVALO_SEGUNDOS,
+    }
+    for camada, intervalo in camadas.items():
+        if intervalo > 0:
+            agendar_com_jitter(intervalo, em_thread(f"coleta intradiária ({camada})", coleta_intraday(camada)))
+            logging.info(f"⏱️  Coleta intradiária ({camada}) a cada {intervalo}s ± {settings.COLETA_INTRADAY_JITTER_SEGUNDOS}s.")
+    schedule.every().minute.do(manutencao_logs.consolidar)
+    schedule.every().day.at("04:00").do(manutencao_logs.aplicar_retencao)
+    schedule.every().day.at("04:00").do(aplicar_retencao_snapshots)
+
     logging.info("Tarefa agendada. Próxima execução: " + str(schedule.next_run))
 
     while True:
         schedule.run_pending()
-        time.sleep(60)
\ No newline at end of file
+        time.sleep(1)
@@ -0,0 +1,4 @@
+import os
+
+# As configurações exigem DATABASE_URL; os testes usam bancos SQLite em memória próprios.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
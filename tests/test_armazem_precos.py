@@ -0,0 +1,42 @@
+import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.db.carga import upsert_historico
+from app.db.models import AlteracaoHistorico, Base, HistoricoAcao, RollupHistorico, Ticker, VersaoDados
+from app.services.armazem_precos import ArmazemPrecos
+
+def _engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[t.__table__ for t in (Ticker, HistoricoAcao, RollupHistorico, VersaoDados, AlteracaoHistorico)])
+    with engine.begin() as conn:
+        conn.execute(Ticker.__table__.insert(), [{"codigo": "PETR4", "nome": "Petrobras"}, {"codigo": "VALE3", "nome": "Vale"}])
+    return engine
+
+def _registro(ticker: str, dia: datetime.date, close: float) -> dict:
+    return {"ticker": ticker, "date": dia, "close": close, "volume": 100}
+
+def _fechamentos(armazem: ArmazemPrecos, ticker: str) -> list:
+    return armazem.serie(ticker).colunas["close"].tolist()
+
+def test_correcao_de_data_antiga_e_relida(monkeypatch):
+    monkeypatch.setattr(settings, "ARMAZEM_PRECOS_ATIVO", True)
+    monkeypatch.setattr(settings, "ARMAZEM_PRECOS_INTERVALO_SEGUNDOS", 0.0)
+    engine = _engine()
+    dias = [datetime.date(2024, 6, 3) + datetime.timedelta(days=i) for i in range(5)]
+    upsert_historico(engine, [_registro(t, dia, 10 + i) for t in ("PETR4", "VALE3") for i, dia in enumerate(dias)])
+    armazem = ArmazemPrecos()
+    with Session(engine) as db:
+        armazem.carregar(db)
+        armazem.atualizar_se_necessario(db)
+        assert armazem.atualizacoes == 0
+
+        upsert_historico(engine, [_registro("PETR4", dias[1], 99.0), _registro("VALE3", dias[4], 50.0)])
+        armazem.atualizar_se_necessario(db)
+
+    assert armazem.atualizacoes == 1
+    assert _fechamentos(armazem, "PETR4") == [10.0, 99.0, 12.0, 13.0, 14.0]
+    assert _fechamentos(armazem, "VALE3") == [10.0, 11.0, 12.0, 13.0, 50.0]
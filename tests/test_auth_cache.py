@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core import auth_cache, metricas, security
+from app.core.auth_cache import AUSENTE, CacheChavesApi
+from app.db.models import Base, Usuario
+from app.schemas.usuario import UsuarioUpdate
+from app.services import usuario_service_async
+
+def _usuario(id: int, api_key: str) -> Usuario:
+    return Usuario(id=id, nome=f"U{id}", email=f"u{id}@x.com", api_key=api_key, ativo=True)
+
+def _contador(*rotulos) -> float:
+    return dict((tuple(r), v) for r, v in metricas.auth_cache_consultas.snapshot()["series"]).get(rotulos, 0.0)
+
+def test_acerto_falha_e_cache_negativo():
+    cache = CacheChavesApi(capacidade=10, ttl_segundos=60, ttl_negativo_segundos=5)
+    acertos, falhas = _contador("acerto"), _contador("falha")
+
+    assert cache.obter("k1") is AUSENTE
+    cache.armazenar("k1", _usuario(1, "k1"))
+    cache.armazenar("inexistente", None)
+
+    assert cache.obter("k1").id == 1
+    assert cache.obter("inexistente") is None
+    assert cache.estatisticas() == {"entradas": 2, "acertos": 2, "falhas": 1}
+    assert (_contador("acerto") - acertos, _contador("falha") - falhas) == (2, 1)
+
+def test_entrada_e_copia_desacoplada():
+    cache = CacheChavesApi(capacidade=10, ttl_segundos=60, ttl_negativo_segundos=5)
+    original = _usuario(1, "k1")
+    cache.armazenar("k1", original)
+    original.ativo = False
+
+    copia = cache.obter("k1")
+    copia.nome = "alterado"
+
+    assert cache.obter("k1").ativo is True
+    assert cache.obter("k1").nome == "U1"
+
+def test_ttl_expira_entradas(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(auth_cache.time, "monotonic", lambda: agora[0])
+    cache = CacheChavesApi(capacidade=10, ttl_segundos=60, ttl_negativo_segundos=5)
+    cache.armazenar("k1", _usuario(1, "k1"))
+    cache.armazenar("inexistente", None)
+
+    agora[0] += 10
+    assert cache.obter("inexistente") is AUSENTE
+    assert cache.obter("k1").id == 1
+
+    agora[0] += 60
+    assert cache.obter("k1") is AUSENTE
+    assert cache.estatisticas()["entradas"] == 0
+
+def test_lru_descarta_a_menos_usada():
+    cache = CacheChavesApi(capacidade=2, ttl_segundos=60, ttl_negativo_segundos=5)
+    cache.armazenar("k1", _usuario(1, "k1"))
+    cache.armazenar("k2", _usuario(2, "k2"))
+    cache.obter("k1")
+
+    cache.armazenar("k3", _usuario(3, "k3"))
+
+    assert cache.obter("k2") is AUSENTE
+    assert cache.obter("k1").id == 1
+    assert cache.obter("k3").id == 3
+
+def test_invalidacao_por_chave_e_por_usuario():
+    cache = CacheChavesApi(capacidade=10, ttl_segundos=60, ttl_negativo_segundos=5)
+    cache.armazenar("k1", _usuario(1, "k1"))
+    cache.armazenar("k2", _usuario(2, "k2"))
+
+    cache.invalidar_chave("k1")
+    cache.invalidar_usuario(2)
+    cache.invalidar_usuario(99)
+
+    assert cache.obter("k1") is AUSENTE
+    assert cache.obter("k2") is AUSENTE
+
+def test_capacidade_zero_desativa():
+    cache = CacheChavesApi(capacidade=0, ttl_segundos=60, ttl_negativo_segundos=5)
+    cache.armazenar("k1", _usuario(1, "k1"))
+
+    assert cache.obter("k1") is AUSENTE
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CacheChavesApi(capacidade=10, ttl_segundos=60, ttl_negativo_segundos=60)
+    monkeypatch.setattr(security, "cache_chaves_api", cache)
+    monkeypatch.setattr(usuario_service_async, "cache_chaves_api", cache)
+    return cache
+
+def test_autenticacao_usa_o_cache_e_enxerga_alteracoes_do_servico(cache):
+    async def cenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[Usuario.__table__]))
+            await conn.execute(Usuario.__table__.insert(), [{"id": 1, "nome": "Ana", "email": "a@x.com", "api_key": "k1", "ativo": True}])
+
+        async def buscar(api_key: str):
+            async with AsyncSession(engine) as db:
+                return await security.buscar_usuario_por_api_key(db, api_key)
+
+        primeira, segunda = await buscar("k1"), await buscar("k1")
+        assert (primeira.nome, segunda.nome) == ("Ana", "Ana")
+        assert cache.estatisticas()["acertos"] == 1
+
+        async with AsyncSession(engine) as db:
+            await usuario_service_async.update_usuario(db, 1, UsuarioUpdate(nome="Bia"))
+        assert (await buscar("k1")).nome == "Bia"
+
+        async with AsyncSession(engine) as db:
+            await usuario_service_async.delete_usuario(db, 1)
+        assert await buscar("k1") is None
+        await engine.dispose()
+
+    asyncio.run(cenario())
@@ -0,0 +1,95 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.db.models import AlteracaoHistorico, Base, HistoricoAcao, Ticker, VersaoDados
+from app.services import acao_service, acao_service_async
+from app.services.armazem_precos import ArmazemPrecos
+
+TABELAS = [t.__table__ for t in (Ticker, HistoricoAcao, VersaoDados, AlteracaoHistorico)]
+HOJE = datetime.date.today()
+PEDIDO = ["vale3", "PETR4", "XXXX3", "petr4", "ITUB4"]
+
+def _popular(conn):
+    Base.metadata.create_all(conn, tables=TABELAS)
+    conn.execute(Ticker.__table__.insert(), [
+        {"codigo": "PETR4", "nome": "Petrobras"}, {"codigo": "VALE3", "nome": "Vale"}, {"codigo": "ITUB4", "nome": "Itaú"},
+    ])
+    conn.execute(HistoricoAcao.__table__.insert(), [
+        {"ticker": "PETR4", "date": HOJE - datetime.timedelta(days=3), "close": 30.0},
+        {"ticker": "PETR4", "date": HOJE, "close": 31.0},
+        {"ticker": "VALE3", "date": HOJE, "close": 60.0},
+        # ITUB4 só tem dado antigo: existe, mas está desatualizado.
+        {"ticker": "ITUB4", "date": HOJE - datetime.timedelta(days=10), "close": 25.0},
+    ])
+
+def _contar_consultas(engine) -> list:
+    consultas = []
+    event.listen(engine, "before_cursor_execute", lambda *args: consultas.append(args[2]))
+    return consultas
+
+def _resumo(resultado) -> tuple:
+    encontrados, nao_encontrados = resultado
+    return [(t.codigo, h.date, h.close) for t, h in encontrados], nao_encontrados
+
+ESPERADO = (
+    [("VALE3", HOJE, 60.0), ("PETR4", HOJE, 31.0), ("PETR4", HOJE, 31.0)],
+    ["XXXX3", "ITUB4"],
+)
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        _popular(conn)
+    yield engine
+    engine.dispose()
+
+def test_lote_usa_uma_consulta_e_mantem_a_ordem_pedida(engine):
+    consultas = _contar_consultas(engine)
+    with Session(engine) as db:
+        resultado = acao_service.get_dados_completos_acoes(db, PEDIDO)
+
+    assert _resumo(resultado) == ESPERADO
+    assert len(consultas) == 1
+
+def test_lote_vazio_nao_consulta(engine):
+    consultas = _contar_consultas(engine)
+    with Session(engine) as db:
+        assert acao_service.get_dados_completos_acoes(db, []) == ([], [])
+    assert consultas == []
+
+def test_lote_async_usa_uma_consulta():
+    async def cenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(_popular)
+        consultas = _contar_consultas(engine.sync_engine)
+        async with AsyncSession(engine) as db:
+            resultado = await acao_service_async.get_dados_completos_acoes(db, PEDIDO)
+        await engine.dispose()
+        return resultado, consultas
+
+    resultado, consultas = asyncio.run(cenario())
+
+    assert _resumo(resultado) == ESPERADO
+    assert len(consultas) == 1
+
+def test_lote_pelo_armazem_nao_consulta_o_historico(engine, monkeypatch):
+    monkeypatch.setattr(settings, "ARMAZEM_PRECOS_ATIVO", True)
+    monkeypatch.setattr(settings, "ARMAZEM_PRECOS_INTERVALO_SEGUNDOS", 3600.0)
+    armazem = ArmazemPrecos()
+    monkeypatch.setattr(acao_service, "armazem_precos", armazem)
+    with Session(engine) as db:
+        armazem.carregar(db)
+        consultas = _contar_consultas(engine)
+        resultado = acao_service.get_dados_completos_acoes(db, PEDIDO)
+
+    assert _resumo(resultado) == ESPERADO
+    assert consultas == []
@@ -0,0 +1,117 @@
+import datetime
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+
+from app.db.carga import upsert_historico, upsert_historico_dataframe
+from app.db.models import AlteracaoHistorico, Base, HistoricoAcao, RollupHistorico, Ticker, VersaoDados
+from app.db.versoes import ler_versao
+
+# PostgreSQL só roda com um banco de teste descartável: as tabelas são criadas e apagadas aqui.
+POSTGRES_TESTES = os.environ.get("TESTES_POSTGRES_URL")
+TABELAS = [t.__table__ for t in (Ticker, HistoricoAcao, RollupHistorico, VersaoDados, AlteracaoHistorico)]
+DIAS = [datetime.date(2024, 6, 3) + datetime.timedelta(days=i) for i in range(5)]
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def engine(request):
+    if request.param == "sqlite":
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    elif POSTGRES_TESTES:
+        engine = create_engine(POSTGRES_TESTES)
+    else:
+        pytest.skip("TESTES_POSTGRES_URL não definida")
+    Base.metadata.drop_all(engine, tables=TABELAS)
+    Base.metadata.create_all(engine, tables=TABELAS)
+    with engine.begin() as conn:
+        conn.execute(Ticker.__table__.insert(), [{"codigo": "PETR4", "nome": "Petrobras"}, {"codigo": "VALE3", "nome": "Vale"}])
+    yield engine
+    Base.metadata.drop_all(engine, tables=TABELAS)
+    engine.dispose()
+
+def _registro(ticker: str, dia: datetime.date, close: float) -> dict:
+    return {"ticker": ticker, "date": dia, "close": close, "volume": 100}
+
+def _historico(engine) -> dict:
+    with engine.connect() as conn:
+        linhas = conn.execute(select(HistoricoAcao.ticker_codigo, HistoricoAcao.date, HistoricoAcao.close)).all()
+    return {(ticker, dia): float(close) for ticker, dia, close in linhas}
+
+def _versao(engine) -> int:
+    with engine.connect() as conn:
+        return ler_versao(conn)[0]
+
+def _alteracoes(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(AlteracaoHistorico)).scalar()
+
+def test_insere_e_atualiza_no_conflito(engine):
+    assert upsert_historico(engine, [_registro("PETR4", dia, 10 + i) for i, dia in enumerate(DIAS[:3])]) == 3
+
+    upsert_historico(engine, [_registro("PETR4", DIAS[1], 99.0), _registro("PETR4", DIAS[3], 13.0), _registro("VALE3", DIAS[0], 50.0)])
+
+    assert _historico(engine) == {
+        ("PETR4", DIAS[0]): 10.0, ("PETR4", DIAS[1]): 99.0, ("PETR4", DIAS[2]): 12.0,
+        ("PETR4", DIAS[3]): 13.0, ("VALE3", DIAS[0]): 50.0,
+    }
+    assert _versao(engine) == 2
+
+def test_mesma_chave_no_lote_vale_a_ultima(engine):
+    upsert_historico(engine, [_registro("PETR4", DIAS[0], 10.0), _registro("petr4 ", DIAS[0], 11.0)])
+
+    assert _historico(engine) == {("PETR4", DIAS[0]): 11.0}
+
+def test_reexecucao_e_idempotente(engine):
+    registros = [_registro(t, dia, 10 + i) for t in ("PETR4", "VALE3") for i, dia in enumerate(DIAS)]
+    upsert_historico(engine, registros, tamanho_lote=3)
+    primeira = _historico(engine)
+
+    upsert_historico(engine, registros, tamanho_lote=3)
+
+    assert _historico(engine) == primeira
+    assert len(primeira) == 10
+    # Uma versão e um registro de alteração por carga, não por lote.
+    assert _versao(engine) == 2
+    assert _alteracoes(engine) == 2
+
+def test_falha_na_leitura_grava_e_finaliza_os_lotes_lidos(engine):
+    def registros():
+        for i, dia in enumerate(DIAS[:4]):
+            yield _registro("PETR4", dia, 10 + i)
+        yield {"ticker": "PETR4", "date": "data inválida", "close": 1.0}
+
+    with pytest.raises(ValueError):
+        upsert_historico(engine, registros(), tamanho_lote=2)
+
+    assert _historico(engine) == {("PETR4", dia): 10.0 + i for i, dia in enumerate(DIAS[:4])}
+    assert _versao(engine) == 1
+    with engine.connect() as conn:
+        assert conn.execute(select(func.max(RollupHistorico.ultima_data))).scalar() == DIAS[3]
+
+def test_falha_no_ultimo_lote_ainda_incrementa_a_versao(engine):
+    registros = [_registro("PETR4", dia, 10 + i) for i, dia in enumerate(DIAS[:4])]
+    registros.append({"ticker": "PETR4", "date": DIAS[4], "close": None})
+
+    # No PostgreSQL o COPY roda no cursor do driver, que levanta a exceção dele.
+    with pytest.raises((IntegrityError, engine.dialect.dbapi.IntegrityError)):
+        upsert_historico(engine, registros, tamanho_lote=2)
+
+    # Os dois primeiros lotes ficam; o último volta inteiro, mas a versão acompanha o que foi gravado.
+    assert _historico(engine) == {("PETR4", dia): 10.0 + i for i, dia in enumerate(DIAS[:4])}
+    assert _versao(engine) == 1
+    assert _alteracoes(engine) == 1
+
+def test_dataframe_sem_incrementar_grava_agregados_e_alteracao(engine):
+    df = pd.DataFrame([_registro("VALE3", dia, 20 + i) for i, dia in enumerate(DIAS)])
+    for coluna in ("variacao_percentual", "price_earnings", "dividend_yield", "roe", "market_value"):
+        df[coluna] = None
+
+    assert upsert_historico_dataframe(engine, df, incrementar=False) == 5
+    assert upsert_historico_dataframe(engine, df, incrementar=False) == 5
+
+    assert _historico(engine) == {("VALE3", dia): 20.0 + i for i, dia in enumerate(DIAS)}
+    assert _versao(engine) == 0
+    assert _alteracoes(engine) == 2
@@ -0,0 +1,89 @@
+import datetime
+import threading
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import scheduler
+from app.core.config import settings
+from app.db.models import Base, LogRequisicaoMinuto, Ticker
+from app.scripts.collect_data import tickers_da_camada
+
+CADASTRADOS = ["BBAS3", "ITUB4", "PETR4", "VALE3", "WEGE3"]
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(settings, "COLETA_INTRADAY_TOP_TICKERS", 2)
+    monkeypatch.setattr(settings, "COLETA_INTRADAY_JANELA_HORAS", 24)
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Ticker.__table__, LogRequisicaoMinuto.__table__])
+    agora = datetime.datetime.utcnow().replace(second=0, microsecond=0)
+    with engine.begin() as conn:
+        conn.execute(Ticker.__table__.insert(), [{"codigo": c, "nome": c} for c in CADASTRADOS])
+        conn.execute(LogRequisicaoMinuto.__table__.insert(), [
+            {"minuto": agora, "endpoint": f"/api/v1/acoes/{endpoint}", "method": "GET", "usuario_id": 0, "requisicoes": n}
+            for endpoint, n in [
+                ("petr4", 5), ("PETR4/grafico", 4),   # 9, somando as sub-rotas
+                ("VALE3", 7),
+                ("XXXX3", 50),                       # não cadastrado: fica de fora
+                ("buscar", 100),                     # rota, não ticker
+            ]
+        ] + [
+            # Fora da janela: não conta.
+            {"minuto": agora - datetime.timedelta(hours=30), "endpoint": "/api/v1/acoes/WEGE3", "method": "GET", "usuario_id": 0, "requisicoes": 99},
+        ])
+    with Session(engine) as db:
+        yield db
+    engine.dispose()
+
+def test_principal_sao_os_mais_consultados_e_cauda_o_resto(db):
+    principal = tickers_da_camada(db, "principal")
+    cauda = tickers_da_camada(db, "cauda")
+
+    assert principal == ["PETR4", "VALE3"]
+    assert cauda == ["BBAS3", "ITUB4", "WEGE3"]
+
+def test_sem_camada_principal_tudo_vai_para_a_cauda(db, monkeypatch):
+    monkeypatch.setattr(settings, "COLETA_INTRADAY_TOP_TICKERS", 0)
+
+    assert tickers_da_camada(db, "principal") == []
+    assert tickers_da_camada(db, "cauda") == CADASTRADOS
+
+def test_camada_invalida(db):
+    with pytest.raises(ValueError):
+        tickers_da_camada(db, "todas")
+
+@pytest.mark.parametrize("momento, esperado", [
+    (datetime.datetime(2024, 6, 3, 10, 0), True),    # segunda, abertura
+    (datetime.datetime(2024, 6, 3, 18, 31), False),  # depois do fechamento
+    (datetime.datetime(2024, 6, 8, 12, 0), False),   # sábado
+])
+def test_horario_intraday(monkeypatch, momento, esperado):
+    monkeypatch.setattr(settings, "COLETA_INTRADAY_HORARIO", "10:00-18:30")
+
+    assert scheduler.no_horario_intraday(momento.replace(tzinfo=ZoneInfo("America/Sao_Paulo"))) is esperado
+
+def test_execucao_anterior_em_andamento_e_pulada():
+    liberar, execucoes = threading.Event(), []
+
+    def tarefa():
+        execucoes.append(1)
+        liberar.wait(5)
+
+    disparar = scheduler.em_thread("teste", tarefa)
+    disparar()
+    disparar()
+    liberar.set()
+    for thread in threading.enumerate():
+        if thread.name == "teste":
+            thread.join(5)
+    disparar()
+    liberar.set()
+    for thread in threading.enumerate():
+        if thread.name == "teste":
+            thread.join(5)
+
+    assert len(execucoes) == 2
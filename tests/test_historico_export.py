@@ -0,0 +1,86 @@
+import datetime
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.v1.endpoints import acoes
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.db.database import get_async_read_db
+from app.db.models import Base, HistoricoAcao, Ticker, Usuario
+
+DIAS = [datetime.date(2024, 6, 3) + datetime.timedelta(days=i) for i in range(4)]
+LINHAS = [(t, dia.isoformat()) for t in ("PETR4", "VALE3") for dia in DIAS]
+
+@pytest.fixture
+def cliente(tmp_path):
+    # Arquivo, e não memória: o TestClient roda a aplicação em outro event loop.
+    caminho = tmp_path / "dados.sqlite3"
+    engine = create_engine(f"sqlite:///{caminho}")
+    Base.metadata.create_all(engine, tables=[Ticker.__table__, HistoricoAcao.__table__])
+    with engine.begin() as conn:
+        conn.execute(Ticker.__table__.insert(), [{"codigo": "PETR4", "nome": "Petrobras"}, {"codigo": "VALE3", "nome": "Vale"}])
+        conn.execute(HistoricoAcao.__table__.insert(), [
+            {"ticker": t, "date": dia, "close": 10 + i, "volume": 100} for t in ("VALE3", "PETR4") for i, dia in enumerate(DIAS)
+        ])
+    engine.dispose()
+    engine_async = create_async_engine(f"sqlite+aiosqlite:///{caminho}")
+
+    async def sessao():
+        async with AsyncSession(engine_async) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(acoes.router, prefix="/acoes")
+    app.dependency_overrides[get_async_read_db] = sessao
+    app.dependency_overrides[get_current_user] = lambda: Usuario(id=1, nome="Ana", email="a@x.com", api_key="k", ativo=True)
+    with TestClient(app) as cliente:
+        cliente.caminho = caminho
+        yield cliente
+
+def _paginas(cliente, limite: int, **params) -> list:
+    paginas, cursor = [], None
+    while True:
+        pagina = {"cursor": cursor} if cursor else {}
+        resposta = cliente.get("/acoes/historico", params={"tickers": "VALE3,PETR4", "limite": limite, **pagina, **params})
+        assert resposta.status_code == 200, resposta.text
+        paginas.append([(l["ticker"], l["date"]) for l in map(orjson.loads, resposta.content.splitlines())])
+        cursor = resposta.headers.get("x-proximo-cursor")
+        if cursor is None:
+            return paginas
+
+@pytest.mark.parametrize("limite", [1, 3, 4, 8, 50])
+def test_paginas_cobrem_tudo_sem_repetir(cliente, limite):
+    paginas = _paginas(cliente, limite)
+
+    assert [linha for pagina in paginas for linha in pagina] == LINHAS
+    assert all(len(pagina) == limite for pagina in paginas[:-1])
+    # A última página nunca vem vazia, mesmo quando o total é múltiplo do limite.
+    assert paginas[-1]
+
+def test_paginas_respeitam_o_intervalo_de_datas(cliente):
+    paginas = _paginas(cliente, 3, inicio=DIAS[1].isoformat(), fim=DIAS[2].isoformat())
+
+    assert [len(p) for p in paginas] == [3, 1]
+    assert [linha for pagina in paginas for linha in pagina] == [l for l in LINHAS if l[1] in (DIAS[1].isoformat(), DIAS[2].isoformat())]
+
+def test_insercao_antes_do_cursor_nao_desloca_a_pagina(cliente):
+    primeira = cliente.get("/acoes/historico", params={"tickers": "PETR4,VALE3", "limite": 3})
+    engine = create_engine(f"sqlite:///{cliente.caminho}")
+    with engine.begin() as conn:
+        conn.execute(HistoricoAcao.__table__.insert(), [{"ticker": "PETR4", "date": DIAS[0] - datetime.timedelta(days=1), "close": 1}])
+    engine.dispose()
+
+    segunda = cliente.get("/acoes/historico", params={"tickers": "PETR4,VALE3", "limite": 3, "cursor": primeira.headers["x-proximo-cursor"]})
+
+    assert [(l["ticker"], l["date"]) for l in map(orjson.loads, segunda.content.splitlines())] == LINHAS[3:6]
+
+def test_cursor_invalido_e_limite_de_tickers(cliente, monkeypatch):
+    assert cliente.get("/acoes/historico", params={"tickers": "PETR4", "limite": 2, "cursor": "xx"}).status_code == 422
+
+    monkeypatch.setattr(settings, "HISTORICO_MAX_TICKERS", 1)
+    assert cliente.get("/acoes/historico", params={"tickers": "PETR4,VALE3"}).status_code == 422
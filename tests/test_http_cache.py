@@ -0,0 +1,80 @@
+import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.v1.endpoints import acoes
+from app.core.security import get_current_user
+from app.db.database import get_async_read_db
+from app.db.models import AlteracaoHistorico, Base, HistoricoAcao, Ticker, Usuario, VersaoDados
+from app.db.versoes import VERSAO_HISTORICO, incrementar_versao
+
+TABELAS = [t.__table__ for t in (Ticker, HistoricoAcao, VersaoDados, AlteracaoHistorico)]
+
+@pytest.fixture
+def banco(tmp_path):
+    # Arquivo, e não memória: o TestClient roda a aplicação em outro event loop.
+    caminho = tmp_path / "dados.sqlite3"
+    engine = create_engine(f"sqlite:///{caminho}")
+    Base.metadata.create_all(engine, tables=TABELAS)
+    with engine.begin() as conn:
+        conn.execute(Ticker.__table__.insert(), [{"codigo": "PETR4", "nome": "Petrobras"}])
+        conn.execute(HistoricoAcao.__table__.insert(), [{"ticker": "PETR4", "date": datetime.date.today(), "close": 31.0}])
+        incrementar_versao(conn, VERSAO_HISTORICO)
+    yield engine, f"sqlite+aiosqlite:///{caminho}"
+    engine.dispose()
+
+@pytest.fixture
+def cliente(banco):
+    _, url_async = banco
+    engine_async = create_async_engine(url_async)
+
+    async def sessao():
+        async with AsyncSession(engine_async) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(acoes.router, prefix="/acoes")
+    app.dependency_overrides[get_async_read_db] = sessao
+    app.dependency_overrides[get_current_user] = lambda: Usuario(id=1, nome="Ana", email="a@x.com", api_key="k", ativo=True)
+    with TestClient(app) as cliente:
+        yield cliente
+
+def test_mesma_versao_responde_304_sem_corpo(cliente):
+    primeira = cliente.get("/acoes/PETR4")
+    etag = primeira.headers["etag"]
+
+    assert primeira.status_code == 200
+    assert primeira.json()["ticker"] == "PETR4"
+    assert primeira.headers["last-modified"]
+    assert "Accept" in primeira.headers["vary"]
+
+    repetida = cliente.get("/acoes/PETR4", headers={"If-None-Match": f'W/{etag}, "outra"'})
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert repetida.headers["etag"] == etag
+
+    por_data = cliente.get("/acoes/PETR4", headers={"If-Modified-Since": primeira.headers["last-modified"]})
+    assert por_data.status_code == 304
+
+def test_nova_versao_invalida_o_etag(cliente, banco):
+    engine, _ = banco
+    primeira = cliente.get("/acoes/PETR4")
+
+    with engine.begin() as conn:
+        conn.execute(HistoricoAcao.__table__.update().values(close=32.0))
+        incrementar_versao(conn, VERSAO_HISTORICO)
+
+    segunda = cliente.get("/acoes/PETR4", headers={"If-None-Match": primeira.headers["etag"]})
+    assert segunda.status_code == 200
+    assert segunda.headers["etag"] != primeira.headers["etag"]
+    assert float(segunda.json()["preco_atual"]) == 32.0
+
+def test_etag_depende_do_ticker(cliente):
+    etag = cliente.get("/acoes/PETR4").headers["etag"]
+
+    # Ticker sem histórico: o 404 não pode ser trocado por um 304 de outro recurso.
+    assert cliente.get("/acoes/VALE3", headers={"If-None-Match": etag}).status_code == 404
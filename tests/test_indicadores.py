@@ -0,0 +1,20 @@
+import numpy as np
+
+from app.services.armazem_precos import SerieTicker
+from app.services.indicadores import MotorIndicadores
+
+def _serie(n: int) -> SerieTicker:
+    datas = np.datetime64("2024-01-01", "D") + np.arange(n)
+    return SerieTicker(datas, {"close": np.linspace(10, 20, n), "volume": np.full(n, 100.0)})
+
+def test_entrada_removida_do_cache_depois_de_pendentes_carrega_a_serie():
+    motor = MotorIndicadores(capacidade=2)
+    pedidos = [("sma", 5), ("ema", 5)]
+    series = {"PETR4": _serie(30), "VALE3": _serie(40)}
+    for ticker, serie in series.items():
+        motor.calcular(ticker, pedidos, 1, serie)
+    # VALE3 ocupou o cache e PETR4 foi removido, mas quem chamou não tem a série em mãos.
+    assert motor.pendentes(["VALE3"], pedidos, 1) == []
+    motor.calcular("PETR4", pedidos, 1, carregar=lambda: series["PETR4"])
+    datas, valores = motor.calcular("VALE3", pedidos, 1, carregar=lambda: series["VALE3"])
+    assert len(datas) == 40 and set(valores) == {"sma_5", "ema_5"}
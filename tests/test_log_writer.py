@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import log_writer, metricas
+from app.core.auth_cache import cache_chaves_api
+from app.core.log_writer import GravadorLogs
+from app.db import logs_particionados
+from app.db.models import Base, Usuario
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Usuario.__table__])
+    with engine.begin() as conn:
+        conn.execute(Usuario.__table__.insert(), [{"id": 7, "email": "a@b.com", "nome": "A", "api_key": "chave-teste"}])
+        logs_particionados.invalidar_cache()
+        logs_particionados.preparar(conn)
+    monkeypatch.setattr(log_writer, "SessionLocal", sessionmaker(bind=engine))
+    yield engine
+    logs_particionados.invalidar_cache()
+    cache_chaves_api.invalidar_chave("chave-teste")
+
+def _contador(contador: metricas.Contador, *rotulos) -> float:
+    return dict((tuple(r), v) for r, v in contador.snapshot()["series"]).get(rotulos, 0.0)
+
+def _logs(engine) -> list:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT usuario_id, endpoint, status_code FROM logs_requisicoes ORDER BY id")).all()
+
+def test_fila_cheia_descarta_e_descarregar_grava_o_restante(engine):
+    gravador = GravadorLogs(capacidade=3, intervalo_ms=1000, tamanho_lote=2)
+    descartes_antes = _contador(metricas.logs_descartados, "fila_cheia")
+
+    aceitos = [gravador.registrar("GET", f"/r{i}", 200, 5, api_key="chave-teste" if i == 0 else None) for i in range(5)]
+
+    assert aceitos == [True, True, True, False, False]
+    assert gravador.estatisticas()["pendentes"] == 3
+    assert _contador(metricas.logs_descartados, "fila_cheia") - descartes_antes == 2
+    assert _logs(engine) == []
+
+    gravador.descarregar()
+
+    assert gravador.estatisticas() == {"pendentes": 0, "gravados": 3, "descartados": 2, "falhas_gravacao": 0}
+    assert _logs(engine) == [(7, "/r0", 200), (None, "/r1", 200), (None, "/r2", 200)]
+
+def test_amostragem_aceita_uma_a_cada_n_apos_metade_da_capacidade():
+    gravador = GravadorLogs(capacidade=10, intervalo_ms=1000, tamanho_lote=100, politica="amostrar", taxa_amostragem=3)
+
+    aceitos = [gravador.registrar("GET", "/r", 200, 1) for _ in range(11)]
+
+    # As 5 primeiras entram direto; a partir da metade, 1 a cada 3.
+    assert aceitos == [True] * 5 + [False, False, True, False, False, True]
+    assert gravador.descartados == 4
+
+def test_thread_grava_o_lote_e_parar_descarrega_a_fila(engine):
+    gravador = GravadorLogs(capacidade=100, intervalo_ms=60000, tamanho_lote=2)
+    gravador.iniciar()
+    try:
+        gravador.registrar("GET", "/a", 200, 1)
+        gravador.registrar("GET", "/b", 404, 1)
+        gravador.registrar("GET", "/c", 500, 1)
+    finally:
+        gravador.parar()
+
+    # O lote cheio acorda a thread antes do intervalo; o que sobra é gravado no encerramento.
+    assert [endpoint for _, endpoint, _ in _logs(engine)] == ["/a", "/b", "/c"]
+    assert gravador.gravados == 3
+
+def test_politica_invalida():
+    with pytest.raises(ValueError):
+        GravadorLogs(capacidade=1, intervalo_ms=1, tamanho_lote=1, politica="bloquear")
@@ -0,0 +1,98 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.pool import StaticPool
+
+from app.db import logs_particionados
+from app.db.logs_particionados import LEGADO, inicio_mes, nome_particao, proximo_mes
+from app.db.models import Base, LogRequisicao, Usuario
+
+AGORA = datetime.datetime.utcnow().replace(microsecond=0)
+MES_ATUAL = inicio_mes(AGORA)
+MES_PASSADO = inicio_mes(MES_ATUAL - datetime.timedelta(days=1))
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Usuario.__table__])
+    logs_particionados.invalidar_cache()
+    yield engine
+    logs_particionados.invalidar_cache()
+    engine.dispose()
+
+def _criar_tabela_antiga(conn, linhas: list):
+    """`logs_requisicoes` como era antes da migração que a particiona."""
+    conn.execute(text(
+        "CREATE TABLE logs_requisicoes (id INTEGER PRIMARY KEY AUTOINCREMENT, usuario_id INTEGER, endpoint VARCHAR(255), "
+        "method VARCHAR(10), status_code INTEGER, response_time_ms INTEGER, timestamp TIMESTAMP)"
+    ))
+    conn.execute(text("CREATE INDEX ix_logs_requisicoes_timestamp ON logs_requisicoes (timestamp)"))
+    conn.execute(LogRequisicao.__table__.insert(), linhas)
+
+def _linha(momento: datetime.datetime, endpoint: str = "/r") -> dict:
+    return {"usuario_id": None, "endpoint": endpoint, "method": "GET", "status_code": 200, "response_time_ms": 1, "timestamp": momento}
+
+def _tipo(conn, nome: str):
+    return conn.execute(text("SELECT type FROM sqlite_master WHERE name = :nome"), {"nome": nome}).scalar()
+
+def _endpoints(conn) -> list:
+    return conn.execute(select(LogRequisicao.endpoint).order_by(LogRequisicao.timestamp)).scalars().all()
+
+def test_tabela_existente_vira_legado_atras_da_view(engine):
+    with engine.begin() as conn:
+        _criar_tabela_antiga(conn, [_linha(AGORA - datetime.timedelta(days=400), "/antigo")])
+
+        logs_particionados.preparar(conn)
+        logs_particionados.preparar(conn)
+
+        assert _tipo(conn, "logs_requisicoes") == "view"
+        assert _tipo(conn, LEGADO) == "table"
+        assert logs_particionados.particoes(conn) == [LEGADO]
+        assert _endpoints(conn) == ["/antigo"]
+
+def test_insercao_vai_para_a_tabela_do_mes_e_a_view_junta_tudo(engine):
+    with engine.begin() as conn:
+        logs_particionados.preparar(conn)
+        logs_particionados.inserir(conn, [
+            _linha(datetime.datetime.combine(MES_PASSADO, datetime.time(12)), "/passado"),
+            _linha(AGORA, "/atual-1"),
+            _linha(AGORA, "/atual-2"),
+        ])
+
+        contagens = {
+            nome: conn.execute(text(f"SELECT COUNT(*) FROM {nome}")).scalar() for nome in logs_particionados.particoes(conn)
+        }
+        ids = conn.execute(select(LogRequisicao.id)).scalars().all()
+        total = conn.execute(select(func.count()).select_from(LogRequisicao)).scalar()
+
+    assert contagens == {nome_particao(MES_PASSADO): 1, nome_particao(MES_ATUAL): 2}
+    assert total == 3
+    # Cada mês numera a partir da própria faixa: os ids não se repetem na view.
+    assert len(set(ids)) == 3
+
+def test_garantir_proximos_meses_cria_as_tabelas_vazias(engine):
+    with engine.begin() as conn:
+        logs_particionados.garantir_proximos_meses(conn, 2)
+
+        assert logs_particionados.particoes(conn) == [
+            nome_particao(MES_ATUAL), nome_particao(proximo_mes(MES_ATUAL)), nome_particao(proximo_mes(proximo_mes(MES_ATUAL))),
+        ]
+        assert _endpoints(conn) == []
+
+def test_retencao_remove_meses_inteiros_e_o_legado_vencido(engine):
+    antigo = datetime.datetime.combine(MES_PASSADO, datetime.time(12)) - datetime.timedelta(days=90)
+    with engine.begin() as conn:
+        _criar_tabela_antiga(conn, [_linha(antigo, "/legado")])
+        logs_particionados.preparar(conn)
+        logs_particionados.inserir(conn, [_linha(antigo, "/antigo"), _linha(AGORA, "/atual")])
+
+        removidas = logs_particionados.remover_antigas(conn, datetime.datetime.combine(MES_PASSADO, datetime.time()))
+
+        assert removidas == [LEGADO, nome_particao(inicio_mes(antigo))]
+        assert logs_particionados.particoes(conn) == [nome_particao(MES_ATUAL)]
+        assert _endpoints(conn) == ["/atual"]
+
+        # O mês removido volta a ser criado se chegar uma linha atrasada dele.
+        logs_particionados.inserir(conn, [_linha(antigo, "/atrasado")])
+        assert _endpoints(conn) == ["/atrasado", "/atual"]
@@ -0,0 +1,111 @@
+import time
+
+import orjson
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.core.metricas import ConsultasRequisicao, RegistroMetricas, consultas_requisicao, instrumentar_engine
+
+def _registro(inicio: int, fila: list) -> RegistroMetricas:
+    registro = RegistroMetricas()
+    registro._inicio = inicio
+    registro.histograma("lat_segundos", "Latência.", ("rota",), (0.1, 1.0))
+    registro.contador("req_total", "Requisições.", ("status",))
+    registro.medidor("fila", "Tamanho da fila.", lambda: fila[0])
+    return registro
+
+def _valores(texto: str) -> dict:
+    return dict(linha.rsplit(" ", 1) for linha in texto.splitlines() if not linha.startswith("#"))
+
+def test_formato_texto_do_prometheus(monkeypatch):
+    monkeypatch.setattr(settings, "METRICAS_DIR", "")
+    registro = _registro(1, [3])
+    hist, contador = registro._metricas["lat_segundos"], registro._metricas["req_total"]
+    for valor in (0.05, 0.1, 0.5, 7.0):
+        hist.observar(valor, '/a"b')
+    contador.incrementar("200")
+    contador.incrementar("200", valor=1.5)
+
+    texto = registro.exportar()
+
+    assert "# HELP lat_segundos Latência.\n# TYPE lat_segundos histogram\n" in texto
+    assert "# TYPE req_total counter" in texto and "# TYPE fila gauge" in texto
+    assert _valores(texto) == {
+        'lat_segundos_bucket{rota="/a\\"b",le="0.1"}': "2",
+        'lat_segundos_bucket{rota="/a\\"b",le="1"}': "3",
+        'lat_segundos_bucket{rota="/a\\"b",le="+Inf"}': "4",
+        'lat_segundos_sum{rota="/a\\"b"}': "7.65",
+        'lat_segundos_count{rota="/a\\"b"}': "4",
+        'req_total{status="200"}': "2.5",
+        "fila": "3",
+    }
+
+def test_soma_os_snapshots_dos_outros_processos(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "METRICAS_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "METRICAS_INTERVALO_SNAPSHOT_SEGUNDOS", 10.0)
+    worker_a, worker_b = _registro(1, [3]), _registro(2, [4])
+    worker_a._metricas["req_total"].incrementar("200")
+    worker_b._metricas["req_total"].incrementar("200", valor=2)
+    worker_b._metricas["req_total"].incrementar("500")
+    worker_a._metricas["lat_segundos"].observar(0.5, "/a")
+    worker_b._metricas["lat_segundos"].observar(0.05, "/a")
+    worker_b.gravar_snapshot()
+
+    valores = _valores(worker_a.exportar())
+
+    assert valores['req_total{status="200"}'] == "3"
+    assert valores['req_total{status="500"}'] == "1"
+    assert valores['lat_segundos_bucket{rota="/a",le="0.1"}'] == "1"
+    assert valores['lat_segundos_count{rota="/a"}'] == "2"
+    assert valores["fila"] == "7"
+    # O próprio snapshot em disco é ignorado: vale o estado atual da memória.
+    worker_a.gravar_snapshot()
+    worker_a._metricas["req_total"].incrementar("200")
+    assert _valores(worker_a.exportar())['req_total{status="200"}'] == "4"
+
+def test_medidor_de_processo_parado_sai_da_soma_e_contador_fica(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "METRICAS_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "METRICAS_INTERVALO_SNAPSHOT_SEGUNDOS", 10.0)
+    worker_a, encerrado = _registro(1, [3]), _registro(2, [4])
+    encerrado._metricas["req_total"].incrementar("200")
+    encerrado.gravar_snapshot()
+    arquivo = encerrado._arquivo()
+    with open(arquivo, "rb") as f:
+        snapshot = orjson.loads(f.read())
+    snapshot["fila"]["instante"] = time.time() - 60
+    with open(arquivo, "wb") as f:
+        f.write(orjson.dumps(snapshot))
+
+    valores = _valores(worker_a.exportar())
+
+    assert valores["fila"] == "3"
+    assert valores['req_total{status="200"}'] == "1"
+
+def test_histograma_com_outros_limites_e_ignorado(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "METRICAS_DIR", str(tmp_path))
+    (tmp_path / "metricas_1_1.json").write_bytes(orjson.dumps(
+        {"lat_segundos": {"limites": [0.5], "series": [[["/a"], [1, 0], 0.2]]}}
+    ))
+    (tmp_path / "metricas_2_2.json").write_bytes(b"{corrompido")
+
+    texto = _registro(3, [0]).exportar()
+
+    assert "lat_segundos_count" not in texto
+
+def test_engine_instrumentado_acumula_consultas_da_requisicao():
+    engine = create_engine("sqlite://")
+    instrumentar_engine(engine)
+    acumulado = ConsultasRequisicao()
+    token = consultas_requisicao.set(acumulado)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM inexistente"))
+    finally:
+        consultas_requisicao.reset(token)
+        engine.dispose()
+
+    assert acumulado.quantidade == 2
+    assert acumulado.tempo > 0
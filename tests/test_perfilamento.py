@@ -0,0 +1,92 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from starlette.concurrency import run_in_threadpool
+
+from app import main
+from app.core.config import settings
+from app.core.metricas import instrumentar_engine
+from app.core.perfilamento import Perfilador
+
+def _espera_na_thread_auxiliar(perfilador: Perfilador):
+    with perfilador.thread_auxiliar():
+        time.sleep(0.03)
+
+@pytest.fixture
+def perfilador(monkeypatch):
+    monkeypatch.setattr(settings, "API_SAFE_MODE", True)
+    monkeypatch.setattr(settings, "ADMIN_API_KEYS", ["admin"])
+    monkeypatch.setattr(settings, "PERFIL_AMOSTRAGEM", 0)
+    monkeypatch.setattr(settings, "PERFIL_INTERVALO_MS", 1)
+    monkeypatch.setattr(settings, "PERFIL_CAPACIDADE", 2)
+    monkeypatch.setattr(settings, "PERFIL_MAX_SQL", 1)
+    perfilador = Perfilador()
+    monkeypatch.setattr(main, "perfilador", perfilador)
+    monkeypatch.setattr(main.gravador_logs, "registrar", lambda **_: True)
+    return perfilador
+
+@pytest.fixture
+def cliente(perfilador):
+    engine = create_engine("sqlite://")
+    instrumentar_engine(engine)
+    app = FastAPI()
+    app.middleware("http")(main.log_requests)
+
+    @app.get("/lento/{n}")
+    async def lento(n: int):
+        with engine.connect() as conn:
+            for _ in range(n):
+                conn.execute(text("SELECT 1"))
+        time.sleep(0.03)
+        await run_in_threadpool(_espera_na_thread_auxiliar, perfilador)
+        return {"ok": True}
+
+    yield TestClient(app)
+    engine.dispose()
+
+ADMIN = {"X-API-Key": "admin", "X-Perfil": "1"}
+
+def test_cabecalho_com_chave_admin_gera_perfil(cliente, perfilador):
+    resposta = cliente.get("/lento/3?x=1", headers=ADMIN)
+
+    perfil = perfilador.obter(int(resposta.headers["x-perfil-id"]))
+    assert (perfil["motivo"], perfil["metodo"], perfil["rota"], perfil["query"]) == ("cabecalho", "GET", "/lento/{n}", "x=1")
+    assert perfil["sql_quantidade"] == 3
+    assert [c["sql"] for c in perfil["sql"]] == ["SELECT 1"]
+    assert perfil["amostras"] > 0
+    pilhas = "\n".join(perfil["pilhas"])
+    assert "lento (" in pilhas
+    # O trecho no threadpool entra no perfil por estar dentro de thread_auxiliar().
+    assert "_espera_na_thread_auxiliar (" in pilhas
+
+def test_sem_chave_admin_nao_perfila(cliente, perfilador):
+    assert "x-perfil-id" not in cliente.get("/lento/0", headers={"X-API-Key": "comum", "X-Perfil": "1"}).headers
+    assert "x-perfil-id" not in cliente.get("/lento/0").headers
+    assert perfilador.listar() == []
+
+def test_amostragem_perfila_uma_a_cada_n(monkeypatch, perfilador):
+    monkeypatch.setattr(settings, "PERFIL_AMOSTRAGEM", 2)
+    amostrado = Perfilador()
+    monkeypatch.setattr(main, "perfilador", amostrado)
+    app = FastAPI()
+    app.middleware("http")(main.log_requests)
+    app.get("/r")(lambda: {"ok": True})
+    cliente = TestClient(app)
+
+    ids = [cliente.get("/r").headers.get("x-perfil-id") for _ in range(4)]
+
+    assert ids == [None, "1", None, "2"]
+    assert [p["motivo"] for p in amostrado.listar()] == ["amostragem", "amostragem"]
+
+def test_buffer_circular_e_pilhas_colapsadas_por_rota(cliente, perfilador):
+    ids = [int(cliente.get("/lento/0", headers=ADMIN).headers["x-perfil-id"]) for _ in range(3)]
+
+    assert [p["id"] for p in perfilador.listar()] == ids[:0:-1]
+    assert perfilador.obter(ids[0]) is None
+    linhas = perfilador.colapsado(rota="/lento/{n}").splitlines()
+    assert linhas and all(l.startswith("GET /lento/{n};") for l in linhas)
+    assert perfilador.colapsado(rota="/outra") == ""
+    assert perfilador.colapsado(ids[0]) is None
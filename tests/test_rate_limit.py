@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import JANELA_SEGUNDOS, BackendMemoria, BackendSQLite, cabecalhos_rate_limit
+
+class RelogioFalso:
+    def __init__(self, agora: float):
+        self.agora = agora
+
+    def time(self) -> float:
+        return self.agora
+
+    def monotonic(self) -> float:
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    # Início exato de uma janela, para as frações da janela deslizante serem previsíveis.
+    relogio = RelogioFalso(1_700_000_040.0)
+    monkeypatch.setattr(rate_limit, "time", relogio)
+    return relogio
+
+@pytest.fixture(params=["memoria", "sqlite"])
+def backend(request, relogio, tmp_path):
+    if request.param == "memoria":
+        return BackendMemoria()
+    return BackendSQLite(str(tmp_path / "rate_limit.sqlite3"))
+
+def test_bloqueia_depois_do_limite_na_janela(backend, relogio):
+    resultados = [backend.consumir("ip:1", 3) for _ in range(4)]
+
+    assert [r.permitido for r in resultados] == [True, True, True, False]
+    assert [r.restante for r in resultados] == [2, 1, 0, 0]
+    assert resultados[-1].reset_em == JANELA_SEGUNDOS
+    relogio.agora += 15
+    assert backend.consumir("ip:1", 3).reset_em == JANELA_SEGUNDOS - 15
+
+def test_janela_anterior_pesa_pela_fracao_restante(backend, relogio):
+    for _ in range(3):
+        backend.consumir("ip:1", 3)
+
+    # 25% da janela seguinte: estimativa = 3 * 0,75 + 0 = 2,25 -> cabe mais uma.
+    relogio.agora += JANELA_SEGUNDOS + 15
+    assert backend.consumir("ip:1", 3).permitido
+    assert not backend.consumir("ip:1", 3).permitido
+
+    # Duas janelas depois, a contagem antiga não conta mais.
+    relogio.agora += 2 * JANELA_SEGUNDOS
+    assert backend.consumir("ip:1", 3).restante == 2
+
+def test_chaves_sao_independentes(backend):
+    backend.consumir("ip:1", 1)
+
+    assert not backend.consumir("ip:1", 1).permitido
+    assert backend.consumir("ip:2", 1).permitido
+    assert backend.consumir("key:abc", 1).permitido
+
+def test_sqlite_compartilha_o_limite_entre_processos(relogio, tmp_path):
+    caminho = str(tmp_path / "rate_limit.sqlite3")
+    worker_a, worker_b = BackendSQLite(caminho), BackendSQLite(caminho)
+
+    assert worker_a.consumir("ip:1", 2).permitido
+    assert worker_b.consumir("ip:1", 2).permitido
+    assert not worker_a.consumir("ip:1", 2).permitido
+
+def test_memoria_remove_chaves_ociosas(relogio):
+    backend = BackendMemoria(intervalo_limpeza=JANELA_SEGUNDOS)
+    backend.consumir("ip:1", 5)
+    backend.consumir("ip:2", 5)
+
+    relogio.agora += 3 * JANELA_SEGUNDOS
+    backend.consumir("ip:3", 5)
+
+    assert len(backend) == 1
+
+def _requisicao(api_key=None):
+    return SimpleNamespace(client=SimpleNamespace(host="10.0.0.1"),
+                           headers={"x-api-key": api_key} if api_key else {}, state=SimpleNamespace())
+
+def test_dependencia_aplica_o_limite_mais_restritivo(monkeypatch, relogio):
+    monkeypatch.setattr(settings, "API_SAFE_MODE", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 5)
+    monkeypatch.setattr(settings, "RATE_LIMIT_API_KEY_PER_MINUTE", 2)
+    monkeypatch.setattr(rate_limit, "backend_rate_limit", BackendMemoria())
+
+    primeira = _requisicao("chave")
+    rate_limit.rate_limit_dependency(primeira)
+    assert (primeira.state.rate_limit.limite, primeira.state.rate_limit.restante) == (2, 1)
+    rate_limit.rate_limit_dependency(_requisicao("chave"))
+
+    with pytest.raises(HTTPException) as erro:
+        rate_limit.rate_limit_dependency(_requisicao("chave"))
+    assert erro.value.status_code == 429
+    assert erro.value.headers["Retry-After"] == str(JANELA_SEGUNDOS)
+    assert erro.value.headers["X-RateLimit-Limit"] == "2"
+
+    # Sem a chave, vale só o limite por IP (3 de 5 usados).
+    sem_chave = _requisicao()
+    rate_limit.rate_limit_dependency(sem_chave)
+    assert sem_chave.state.rate_limit.restante == 1
+
+def test_cabecalhos_so_tem_retry_after_quando_bloqueado():
+    permitido = rate_limit.ResultadoLimite(True, 10, 9, 30)
+
+    assert "Retry-After" not in cabecalhos_rate_limit(permitido)
+    assert cabecalhos_rate_limit(rate_limit.ResultadoLimite(False, 10, 0, 30))["Retry-After"] == "30"
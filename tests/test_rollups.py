@@ -0,0 +1,37 @@
+import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.pool import StaticPool
+
+from app.db.carga import upsert_historico
+from app.db.models import AlteracaoHistorico, Base, HistoricoAcao, RollupHistorico, Ticker, VersaoDados
+from app.db.rollups import INTERVALO_MENSAL, INTERVALO_SEMANAL
+
+def _engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[t.__table__ for t in (Ticker, HistoricoAcao, RollupHistorico, VersaoDados, AlteracaoHistorico)])
+    with engine.begin() as conn:
+        conn.execute(Ticker.__table__.insert(), [{"codigo": "PETR4", "nome": "Petrobras"}])
+    return engine
+
+def _registro(dia: datetime.date, close: float) -> dict:
+    return {"ticker": "PETR4", "date": dia, "close": close, "volume": 100}
+
+def _rollups(engine) -> dict:
+    with engine.connect() as conn:
+        linhas = conn.execute(select(RollupHistorico.intervalo, RollupHistorico.pregoes, RollupHistorico.close,
+                                     RollupHistorico.volume, RollupHistorico.ultima_data)).all()
+    return {intervalo: (pregoes, float(close), volume, ultima_data) for intervalo, pregoes, close, volume, ultima_data in linhas}
+
+def test_regravar_dia_do_meio_do_periodo_mantem_os_dias_seguintes():
+    engine = _engine()
+    semana = [datetime.date(2024, 6, 3) + datetime.timedelta(days=i) for i in range(5)]
+    upsert_historico(engine, [_registro(dia, 10 + i) for i, dia in enumerate(semana)])
+    esperado = (5, 14.0, 500, datetime.date(2024, 6, 7))
+    assert _rollups(engine) == {INTERVALO_SEMANAL: esperado, INTERVALO_MENSAL: esperado}
+
+    upsert_historico(engine, [_registro(datetime.date(2024, 6, 4), 11.5)])
+
+    assert _rollups(engine) == {INTERVALO_SEMANAL: esperado, INTERVALO_MENSAL: esperado}
+    with engine.connect() as conn:
+        assert conn.execute(select(HistoricoAcao.close).where(HistoricoAcao.date == datetime.date(2024, 6, 4))).scalar() == 11.5
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.db.database import RoteadorLeitura, SessaoLeitura
+
+@pytest.fixture
+def urls(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DB_REPLICA_INTERVALO_VERIFICACAO", 3600)
+    monkeypatch.setattr(settings, "DB_REPLICA_QUARENTENA", 3600)
+    for nome in ("primario", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / nome}.sqlite3")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE origem (nome TEXT)"))
+            conn.execute(text("INSERT INTO origem VALUES (:nome)"), {"nome": nome})
+        engine.dispose()
+    return {
+        "primario": f"sqlite+aiosqlite:///{tmp_path / 'primario'}.sqlite3",
+        "replica": f"sqlite+aiosqlite:///{tmp_path / 'replica'}.sqlite3",
+        "fora_do_ar": f"sqlite+aiosqlite:///{tmp_path / 'replica'}.sqlite3",
+    }
+
+def _criar_engine(url: str, fora_do_ar: bool):
+    engine = create_async_engine(url)
+    if fora_do_ar:
+        # Mesmo arquivo da réplica, mas toda conexão nova é recusada pelo "servidor".
+        @event.listens_for(engine.sync_engine, "do_connect")
+        def recusar(dialect, registro, cargs, cparams):
+            raise dialect.dbapi.OperationalError("conexão recusada")
+    return engine
+
+def _roteador(primario, *replicas) -> RoteadorLeitura:
+    roteador = RoteadorLeitura(list(replicas), primario)
+    for replica in roteador._replicas:
+        # Passou na última verificação: a falha só aparece na consulta da requisição.
+        replica["verificada_em"] = time.monotonic()
+    return roteador
+
+def _executar(urls: dict, cenario):
+    async def rodar():
+        engines = {}
+        try:
+            return await cenario(lambda nome: engines.get(nome) or engines.setdefault(nome, _criar_engine(urls[nome], nome == "fora_do_ar")))
+        finally:
+            for engine in engines.values():
+                await engine.dispose()
+    return asyncio.run(rodar())
+
+async def _origem(db) -> str:
+    return (await db.execute(text("SELECT nome FROM origem"))).scalar()
+
+def test_falha_de_conexao_repete_na_proxima_replica(urls):
+    async def cenario(engine):
+        roteador = _roteador(engine("primario"), engine("fora_do_ar"), engine("replica"))
+        async with SessaoLeitura(bind=await roteador.escolher(), roteador=roteador) as db:
+            origem = await _origem(db)
+            assert db.bind is engine("replica")
+        return origem, roteador._replicas[0]["indisponivel_ate"] > time.monotonic()
+
+    assert _executar(urls, cenario) == ("replica", True)
+
+def test_sem_outra_replica_repete_no_primario(urls):
+    async def cenario(engine):
+        roteador = _roteador(engine("primario"), engine("fora_do_ar"))
+        async with SessaoLeitura(bind=await roteador.escolher(), roteador=roteador) as db:
+            return await db.run_sync(lambda s: s.execute(text("SELECT nome FROM origem")).scalar())
+
+    assert _executar(urls, cenario) == "primario"
+
+def test_sem_nova_tentativa_depois_do_primeiro_resultado(urls):
+    async def cenario(engine):
+        roteador = _roteador(engine("primario"), engine("replica"))
+        async with SessaoLeitura(bind=await roteador.escolher(), roteador=roteador) as db:
+            assert await _origem(db) == "replica"
+            with pytest.raises(OperationalError):
+                await db.execute(text("SELECT * FROM inexistente"))
+            return db.bind is engine("replica")
+
+    assert _executar(urls, cenario) is True
+
+def test_falha_no_primario_nao_repete(urls):
+    async def cenario(engine):
+        roteador = _roteador(engine("fora_do_ar"))
+        async with SessaoLeitura(bind=await roteador.escolher(), roteador=roteador) as db:
+            with pytest.raises(OperationalError):
+                await _origem(db)
+
+    _executar(urls, cenario)